@@ -3,7 +3,6 @@ import sqlite3
 
 from pathlib import Path
 import re
-import spacy
 from flask import jsonify, request, g
 import sqlite3
 import json
@@ -13,54 +12,523 @@ from datetime import datetime
 import json
 from pathlib import Path
 
+import os
+import tempfile
+import threading
+
 TAGS_PATH = Path(__file__).with_name("tags.json")
 
+# parsed tags.json, reloaded only when the file's (mtime, size) changes
+_tags_cache = {"sig": None, "data": {}}
+_tags_lock = threading.Lock()
+
+
+def tags_json_signature():
+    try:
+        st = TAGS_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
 def load_tags_json():
-    if TAGS_PATH.exists():
-        with TAGS_PATH.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    """
+    Tag groups from tags.json. The parsed dict is shared between requests —
+    treat it as read-only and go through save_tags_json() to change it.
+    """
+    sig = tags_json_signature()
+    with _tags_lock:
+        if sig == _tags_cache["sig"]:
+            return _tags_cache["data"]
+        if sig is None:
+            data = {}
+        else:
+            try:
+                with TAGS_PATH.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print("⚠️ Error loading tags.json:", e)
+                return _tags_cache["data"]  # keep serving the last good copy
+        _tags_cache["sig"], _tags_cache["data"] = sig, data
+        return data
 
-def save_tags_json(data: dict):
-    with TAGS_PATH.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
 
-DB_PATH = "recipes_v2.db"
+def save_tags_json(data: dict):
+    # write-and-rename so readers never see a half-written file
+    fd, tmp = tempfile.mkstemp(dir=TAGS_PATH.parent, prefix=".tags-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, TAGS_PATH.stat().st_mode & 0o777 if TAGS_PATH.exists() else 0o644)
+        os.replace(tmp, TAGS_PATH)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    with _tags_lock:
+        _tags_cache["sig"], _tags_cache["data"] = tags_json_signature(), data
+    bump_data_version()
+
+import os
+
+DB_PATH = os.environ.get("RECIPES_DB", "recipes_v2.db")
 app = Flask(__name__)
 
-from flask import g
+from flask import g, has_app_context
 import sqlite3
 
-DATABASE = "recipes_v2.db"
+DATABASE = DB_PATH
 
 def get_db():
-    db = getattr(g, "_database", None)
-    if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row
-    return db
+    """Per-request connection (same one get_conn() hands out)."""
+    return get_conn()
 
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, "_database", None)
-    if db is not None:
-        db.close()
+    conn = g.pop("_database", None)
+    if conn is not None:
+        _pool.release(conn)
 
 def query_db(query, args=(), one=False):
-    cur = get_db().execute(query, args)
+    cur = get_db().cursor()
+    cur.row_factory = sqlite3.Row
+    cur.execute(query, args)
     rv = cur.fetchall()
     cur.close()
     return (rv[0] if rv else None) if one else rv
 
 
-# Load spaCy model once
-nlp = spacy.load("en_core_web_md")
+# ---------------------------
+# NLP (spaCy) — loaded lazily on first use
+# ---------------------------
+import threading
+
+# RECIPES_NLP=0 turns NLP off entirely (lexical matching only).
+# RECIPES_NLP_MODEL picks the model, e.g. en_core_web_sm on small devices
+# (note: the sm model has no word vectors, so semantic search is disabled).
+# RECIPES_NLP_DISABLE lists pipeline components we never use.
+NLP_ENABLED = os.environ.get("RECIPES_NLP", "1").lower() not in ("0", "false", "off", "no")
+NLP_MODEL = os.environ.get("RECIPES_NLP_MODEL", "en_core_web_md")
+NLP_DISABLE = [p.strip() for p in os.environ.get("RECIPES_NLP_DISABLE", "parser,ner").split(",") if p.strip()]
+
+_nlp = None
+_nlp_failed = False
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """
+    Return the shared spaCy pipeline, loading it on first call.
+    Returns None when NLP is disabled or the model can't be loaded,
+    in which case callers fall back to lexical matching.
+    """
+    global _nlp, _nlp_failed
+    if _nlp is not None or _nlp_failed or not NLP_ENABLED:
+        return _nlp
+    with _nlp_lock:
+        if _nlp is None and not _nlp_failed:
+            try:
+                import spacy
+                _nlp = spacy.load(NLP_MODEL, disable=NLP_DISABLE)
+            except Exception as e:
+                _nlp_failed = True
+                print(f"⚠️ spaCy unavailable ({NLP_MODEL}): {e}")
+    return _nlp
+
+# ---------------------------
+# Admin access (/admin/cache, /admin/metrics, /metrics)
+# ---------------------------
+# With RECIPES_ADMIN_TOKEN set, these need the token as a Bearer header,
+# X-Admin-Token or ?token=. Without it they only answer direct local
+# requests: anything that came through a proxy or the tunnel carries a
+# forwarding header and is refused.
+import hmac
+from functools import wraps
+
+ADMIN_TOKEN = os.environ.get("RECIPES_ADMIN_TOKEN", "")
+LOOPBACK_ADDRS = {"127.0.0.1", "::1"}
+FORWARDING_HEADERS = ("X-Forwarded-For", "X-Real-IP", "Forwarded", "CF-Connecting-IP")
+
+
+def admin_allowed() -> bool:
+    if ADMIN_TOKEN:
+        auth = request.headers.get("Authorization", "")
+        token = (
+            auth[7:] if auth.startswith("Bearer ")
+            else request.headers.get("X-Admin-Token") or request.args.get("token", "")
+        )
+        return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+    return request.remote_addr in LOOPBACK_ADDRS and not any(h in request.headers for h in FORWARDING_HEADERS)
+
+
+def admin_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not admin_allowed():
+            return jsonify({"error": "Forbidden (set RECIPES_ADMIN_TOKEN and send it)"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# ---------------------------
+# Request metrics (opt-in)
+# ---------------------------
+# RECIPES_METRICS=1 times every request: wall time, SQL statements run on the
+# connections get_conn() hands out, and named phases (parse, nlp, tags,
+# template). They're reported per request as a Server-Timing header and
+# summed per route at /admin/metrics (JSON) and /metrics (Prometheus text).
+# Phases can overlap: SQL inside get_tag_cloud() counts for db and tags.
+# When off, connections are plain sqlite3 ones, phase_timer() hands back the
+# undecorated function and no request hooks are registered.
+# Numbers are per process; each gunicorn worker keeps its own.
+import time
+from collections import defaultdict, deque
+from functools import wraps
+
+METRICS_ENABLED = os.environ.get("RECIPES_METRICS", "0").lower() in ("1", "true", "on", "yes")
+METRICS_WINDOW = int(os.environ.get("RECIPES_METRICS_WINDOW", "1000"))  # recent requests kept per route
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_metrics_local = threading.local()
+
+
+def _record_sql(seconds, statements=1):
+    m = getattr(_metrics_local, "current", None)
+    if m is not None:
+        m["sql"] += statements
+        m["phases"]["db"] += seconds
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that adds each statement's time to the current request's metrics."""
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_sql(time.perf_counter() - t0)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_sql(time.perf_counter() - t0)
+
+    def executescript(self, sql_script):
+        t0 = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record_sql(time.perf_counter() - t0)
+
+    # rows are stepped lazily, so fetching is DB time too (not extra statements)
+    def fetchone(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _record_sql(time.perf_counter() - t0, 0)
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            _record_sql(time.perf_counter() - t0, 0)
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _record_sql(time.perf_counter() - t0, 0)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+SQLITE_FACTORY = InstrumentedConnection if METRICS_ENABLED else sqlite3.Connection
+
+
+def phase_timer(phase):
+    """
+    Decorator: count the wrapped call's time towards `phase` for the current
+    request. Nested calls of the same phase are only counted once.
+    """
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            m = getattr(_metrics_local, "current", None)
+            if m is None or phase in m["active"]:
+                return fn(*args, **kwargs)
+            m["active"].add(phase)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                m["active"].discard(phase)
+                m["phases"][phase] += time.perf_counter() - t0
+        return timed
+    return decorate
+
+
+class MetricsRegistry:
+    """Per-route request counts, latency histogram, recent-window percentiles and phase totals."""
+
+    def __init__(self, window, buckets):
+        self.window = window
+        self.buckets = buckets
+        self.started = time.time()
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, seconds, phases, sql):
+        with self._lock:
+            r = self._routes.get(route)
+            if r is None:
+                r = self._routes[route] = {
+                    "count": 0, "sum": 0.0, "sql": 0,
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "recent": deque(maxlen=self.window),
+                    "phases": defaultdict(float),
+                }
+            r["count"] += 1
+            r["sum"] += seconds
+            r["sql"] += sql
+            r["recent"].append(seconds)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    r["buckets"][i] += 1
+                    break
+            else:
+                r["buckets"][-1] += 1
+            for phase, value in phases.items():
+                r["phases"][phase] += value
+
+    def summary(self):
+        def pct(values, p):
+            return round(values[min(len(values) - 1, int(len(values) * p / 100))] * 1000, 2) if values else None
+
+        with self._lock:
+            routes = {}
+            for route, r in sorted(self._routes.items()):
+                recent = sorted(r["recent"])
+                routes[route] = {
+                    "count": r["count"],
+                    "mean_ms": round(r["sum"] / r["count"] * 1000, 2),
+                    "p50_ms": pct(recent, 50),
+                    "p95_ms": pct(recent, 95),
+                    "p99_ms": pct(recent, 99),
+                    "sql_per_request": round(r["sql"] / r["count"], 2),
+                    "phase_mean_ms": {p: round(v / r["count"] * 1000, 2) for p, v in sorted(r["phases"].items())},
+                    # [[upper bound ms, count], ..., [null, count above the last bound]]
+                    "histogram": [[b * 1000, n] for b, n in zip(self.buckets, r["buckets"])]
+                                 + [[None, r["buckets"][-1]]],
+                }
+        return {"uptime_s": round(time.time() - self.started, 1), "window": self.window, "routes": routes}
+
+    def prometheus(self):
+        def label(value):
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = [
+            "# HELP recipes_request_duration_seconds Request wall time by route.",
+            "# TYPE recipes_request_duration_seconds histogram",
+        ]
+        sql, phases = [], []
+        with self._lock:
+            for route, r in sorted(self._routes.items()):
+                rl = label(route)
+                total = 0
+                for bound, n in zip(self.buckets, r["buckets"]):
+                    total += n
+                    lines.append(f'recipes_request_duration_seconds_bucket{{route="{rl}",le="{bound:g}"}} {total}')
+                lines.append(f'recipes_request_duration_seconds_bucket{{route="{rl}",le="+Inf"}} {r["count"]}')
+                lines.append(f'recipes_request_duration_seconds_sum{{route="{rl}"}} {r["sum"]:.6f}')
+                lines.append(f'recipes_request_duration_seconds_count{{route="{rl}"}} {r["count"]}')
+                sql.append(f'recipes_sql_statements_total{{route="{rl}"}} {r["sql"]}')
+                phases += [
+                    f'recipes_phase_seconds_total{{route="{rl}",phase="{label(p)}"}} {v:.6f}'
+                    for p, v in sorted(r["phases"].items())
+                ]
+        lines += ["# HELP recipes_sql_statements_total SQL statements executed by route.",
+                  "# TYPE recipes_sql_statements_total counter", *sql,
+                  "# HELP recipes_phase_seconds_total Time spent per phase (db, parse, nlp, tags, template) by route.",
+                  "# TYPE recipes_phase_seconds_total counter", *phases]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(METRICS_WINDOW, METRICS_BUCKETS)
+
+
+def server_timing(phases, sql, total):
+    """Server-Timing header value: one entry per phase, then the total."""
+    parts = []
+    for phase, seconds in sorted(phases.items()):
+        desc = f';desc="{sql} SQL"' if phase == "db" else ""
+        parts.append(f"{phase};dur={seconds * 1000:.1f}{desc}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def new_request_metrics():
+    """Per-request accumulator that phase_timer() and the SQL cursors add to."""
+    return {
+        "start": time.perf_counter(), "phases": defaultdict(float),
+        "sql": 0, "active": set(), "template_start": [],
+    }
+
+
+if METRICS_ENABLED:
+    from flask import before_render_template, template_rendered
+
+    @app.before_request
+    def _metrics_start():
+        _metrics_local.current = new_request_metrics()
+
+    @before_render_template.connect_via(app)
+    def _metrics_template_start(sender, **extra):
+        m = getattr(_metrics_local, "current", None)
+        if m is not None:
+            m["template_start"].append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def _metrics_template_done(sender, **extra):
+        m = getattr(_metrics_local, "current", None)
+        if m is not None and m["template_start"]:
+            t0 = m["template_start"].pop()
+            if not m["template_start"]:  # includes/nested renders count once
+                m["phases"]["template"] += time.perf_counter() - t0
+
+    @app.after_request
+    def _metrics_finish(response):
+        m = getattr(_metrics_local, "current", None)
+        if m is None:
+            return response
+        total = time.perf_counter() - m["start"]
+        response.headers["Server-Timing"] = server_timing(m["phases"], m["sql"], total)
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        metrics.observe(route, total, m["phases"], m["sql"])
+        return response
+
+    @app.teardown_request
+    def _metrics_clear(exception):
+        _metrics_local.current = None
+
+
+@app.route("/admin/metrics")
+@admin_required
+def admin_metrics():
+    """Per-route latency summary (RECIPES_METRICS=1)."""
+    if not METRICS_ENABLED:
+        return jsonify({"enabled": False, "hint": "start the app with RECIPES_METRICS=1"})
+    return jsonify({"enabled": True, **metrics.summary()})
+
+
+@app.route("/metrics")
+@admin_required
+def prometheus_metrics():
+    """Prometheus text exposition of the same numbers (404 when metrics are off)."""
+    if not METRICS_ENABLED:
+        abort(404)
+    return metrics.prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 # ---------------------------
 # Database helpers
 # ---------------------------
+# RECIPES_DB_POOL=0 restores the old connect-per-call behaviour (benchmarks).
+SQLITE_POOL_SIZE = int(os.environ.get("RECIPES_DB_POOL", "8"))
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",       # readers no longer block on the writer
+    "PRAGMA synchronous = NORMAL",     # safe with WAL, far fewer fsyncs on the SD card
+    "PRAGMA cache_size = -8000",       # ~8 MB page cache per connection
+    "PRAGMA mmap_size = 67108864",     # 64 MB memory-mapped reads
+    "PRAGMA busy_timeout = 5000",      # wait for a lock instead of failing
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class ConnectionPool:
+    """
+    Small LIFO pool of tuned SQLite connections shared by all threads.
+    Connections are never reused across fork(): a worker process that
+    inherits the pool starts with an empty one.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, factory=SQLITE_FACTORY)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return self.connect()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.size and self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+_pool = ConnectionPool(DB_PATH, SQLITE_POOL_SIZE)
+_thread_conn = threading.local()
+
+
 def get_conn():
-    return sqlite3.connect(DB_PATH)
+    """
+    Connection for the current app context: one per request, shared by all
+    helpers and returned to the pool on teardown. Outside an app context
+    (background threads) each thread keeps its own pooled connection.
+    Use as `with get_conn() as conn:` — that commits/rolls back, never closes.
+    """
+    if SQLITE_POOL_SIZE <= 0:
+        return sqlite3.connect(DB_PATH, factory=SQLITE_FACTORY)  # legacy: fresh connection per call
+    if has_app_context():
+        conn = g.get("_database")
+        if conn is None:
+            conn = g._database = _pool.acquire()
+        return conn
+    conn = getattr(_thread_conn, "conn", None)
+    if conn is None or _thread_conn.pid != os.getpid():
+        conn = _thread_conn.conn = _pool.acquire()
+        _thread_conn.pid = os.getpid()
+    return conn
 
 # === JSON field helpers ===
 import json
@@ -81,6 +549,36 @@ def to_json(value):
     return value or "[]"
 
 
+# External-content FTS5 index over the searchable recipe columns.
+# prefix='2 3' adds prefix indexes so 'pa*' / 'pas*' queries stay indexed.
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        name, ingredients, method, tags, notes,
+        content='recipes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, name, ingredients, method, tags, notes)
+        VALUES (new.id, new.name, new.ingredients, new.method, new.tags, new.notes);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, name, ingredients, method, tags, notes)
+        VALUES ('delete', old.id, old.name, old.ingredients, old.method, old.tags, old.notes);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_au
+    AFTER UPDATE OF name, ingredients, method, tags, notes ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, name, ingredients, method, tags, notes)
+        VALUES ('delete', old.id, old.name, old.ingredients, old.method, old.tags, old.notes);
+        INSERT INTO recipes_fts(rowid, name, ingredients, method, tags, notes)
+        VALUES (new.id, new.name, new.ingredients, new.method, new.tags, new.notes);
+    END;
+"""
+
+
 def init_db():
     """Ensure all required tables and columns exist."""
     with get_conn() as conn:
@@ -101,6 +599,12 @@ def init_db():
             ("method", "ALTER TABLE recipes ADD COLUMN method TEXT"),
             ("image_url", "ALTER TABLE recipes ADD COLUMN image_url TEXT"),
             ("tags", "ALTER TABLE recipes ADD COLUMN tags TEXT"),
+            ("category", "ALTER TABLE recipes ADD COLUMN category TEXT"),
+            ("source", "ALTER TABLE recipes ADD COLUMN source TEXT"),
+            ("linked_recipe", "ALTER TABLE recipes ADD COLUMN linked_recipe TEXT"),
+            ("notes", "ALTER TABLE recipes ADD COLUMN notes TEXT"),
+            ("created_at", "ALTER TABLE recipes ADD COLUMN created_at DATETIME"),
+            ("updated_at", "ALTER TABLE recipes ADD COLUMN updated_at DATETIME"),
         ]:
             if col not in cols:
                 try:
@@ -109,6 +613,123 @@ def init_db():
                 except Exception as e:
                     print(f"⚠️ Skipped adding {col}: {e}")
 
+        # keyset pagination of the A–Z listing (see list_recipes)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_recipes_name_id ON recipes(name COLLATE NOCASE, id)")
+        conn.commit()
+
+        # --- recipes_fts full-text index (kept in sync by triggers) ---
+        c.execute("SELECT 1 FROM sqlite_master WHERE name = 'recipes_fts'")
+        fts_existed = c.fetchone() is not None
+        try:
+            c.executescript(FTS_SCHEMA)
+            if not fts_existed:
+                c.execute("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')")
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Skipped full-text index: {e}")
+
+        # --- recipe_vectors: precomputed spaCy document vectors ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_vectors (
+                recipe_id INTEGER PRIMARY KEY,
+                vector BLOB NOT NULL
+            )
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS recipe_vectors_ad AFTER DELETE ON recipes BEGIN
+                DELETE FROM recipe_vectors WHERE recipe_id = old.id;
+            END
+        """)
+        conn.commit()
+
+        # --- recipe_lemmas: precomputed lemma sets for lexical_hit() ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_lemmas (
+                recipe_id INTEGER PRIMARY KEY,
+                lemmas TEXT NOT NULL
+            )
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS recipe_lemmas_ad AFTER DELETE ON recipes BEGIN
+                DELETE FROM recipe_lemmas WHERE recipe_id = old.id;
+            END
+        """)
+        conn.commit()
+
+        # --- recipe_ingredients: ingredient lines parsed once at write time ---
+        c.execute("SELECT 1 FROM sqlite_master WHERE name = 'recipe_ingredients'")
+        recipe_ingredients_existed = c.fetchone() is not None
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_ingredients (
+                recipe_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                amount TEXT,
+                unit TEXT,
+                item TEXT COLLATE NOCASE,
+                note TEXT,
+                raw TEXT NOT NULL,
+                PRIMARY KEY (recipe_id, position)
+            )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_item ON recipe_ingredients(item)")
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS recipe_ingredients_ad AFTER DELETE ON recipes BEGIN
+                DELETE FROM recipe_ingredients WHERE recipe_id = old.id;
+            END
+        """)
+        if not recipe_ingredients_existed:
+            c.execute("SELECT id, ingredients FROM recipes")
+            for rid, ingredients in c.fetchall():
+                store_recipe_ingredients(conn, rid, ingredients)
+        conn.commit()
+
+        # --- tags + recipe_tags join (normalized tag slugs) ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY,
+                tag_group TEXT,
+                name TEXT
+            )
+        """)
+        c.execute("PRAGMA table_info(tags)")
+        if "slug" not in [r[1] for r in c.fetchall()]:
+            c.execute("ALTER TABLE tags ADD COLUMN slug TEXT")
+        c.execute("SELECT id, name FROM tags WHERE slug IS NULL")
+        c.executemany(
+            "UPDATE tags SET slug = ? WHERE id = ?",
+            [(normalize_tag(name), tid) for tid, name in c.fetchall()],
+        )
+        c.execute("CREATE INDEX IF NOT EXISTS idx_tags_slug ON tags(slug)")
+
+        c.execute("SELECT 1 FROM sqlite_master WHERE name = 'recipe_tags'")
+        recipe_tags_existed = c.fetchone() is not None
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_tags (
+                recipe_id INTEGER NOT NULL,
+                tag_id INTEGER NOT NULL,
+                PRIMARY KEY (recipe_id, tag_id)
+            ) WITHOUT ROWID
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_recipe_tags_tag ON recipe_tags(tag_id, recipe_id)")
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS recipe_tags_ad AFTER DELETE ON recipes BEGIN
+                DELETE FROM recipe_tags WHERE recipe_id = old.id;
+            END
+        """)
+        if not recipe_tags_existed:
+            c.execute("SELECT id, tags FROM recipes")
+            for rid, raw in c.fetchall():
+                sync_recipe_tags(conn, rid, raw)
+        conn.commit()
+
+        # --- tag_counts: per-tag recipe counts, maintained by triggers ---
+        c.execute("SELECT 1 FROM sqlite_master WHERE name = 'tag_counts'")
+        tag_counts_existed = c.fetchone() is not None
+        c.executescript(TAG_COUNTS_SCHEMA)
+        if not tag_counts_existed:
+            rebuild_tag_counts(conn)
+        conn.commit()
+
         # --- shopping_list table ---
         c.execute("""
             CREATE TABLE IF NOT EXISTS shopping_list (
@@ -132,6 +753,7 @@ def init_db():
             ("crossed", "ALTER TABLE shopping_list ADD COLUMN crossed INTEGER DEFAULT 0"),
             ("active", "ALTER TABLE shopping_list ADD COLUMN active INTEGER DEFAULT 1"),
             ("updated_at", "ALTER TABLE shopping_list ADD COLUMN updated_at TIMESTAMP"),
+            ("deleted", "ALTER TABLE shopping_list ADD COLUMN deleted INTEGER DEFAULT 0"),
         ]:
             if col not in cols:
                 try:
@@ -142,6 +764,89 @@ def init_db():
                         conn.commit()
                 except Exception as e:
                     print(f"⚠️ Skipped adding {col}: {e}")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_shopping_list_updated ON shopping_list(updated_at)")
+        conn.commit()
+
+        # --- change_events: append-only log behind /api/events (SSE) ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS change_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+
+        # --- image_cache: thumbnail state per image_url (see ThumbnailWorker) ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS image_cache (
+                source TEXT PRIMARY KEY,
+                digest TEXT,
+                widths TEXT,
+                formats TEXT,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+
+        # --- category_memory: shopping-list categories learned from manual moves ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS category_memory (
+                item_key TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 1,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+
+        # --- planner snapshots (saved plans: header + meal rows + item rows) ---
+        c.executescript(SNAPSHOT_SCHEMA)
+        conn.commit()
+
+        # --- meal_plan: one row per slot (upserted by save_meal_plan) ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS meal_plan (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                slot TEXT,
+                recipe TEXT,
+                link TEXT,
+                updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_meal_plan_slot'")
+        if not c.fetchone():
+            # older saves could leave duplicate slots; keep the newest of each
+            c.execute("""
+                DELETE FROM meal_plan
+                WHERE id NOT IN (SELECT MAX(id) FROM meal_plan GROUP BY slot)
+            """)
+            if c.rowcount:
+                print(f"⚠️ Removed {c.rowcount} duplicate meal_plan slot(s)")
+            c.execute("CREATE UNIQUE INDEX idx_meal_plan_slot ON meal_plan(slot)")
+        conn.commit()
+
+        # --- app_meta: small key/value store (data_version for the page cache) ---
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # per-table versions for the in-process caches built from those tables,
+        # bumped by triggers so writes from any worker or the CLI are noticed
+        for table, key in TABLE_VERSION_KEYS.items():
+            c.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES (?, 0)", (key,))
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                c.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                        UPDATE app_meta SET value = value + 1 WHERE key = '{key}';
+                    END
+                """)
+        conn.commit()
 
 
 
@@ -162,7 +867,13 @@ def update_recipe(recipe_id, name, ingredients, method, image_url, tags, linked_
                 updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         """, (name, ingredients, method, image_url, tags, linked_recipe, notes, recipe_id))
+        sync_recipe_tags(conn, recipe_id, tags)
+        store_recipe_ingredients(conn, recipe_id, ingredients)
+        store_recipe_vector(conn, recipe_id, name, ingredients, method)
+        store_recipe_lemmas(conn, recipe_id, name, ingredients, method)
+        bump_data_version(conn)
         conn.commit()
+    thumbnailer.submit(image_url)
 
 
 
@@ -189,83 +900,363 @@ def add_recipe_to_db(name, ingredients, method, image_url, tags):
             "INSERT INTO recipes (name, ingredients, method, image_url, tags) VALUES (?, ?, ?, ?, ?)",
             (name, ingredients, method, image_url, tags),
         )
+        recipe_id = c.lastrowid
+        sync_recipe_tags(conn, recipe_id, tags)
+        store_recipe_ingredients(conn, recipe_id, ingredients)
+        store_recipe_vector(conn, recipe_id, name, ingredients, method)
+        store_recipe_lemmas(conn, recipe_id, name, ingredients, method)
+        bump_data_version(conn)
+        conn.commit()
+    thumbnailer.submit(image_url)
+    return recipe_id
+
+
+def delete_recipe(recipe_id):
+    # recipe_tags / recipe_vectors / recipe_lemmas / recipes_fts rows go via triggers
+    with get_conn() as conn:
+        conn.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+        bump_data_version(conn)
         conn.commit()
 
 # ---------------------------
 # Ingredient parsing helpers
 # ---------------------------
+from functools import lru_cache
+
 FRACTION_MAP = {
     "½": "1/2", "¼": "1/4", "¾": "3/4",
     "⅓": "1/3", "⅔": "2/3",
     "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8",
 }
+# one str.translate pass; the leading space turns "1½" into "1 1/2"
+FRACTION_TABLE = str.maketrans({sym: f" {frac}" for sym, frac in FRACTION_MAP.items()})
 
-UNITS = {
+UNITS = frozenset({
     "g","kg","mg","ml","l","tbsp","tsp","cup","cups","oz","fl oz","lb","lbs","pound","pounds",
     "clove","cloves","slice","slices","can","cans","tin","tins","pack","packs"
-}
+})
+
+# amount can be: 200 | 1/2 | 1 1/2 | 0.5  (longest form tried first)
+# unit must be a whole word, so 'penne' is never split into 'penn' + 'e'
+# rest is greedy: lines are stripped before matching, so no lazy
+# '.+?' / '\s*$' scan is needed to drop trailing whitespace
+INGREDIENT_RE = re.compile(
+    r"""\s*
+    (?P<amount>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)?
+    \s*
+    (?:(?P<unit>fl\s*oz|[a-zA-Z]+)\b)?
+    \s*
+    (?P<rest>.+)""",
+    re.VERBOSE,
+)
+_SPACES_RE = re.compile(r"\s+")
+
 
 def _normalize_fractions(s: str) -> str:
-    for sym, ascii_frac in FRACTION_MAP.items():
-        s = s.replace(sym, ascii_frac)
-    return s
+    return s.translate(FRACTION_TABLE)
+
+
+@lru_cache(maxsize=4096)
+def _parse_line(original: str):
+    # cached on the stripped line: the same few hundred lines ("onion",
+    # "2 cloves garlic") make up most of any import or aggregation
+    m = INGREDIENT_RE.match(original if original.isascii() else original.translate(FRACTION_TABLE))
+    if not m:
+        return "", "", original, ""  # fallback
+    amount, unit, rest = m.group("amount", "unit", "rest")
+    amount = amount or ""
+    if amount and " " in amount:
+        amount = _SPACES_RE.sub(" ", amount)
+    if unit:
+        key = unit.lower()
+        if key not in UNITS:
+            key = _SPACES_RE.sub(" ", key)
+        if key in UNITS:
+            unit = key
+        else:
+            # not a known unit: it's actually the first word of the item
+            rest = f"{unit} {rest}"
+            unit = ""
+    else:
+        unit = ""
+    # Split item vs note on comma
+    item, sep, note = rest.partition(",")
+    return amount, unit, item.strip(), note.strip() if sep else ""
 
+
+@phase_timer("parse")
 def parse_ingredient_line(line: str):
     """
     Parse lines like:
       '200 g penne'
-      '1 1/2 cups milk'
+      '1 1/2 cups milk'   ('1½ cups milk' too)
       '2 cloves garlic, crushed'
       'penne'          (no amount)
-    Returns dict: {amount, unit, item, note}
+    Returns dict: {amount, unit, item, note, raw}
     """
     original = line.strip()
     if not original:
         return None
-    s = _normalize_fractions(original)
-
-    # Try to capture amount (number or fraction), optional unit, then item
-    # amount can be: 200 | 1/2 | 1 1/2 | 0.5
-    m = re.match(
-        r"""^\s*
-        (?P<amount>(\d+(?:\.\d+)?)|(\d+\s+\d+/\d+)|(\d+/\d+))?
-        \s*
-        (?P<unit>[a-zA-Z]+(?:\s*oz)?)?
-        \s*
-        (?P<rest>.+?)
-        \s*$""",
-        s, re.VERBOSE
+    amount, unit, item, note = _parse_line(original)
+    return {"amount": amount, "unit": unit, "item": item, "note": note, "raw": original}
+
+
+@phase_timer("parse")
+def parse_many(lines):
+    """parse_ingredient_line over many lines, skipping blanks (bulk imports)."""
+    parse = _parse_line
+    out = []
+    for line in lines:
+        original = line.strip()
+        if original:
+            amount, unit, item, note = parse(original)
+            out.append({"amount": amount, "unit": unit, "item": item, "note": note, "raw": original})
+    return out
+
+
+@phase_timer("parse")
+def parse_ingredients_block(block):
+    """Split on newlines (or take a list of lines), parse each non-empty line."""
+    lines = block if isinstance(block, list) else (block or "").splitlines()
+    return parse_many(lines)
+
+
+def ingredient_lines(text) -> list:
+    """
+    recipes.ingredients → list of ingredient strings.
+    Handles JSON arrays (incl. double-encoded), newline lists and
+    comma-separated text.
+    """
+    try:
+        if text and text.strip().startswith("["):
+            items = json.loads(text)
+            if isinstance(items, str):
+                items = json.loads(items)
+        else:
+            items = (text or "").replace(",", "\n").splitlines()
+    except Exception:
+        cleaned = (text or "").replace(",", "\n").replace("[", "").replace("]", "").replace('"', "")
+        items = cleaned.splitlines()
+
+    if not isinstance(items, list):
+        items = [items]
+    return [str(i).strip() for i in items if str(i).strip()]
+
+
+# ---------------------------
+# recipe_ingredients (parsed once at write time)
+# ---------------------------
+def store_recipe_ingredients(conn, recipe_id, ingredients):
+    """Rewrite the parsed ingredient rows for one recipe."""
+    parsed = parse_ingredients_block(ingredient_lines(ingredients))
+    conn.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+    conn.executemany(
+        """
+        INSERT INTO recipe_ingredients (recipe_id, position, amount, unit, item, note, raw)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (recipe_id, pos, p["amount"], p["unit"], p["item"], p["note"], p["raw"])
+            for pos, p in enumerate(parsed)
+        ],
     )
 
-    amount = unit = item = note = ""
 
-    if m:
-        amount = (m.group("amount") or "").strip()
-        unit = (m.group("unit") or "").strip().lower()
-        rest = (m.group("rest") or "").strip()
-        # If unit isn't a known unit and we have an amount, maybe unit actually part of item
-        if unit and unit not in UNITS and amount:
-            rest = (unit + " " + rest).strip()
-            unit = ""
-        # Split item vs note on comma
-        parts = [p.strip() for p in rest.split(",", 1)]
-        item = parts[0]
-        if len(parts) == 2:
-            note = parts[1]
-    else:
-        item = original  # fallback
+def get_ingredient_lines(c, recipe_ids) -> dict:
+    """{recipe_id: [raw ingredient line, ...]} for the given ids, in one query."""
+    ids = list(recipe_ids)
+    if not ids:
+        return {}
+    c.execute(f"""
+        SELECT recipe_id, raw FROM recipe_ingredients
+        WHERE recipe_id IN ({','.join(['?'] * len(ids))})
+        ORDER BY recipe_id, position
+    """, ids)
+    lines = {}
+    for rid, raw in c.fetchall():
+        lines.setdefault(rid, []).append(raw)
+    return lines
+
+
+def find_recipes_by_ingredient(c, item: str):
+    """
+    Recipes with an ingredient whose item equals or starts with `item`
+    (case-insensitive, served by idx_recipe_ingredients_item).
+    """
+    item = (item or "").strip()
+    if not item:
+        return []
+    prefix = re.sub(r"([%_\\])", r"\\\1", item) + "%"
+    c.execute("""
+        SELECT r.id, r.name, ri.raw
+        FROM recipe_ingredients ri
+        JOIN recipes r ON r.id = ri.recipe_id
+        WHERE ri.item LIKE ? ESCAPE '\\'
+        ORDER BY r.name, ri.position
+    """, (prefix,))
+    found = {}
+    for rid, name, raw in c.fetchall():
+        found.setdefault(rid, {"id": rid, "name": name, "matches": []})["matches"].append(raw)
+    return list(found.values())
+
+
+# ---------------------------
+# Ingredient aggregation (merged shopping list for several recipes)
+# ---------------------------
+from fractions import Fraction
+
+# unit -> (dimension, factor to the dimension's base unit: g / ml / each)
+UNIT_CONVERSIONS = {
+    "mg": ("mass", Fraction(1, 1000)), "g": ("mass", Fraction(1)), "kg": ("mass", Fraction(1000)),
+    "oz": ("mass", Fraction("28.35")),
+    "lb": ("mass", Fraction("453.6")), "lbs": ("mass", Fraction("453.6")),
+    "pound": ("mass", Fraction("453.6")), "pounds": ("mass", Fraction("453.6")),
+    "ml": ("volume", Fraction(1)), "l": ("volume", Fraction(1000)),
+    "tsp": ("volume", Fraction(5)), "tbsp": ("volume", Fraction(15)),
+    "cup": ("volume", Fraction(240)), "cups": ("volume", Fraction(240)),
+    "fl oz": ("volume", Fraction(30)),
+}
+
+# plural / synonym unit spellings for countable packaging
+UNIT_ALIASES = {
+    "cups": "cup", "lbs": "lb", "pounds": "lb", "pound": "lb",
+    "cloves": "clove", "slices": "slice",
+    "cans": "tin", "can": "tin", "tins": "tin", "packs": "pack",
+}
+
+# units a summed amount may be shown in, largest first, per dimension
+DISPLAY_UNITS = {
+    "mass": ["kg", "g"],
+    "volume": ["l", "cup", "tbsp", "tsp", "ml"],
+}
+KITCHEN_FRACTIONS = [Fraction(1, 4), Fraction(1, 3), Fraction(1, 2), Fraction(2, 3), Fraction(3, 4)]
+
+
+def parse_amount(amount: str):
+    """'1 1/2' -> Fraction(3, 2); '' or unparseable -> None."""
+    try:
+        return sum((Fraction(part) for part in amount.split()), Fraction(0)) if amount else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def canonical_item(item: str) -> str:
+    """Grouping key for an ingredient name: 'Tomatoes ' / 'tomato' -> 'tomato'."""
+    s = re.sub(r"\s+", " ", item.lower()).strip(" .;:-")
+    words = s.split(" ")
+    last = words[-1]
+    if len(last) > 3 and not last.endswith(("ss", "us", "is")):
+        if last.endswith("ies"):
+            last = last[:-3] + "y"
+        elif last.endswith("oes"):
+            last = last[:-2]
+        elif last.endswith("s"):
+            last = last[:-1]
+    words[-1] = last
+    return " ".join(words)
+
+
+def format_amount(value: Fraction, unit: str) -> str:
+    if value.denominator == 1:
+        return str(value.numerator)
+    if unit in ("cup", "tbsp", "tsp", "", "tin", "clove", "slice", "pack", "lb", "oz"):
+        whole, frac = divmod(value, 1)
+        nearest = min(KITCHEN_FRACTIONS, key=lambda f: abs(f - frac))
+        if abs(nearest - frac) < Fraction(1, 50):
+            return f"{whole} {nearest}" if whole else str(nearest)
+    return f"{float(value):.2f}".rstrip("0").rstrip(".")
+
+
+def _display_unit(dimension, base_total, used_units):
+    """
+    Largest unit the recipes themselves used in which the sum is >= 1
+    (so 2 tsp + 1 tsp stays '3 tsp', ½ cup + ¼ cup is '3/4 cup');
+    g/ml totals of 1000+ move up to kg/l.
+    """
+    order = DISPLAY_UNITS[dimension]
+    used = [u for u in order if u in used_units]
+    for unit in order:
+        if unit in used_units or (unit in ("kg", "l") and base_total >= 1000):
+            if base_total / UNIT_CONVERSIONS[unit][1] >= 1:
+                return unit
+    return used[-1] if used else order[-1]
+
 
-    return {"amount": amount, "unit": unit, "item": item, "note": note}
+def aggregate_ingredients(parsed):
+    """
+    Merge parsed ingredient dicts (from parse_ingredient_line) into one
+    shopping list. Lines are grouped by canonical item name and unit
+    dimension; mass/volume amounts are converted, summed and shown in a
+    readable unit; lines without an amount fold into a quantified group
+    for the same item. Returns a list of
+    {"item", "amount", "unit", "quantity", "sources"} in first-seen order.
+    """
+    groups = {}          # (key, dimension) -> state
+    bare = {}            # key -> state for lines without a usable amount
+    for p in parsed:
+        if not p or not p.get("item"):
+            continue
+        key = canonical_item(p["item"])
+        value = parse_amount(p.get("amount", ""))
+        unit = p.get("unit", "")
+        if value is None:
+            state = bare.setdefault(key, {"item": p["item"], "sources": []})
+            state["sources"].append(p.get("raw") or p["item"])
+            continue
+        if unit in UNIT_CONVERSIONS:
+            dimension, factor = UNIT_CONVERSIONS[unit]
+        else:
+            dimension, factor = UNIT_ALIASES.get(unit, unit), Fraction(1)
+        state = groups.setdefault((key, dimension), {
+            "item": p["item"], "total": Fraction(0), "units": set(), "sources": [],
+        })
+        state["total"] += value * factor
+        state["units"].add(UNIT_ALIASES.get(unit, unit))
+        state["sources"].append(p.get("raw") or p["item"])
+
+    quantified = {key for key, _ in groups}
+    out = []
+    for (key, dimension), state in groups.items():
+        if dimension in DISPLAY_UNITS:
+            unit = _display_unit(dimension, state["total"], state["units"])
+            value = state["total"] / UNIT_CONVERSIONS[unit][1]
+        else:
+            unit, value = dimension, state["total"]
+        sources = state["sources"] + bare.get(key, {}).get("sources", [])
+        amount = format_amount(value, unit)
+        out.append({
+            "item": state["item"],
+            "amount": f"{amount} {unit}".strip(),
+            "unit": unit,
+            "quantity": float(value),
+            "sources": sources,
+        })
+    for key, state in bare.items():
+        if key not in quantified:
+            out.append({
+                "item": state["item"], "amount": "", "unit": "", "quantity": None,
+                "sources": state["sources"],
+            })
+    return out
+
+
+def _stored_ingredients(c, recipe_ids):
+    """Parsed rows from recipe_ingredients, in recipe order (no re-parsing)."""
+    ids = list(recipe_ids)
+    if not ids:
+        return []
+    c.execute(f"""
+        SELECT recipe_id, amount, unit, item, note, raw FROM recipe_ingredients
+        WHERE recipe_id IN ({','.join(['?'] * len(ids))})
+        ORDER BY recipe_id, position
+    """, ids)
+    by_recipe = {}
+    for rid, amount, unit, item, note, raw in c.fetchall():
+        by_recipe.setdefault(rid, []).append(
+            {"amount": amount, "unit": unit, "item": item, "note": note, "raw": raw}
+        )
+    return [p for rid in ids for p in by_recipe.get(rid, [])]
 
-def parse_ingredients_block(block: str):
-    """Split on newlines, parse each non-empty line."""
-    lines = (block or "").splitlines()
-    parsed = []
-    for ln in lines:
-        p = parse_ingredient_line(ln)
-        if p:
-            parsed.append(p)
-    return parsed
 
 # ---------------------------
 # Search helpers
@@ -275,15 +1266,19 @@ def parse_ingredients_block(block: str):
 # ---------------------------
 import re
 
+@phase_timer("nlp")
 def recipe_score(query: str, name: str, ingredients: str, method: str) -> float:
     """
     Semantic similarity between query and combined recipe text (0..1).
     Includes the recipe *name* so title-only searches score correctly.
     """
     # Defensive: allow running without spaCy loaded or on very small devices
+    nlp = get_nlp()
+    if nlp is None:
+        return 1.0 if lexical_hit(query, name, ingredients, method) else 0.0
     try:
         q_doc = nlp(query)
-        t_doc = nlp(" ".join([name or "", ingredients or "", method or ""]))
+        t_doc = nlp(recipe_text(name, ingredients, method))
         return q_doc.similarity(t_doc)
     except Exception:
         # If NLP isn't available, fall back to a simple lexical score (0/1)
@@ -301,7 +1296,12 @@ def _tokenize(s: str) -> list[str]:
     return t.split() if t else []
 
 
-def lexical_hit(query: str, name: str, ingredients: str, method: str) -> bool:
+def lexical_text(name: str, ingredients: str, method: str) -> str:
+    """Normalized NAME + INGREDIENTS + METHOD, as matched by lexical_hit()."""
+    return " ".join([_normalize(name), _normalize(ingredients), _normalize(method)]).strip()
+
+
+def lexical_hit(query: str, name: str, ingredients: str, method: str, lemmas=None) -> bool:
     """
     Lexical fallback with better partial matching.
     - Prefix matches: 'pas' -> 'pasta', 'passata', 'pastry'
@@ -309,9 +1309,10 @@ def lexical_hit(query: str, name: str, ingredients: str, method: str) -> bool:
     - Singular-ish fallbacks: 'beans' -> 'bean'
     - Lemma overlap (spaCy), if available
     Searches the combined text of NAME + INGREDIENTS + METHOD.
+    Pass the recipe's precomputed lemma set as `lemmas` to skip the spaCy run.
     """
     q = _normalize(query)
-    text = " ".join([_normalize(name), _normalize(ingredients), _normalize(method)]).strip()
+    text = lexical_text(name, ingredients, method)
 
     if not q or not text:
         return False
@@ -332,143 +1333,1056 @@ def lexical_hit(query: str, name: str, ingredients: str, method: str) -> bool:
         return True
 
     # 4) Lemma overlap if spaCy is available (ignore failures gracefully)
-    try:
-        q_lemmas = {t.lemma_.lower() for t in nlp(query) if t.is_alpha}
-        t_lemmas = {t.lemma_.lower() for t in nlp(text) if t.is_alpha}
-        if q_lemmas and t_lemmas and any(l in t_lemmas for l in q_lemmas):
-            return True
-    except Exception:
-        pass
-
-    return False
-
-from collections import Counter
-import json
-import re
-
-from collections import Counter
-import json
-import re
+    q_lemmas = query_lemmas(query)
+    if not q_lemmas:
+        return False
+    if lemmas is None:
+        nlp = get_nlp()
+        if nlp is None:
+            return False
+        try:
+            lemmas = lemma_set(next(lemma_pipe(nlp, [text])))
+        except Exception:
+            return False
+    return not q_lemmas.isdisjoint(lemmas)
 
-def get_tag_cloud():
-    """Return a dict of {tag: count} for all recipes, cleaned and normalized."""
-    with get_conn() as conn:
-        c = conn.cursor()
-        c.execute("SELECT tags FROM recipes")
-        rows = c.fetchall()
 
-    all_tags = []
-
-    # Common normalizations / synonyms
-    normalize_map = {
-        "soups": "soup",
-        "salads": "salad",
-        "fish & seafood": "seafood",
-        "seafood & fish": "seafood",
-        "pasta dishes": "pasta",
-        "curries": "curry",
-        "desserts": "dessert",
-        "cakes": "cake",
-        "cookies": "cookie",
-        "breads": "bread",
-    }
+# ---------------------------
+# Lemma cache (precomputed per recipe)
+# ---------------------------
+from functools import lru_cache
 
-    for row in rows:
-        raw = row[0]
-        if not raw:
-            continue
+# Components the lemmatizer depends on; everything else is switched off.
+LEMMA_PIPES = ("tok2vec", "tagger", "attribute_ruler", "lemmatizer")
 
-        tags = []
+# In-process copy of recipe_lemmas: {recipe_id: frozenset(lemmas)}, tagged
+# with recipe_lemmas' write counter so other workers' writes show up too.
+_lemma_cache = {"lemmas": None, "version": None}
 
-        # --- Try JSON decode first ---
-        if raw.strip().startswith("["):
-            try:
-                decoded = json.loads(raw)
-                if isinstance(decoded, list):
-                    tags = decoded
-                elif isinstance(decoded, str):
-                    tags = [decoded]
-            except Exception:
-                cleaned = raw.strip("[]'\" ")
-                tags = re.split(r"[,;]", cleaned)
-        else:
-            tags = re.split(r"[,;]", raw)
 
-        # --- Normalize ---
-        cleaned_tags = []
-        for t in tags:
-            t = re.sub(r'[^a-zA-Z0-9 &-]', '', t).strip().lower()
-            if not t:
-                continue
-            # singularize simple plurals (quick heuristic)
-            if t.endswith("s") and len(t) > 3:
-                t = t[:-1]
-            # apply synonym map
-            if t in normalize_map:
-                t = normalize_map[t]
-            cleaned_tags.append(t)
+def lemma_pipe(nlp, texts, batch_size=64):
+    """nlp.pipe() over texts with only the lemmatizer (and its inputs) enabled."""
+    disable = [p for p in nlp.pipe_names if p not in LEMMA_PIPES]
+    return nlp.pipe(texts, batch_size=batch_size, disable=disable)
 
-        all_tags.extend(cleaned_tags)
 
-    counts = Counter(all_tags)
-    return sorted(counts.items(), key=lambda x: x[0])
+def lemma_set(doc) -> frozenset:
+    return frozenset(t.lemma_.lower() for t in doc if t.is_alpha)
 
 
-# ---------------------------
-# Routes
-# ---------------------------
+@lru_cache(maxsize=1024)
+@phase_timer("nlp")
+def query_lemmas(query: str) -> frozenset:
+    """Lemma set for a search query (cached; queries repeat a lot)."""
+    nlp = get_nlp()
+    if nlp is None:
+        return frozenset()
+    try:
+        return lemma_set(next(lemma_pipe(nlp, [query])))
+    except Exception:
+        return frozenset()
 
-@app.route("/recipes")
-def recipe_list_home():
-    # === Load recipes from the database ===
-    rows = get_all_recipes()
-    recipes = [
-        {
-            "id": r[0],
-            "name": r[1],
-            "ingredients": r[2] or "",
-            "method": r[3] or "",
-            "image_url": r[4] or "",
-            "tags": r[5] or ""
-        }
-        for r in rows
-    ]
 
-    # === Load Quick Access tags from tags.json ===
-    from pathlib import Path
-    import json
+def _save_lemmas(conn, pairs):
+    """Persist [(recipe_id, frozenset), ...] into recipe_lemmas."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO recipe_lemmas (recipe_id, lemmas) VALUES (?, ?)",
+        [(rid, " ".join(sorted(lemmas))) for rid, lemmas in pairs],
+    )
+    _lemma_cache["lemmas"] = None
 
-    tags_path = Path("tags.json")
-    quick_access = []
-    all_tags = []
 
-    if tags_path.exists():
-        try:
-            tags_data = json.loads(tags_path.read_text(encoding="utf-8"))
-            quick_access = tags_data.get("Quick Access", [])
-            # combine all tag groups for tag cloud, if you use it
-            for group_tags in tags_data.values():
-                if isinstance(group_tags, list):
-                    all_tags.extend(group_tags)
-        except Exception as e:
-            print("⚠️ Error loading tags.json:", e)
+@phase_timer("nlp")
+def store_recipe_lemmas(conn, recipe_id, name, ingredients, method):
+    """Compute and persist one recipe's lemma set (no-op without spaCy)."""
+    nlp = get_nlp()
+    if nlp is None:
+        return
+    try:
+        doc = next(lemma_pipe(nlp, [lexical_text(name, ingredients, method)]))
+    except Exception as e:
+        print(f"⚠️ Skipped lemmas for recipe {recipe_id}: {e}")
+        return
+    _save_lemmas(conn, [(recipe_id, lemma_set(doc))])
+
+
+def backfill_recipe_lemmas(conn, rebuild_all=False, batch_size=64):
+    """Batch-compute lemma sets for recipes that don't have one yet. Returns count."""
+    nlp = get_nlp()
+    if nlp is None:
+        return 0
+    c = conn.cursor()
+    if rebuild_all:
+        c.execute("SELECT id, name, ingredients, method FROM recipes")
     else:
-        quick_access = ["Favourites", "Easy Lunch"]
+        c.execute("""
+            SELECT id, name, ingredients, method FROM recipes
+            WHERE id NOT IN (SELECT recipe_id FROM recipe_lemmas)
+        """)
+    rows = c.fetchall()
+    if not rows:
+        return 0
+    texts = (lexical_text(n, i, m) for _, n, i, m in rows)
+    docs = lemma_pipe(nlp, texts, batch_size=batch_size)
+    _save_lemmas(conn, [(row[0], lemma_set(doc)) for row, doc in zip(rows, docs)])
+    conn.commit()
+    return len(rows)
 
-    # === Render the page ===
-    return render_template(
-        "recipes.html",
-        recipes=recipes,
-        quick_access=quick_access,
-        all_tags=sorted(set(all_tags))
+
+def load_recipe_lemmas(c) -> dict:
+    version = get_table_version(c, "recipe_lemmas")
+    if _lemma_cache["lemmas"] is None or version is None or version != _lemma_cache["version"]:
+        c.execute("SELECT recipe_id, lemmas FROM recipe_lemmas")
+        _lemma_cache["lemmas"] = {rid: frozenset(text.split()) for rid, text in c.fetchall()}
+        _lemma_cache["version"] = version
+    return _lemma_cache["lemmas"]
+
+
+def search_recipes_lexical(conn, q: str):
+    """
+    Live lexical filter over the whole collection using lexical_hit() with
+    precomputed lemma sets. Rows shaped like search_recipes_fts(), by name.
+    Read-only: recipes without a lemma set (run `flask backfill-lemmas`)
+    still match on prefixes and substrings.
+    """
+    c = conn.cursor()
+    try:
+        lemmas = load_recipe_lemmas(c)
+    except sqlite3.OperationalError:
+        lemmas = {}  # recipe_lemmas not created yet (init_db not run)
+    c.execute("SELECT id, name, ingredients, method, tags FROM recipes ORDER BY name")
+    return [
+        (rid, name, ingredients, tags, None)
+        for rid, name, ingredients, method, tags in c.fetchall()
+        if lexical_hit(q, name, ingredients, method, lemmas=lemmas.get(rid, frozenset()))
+    ]
+
+# ---------------------------
+# Semantic search (precomputed vectors)
+# ---------------------------
+try:
+    import numpy as np
+except ImportError:  # semantic ranking is optional
+    np = None
+
+# In-process copy of recipe_vectors as one normalized float32 matrix.
+# Rebuilt lazily after a vector write here or when recipe_vectors'
+# write counter moves (another worker or the CLI wrote vectors).
+_vector_cache = {"ids": None, "matrix": None, "version": None}
+
+
+def recipe_text(name, ingredients, method) -> str:
+    """The text a recipe is embedded / compared as (name + ingredients + method)."""
+    return " ".join([name or "", ingredients or "", method or ""])
+
+
+def _vector_blob(doc):
+    """float32 bytes of a spaCy doc vector, or None if the model has no vectors."""
+    if np is None or not doc.has_vector:
+        return None
+    vec = np.asarray(doc.vector, dtype=np.float32)
+    if not vec.any():
+        return None
+    return vec.tobytes()
+
+
+@phase_timer("nlp")
+def store_recipe_vector(conn, recipe_id, name, ingredients, method):
+    """Compute and persist one recipe's document vector (no-op without spaCy/NumPy)."""
+    nlp = get_nlp()
+    if np is None or nlp is None:
+        return
+    try:
+        blob = _vector_blob(nlp(recipe_text(name, ingredients, method)))
+    except Exception as e:
+        print(f"⚠️ Skipped vector for recipe {recipe_id}: {e}")
+        return
+    if blob is None:
+        conn.execute("DELETE FROM recipe_vectors WHERE recipe_id = ?", (recipe_id,))
+    else:
+        conn.execute(
+            "INSERT OR REPLACE INTO recipe_vectors (recipe_id, vector) VALUES (?, ?)",
+            (recipe_id, blob),
+        )
+    _vector_cache["matrix"] = None
+
+
+def load_vector_matrix(c):
+    """Return (ids, matrix) with one L2-normalized row per recipe vector."""
+    version = get_table_version(c, "recipe_vectors")
+    if _vector_cache["matrix"] is None or version is None or version != _vector_cache["version"]:
+        c.execute("SELECT recipe_id, vector FROM recipe_vectors ORDER BY recipe_id")
+        rows = c.fetchall()
+        if not rows:
+            return [], None
+        ids = [r[0] for r in rows]
+        matrix = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        _vector_cache["ids"] = ids
+        _vector_cache["matrix"] = matrix / norms
+        _vector_cache["version"] = version
+    return _vector_cache["ids"], _vector_cache["matrix"]
+
+
+@phase_timer("nlp")
+def semantic_search(c, q: str, k: int = 20):
+    """
+    Rank recipes by cosine similarity to the query: one nlp() call for the
+    query, then a single matrix-vector product over all stored vectors.
+    Returns [(recipe_id, score), ...] best first, or None if unavailable.
+    """
+    nlp = get_nlp()
+    if np is None or nlp is None:
+        return None
+    try:
+        q_vec = np.asarray(nlp(q).vector, dtype=np.float32)
+        ids, matrix = load_vector_matrix(c)
+    except Exception:
+        return None
+    q_norm = np.linalg.norm(q_vec)
+    if matrix is None or not q_norm or matrix.shape[1] != q_vec.shape[0]:
+        return None
+
+    scores = matrix @ (q_vec / q_norm)
+    k = max(1, min(k, len(ids)))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(ids[i], float(scores[i])) for i in top]
+
+
+def search_recipes_semantic(c, q: str, k: int = 20):
+    """Rows shaped like search_recipes_fts(), ordered by semantic score."""
+    ranked = semantic_search(c, q, k)
+    if ranked is None:
+        return None
+    ids = [rid for rid, _ in ranked]
+    if not ids:
+        return []
+    c.execute(
+        f"SELECT id, name, ingredients, tags FROM recipes WHERE id IN ({','.join(['?'] * len(ids))})",
+        ids,
+    )
+    by_id = {r[0]: r for r in c.fetchall()}
+    return [(*by_id[rid], None) for rid in ids if rid in by_id]
+
+
+# ---------------------------
+# Full-text search (FTS5)
+# ---------------------------
+from markupsafe import Markup, escape
+
+# bm25 column weights: name, ingredients, method, tags, notes
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 6.0, 1.0)
+SNIPPET_OPEN, SNIPPET_CLOSE = "\x02", "\x03"
+
+
+def fts_query(q: str):
+    """
+    Turn free text into an FTS5 MATCH expression.
+    Every word becomes a quoted prefix term ('pas' -> "pas"*), ANDed together,
+    so user input can never produce an FTS syntax error.
+    """
+    words = re.findall(r"\w+", (q or "").lower())
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def highlight_snippet(raw):
+    """Escape an FTS snippet and turn the sentinel markers into <mark> tags."""
+    if not raw:
+        return ""
+    html = str(escape(raw))
+    html = html.replace(SNIPPET_OPEN, "<mark>").replace(SNIPPET_CLOSE, "</mark>")
+    return Markup(html)
+
+
+def search_recipes_fts(c, q: str):
+    """
+    Ranked full-text search. Returns rows of
+    (id, name, ingredients, tags, snippet_html), best match first.
+    Raises sqlite3.OperationalError if the FTS index is unavailable.
+    """
+    match = fts_query(q)
+    if not match:
+        return []
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    c.execute(f"""
+        SELECT r.id, r.name, r.ingredients, r.tags,
+               snippet(recipes_fts, -1, ?, ?, '…', 10)
+        FROM recipes_fts
+        JOIN recipes r ON r.id = recipes_fts.rowid
+        WHERE recipes_fts MATCH ?
+        ORDER BY bm25(recipes_fts, {weights})
+    """, (SNIPPET_OPEN, SNIPPET_CLOSE, match))
+    return [(*row[:4], highlight_snippet(row[4])) for row in c.fetchall()]
+
+
+from collections import Counter
+import json
+import re
+
+# Common normalizations / synonyms
+TAG_SYNONYMS = {
+    "soups": "soup",
+    "salads": "salad",
+    "fish & seafood": "seafood",
+    "seafood & fish": "seafood",
+    "pasta dishes": "pasta",
+    "curries": "curry",
+    "desserts": "dessert",
+    "cakes": "cake",
+    "cookies": "cookie",
+    "breads": "bread",
+}
+
+
+def split_tags(raw) -> list:
+    """Split a recipes.tags value (JSON array or comma/semicolon list) into raw tags."""
+    if not raw:
+        return []
+
+    # --- Try JSON decode first ---
+    if raw.strip().startswith("["):
+        try:
+            decoded = json.loads(raw)
+            if isinstance(decoded, list):
+                return [str(t) for t in decoded]
+            elif isinstance(decoded, str):
+                return [decoded]
+            return []
+        except Exception:
+            cleaned = raw.strip("[]'\" ")
+            return re.split(r"[,;]", cleaned)
+    return re.split(r"[,;]", raw)
+
+
+def normalize_tag(t: str) -> str:
+    """Canonical tag slug: 'Pasta Dishes' / 'Soups' → 'pasta' / 'soup'. '' if empty."""
+    t = re.sub(r'[^a-zA-Z0-9 &-]', '', t or "").strip().lower()
+    if not t:
+        return ""
+    # singularize simple plurals (quick heuristic)
+    if t.endswith("s") and len(t) > 3:
+        t = t[:-1]
+    # apply synonym map
+    return TAG_SYNONYMS.get(t, t)
+
+
+def normalize_tags(raw) -> list:
+    """All normalized tags of a recipes.tags value, in order (may repeat)."""
+    return [slug for slug in (normalize_tag(t) for t in split_tags(raw)) if slug]
+
+
+def compute_tag_counts(rows) -> Counter:
+    """{tag: number of recipes carrying it}, from scratch over (tags,) rows."""
+    counts = Counter()
+    for row in rows:
+        counts.update(set(normalize_tags(row[0])))
+    return counts
+
+
+@phase_timer("tags")
+def get_tag_cloud():
+    """Return a sorted list of (tag, count) for all recipes, cleaned and normalized."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        try:
+            # O(distinct tags): counts are kept current by triggers on recipe_tags
+            c.execute("""
+                SELECT t.slug, tc.n
+                FROM tag_counts tc
+                JOIN tags t ON t.id = tc.tag_id
+                WHERE tc.n > 0
+                ORDER BY t.slug
+            """)
+            return c.fetchall()
+        except sqlite3.OperationalError:
+            # tag_counts missing (init_db not run yet) → full recount
+            c.execute("SELECT tags FROM recipes")
+            counts = compute_tag_counts(c.fetchall())
+    return sorted(counts.items(), key=lambda x: x[0])
+
+
+# ---------------------------
+# recipe_tags join table
+# ---------------------------
+TAG_COUNTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tag_counts (
+        tag_id INTEGER PRIMARY KEY,
+        n INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS tag_counts_ai AFTER INSERT ON recipe_tags BEGIN
+        INSERT INTO tag_counts (tag_id, n) VALUES (new.tag_id, 1)
+        ON CONFLICT(tag_id) DO UPDATE SET n = n + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS tag_counts_ad AFTER DELETE ON recipe_tags BEGIN
+        UPDATE tag_counts SET n = n - 1 WHERE tag_id = old.tag_id;
+    END;
+"""
+
+
+def rebuild_tag_counts(conn):
+    """Recompute tag_counts from recipe_tags."""
+    conn.execute("DELETE FROM tag_counts")
+    conn.execute("""
+        INSERT INTO tag_counts (tag_id, n)
+        SELECT tag_id, COUNT(*) FROM recipe_tags GROUP BY tag_id
+    """)
+
+def tag_id_for(c, slug: str) -> int:
+    """Id of the tags row for a normalized slug, creating an ungrouped row if needed."""
+    c.execute("SELECT id FROM tags WHERE slug = ? ORDER BY id LIMIT 1", (slug,))
+    row = c.fetchone()
+    if row:
+        return row[0]
+    c.execute("INSERT INTO tags (tag_group, name, slug) VALUES (NULL, ?, ?)", (slug, slug))
+    return c.lastrowid
+
+
+def sync_recipe_tags(conn, recipe_id, raw_tags):
+    """Rewrite recipe_tags for one recipe from its recipes.tags value."""
+    c = conn.cursor()
+    tag_ids = {tag_id_for(c, slug) for slug in normalize_tags(raw_tags)}
+    c.execute("DELETE FROM recipe_tags WHERE recipe_id = ?", (recipe_id,))
+    c.executemany(
+        "INSERT INTO recipe_tags (recipe_id, tag_id) VALUES (?, ?)",
+        [(recipe_id, tid) for tid in tag_ids],
     )
 
 
+def search_recipes_by_tags(c, tags, match_all=True):
+    """
+    Indexed tag filter. `tags` are raw tag strings (normalized here);
+    match_all=True → recipes carrying every tag, False → any of them.
+    Rows shaped like search_recipes_fts(), by name.
+    """
+    slugs = sorted({normalize_tag(t) for t in tags} - {""})
+    if not slugs:
+        return []
+    marks = ",".join(["?"] * len(slugs))
+    having = "HAVING COUNT(DISTINCT t.slug) = ?" if match_all else ""
+    params = [*slugs, len(slugs)] if match_all else slugs
+    c.execute(f"""
+        SELECT r.id, r.name, r.ingredients, r.tags, NULL
+        FROM tags t
+        JOIN recipe_tags rt ON rt.tag_id = t.id
+        JOIN recipes r ON r.id = rt.recipe_id
+        WHERE t.slug IN ({marks})
+        GROUP BY r.id
+        {having}
+        ORDER BY r.name
+    """, params)
+    return c.fetchall()
+
+
+# ---------------------------
+# Page cache (rendered GET responses, invalidated by a data version)
+# ---------------------------
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import session
+from werkzeug.http import is_hop_by_hop_header
+
+PAGE_CACHE_SIZE = int(os.environ.get("RECIPES_PAGE_CACHE", "256"))    # 0 disables
+PAGE_CACHE_TTL = float(os.environ.get("RECIPES_PAGE_CACHE_TTL", "300"))
+
+
+class TTLCache:
+    """Thread-safe LRU of at most `maxsize` entries, each valid for `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+page_cache = TTLCache(PAGE_CACHE_SIZE, PAGE_CACHE_TTL)
+
+
+def get_data_version(c):
+    """
+    Counter bumped on every write that can change a cached page. It lives in
+    the DB, so a write in one worker process invalidates every process's cache.
+    """
+    try:
+        c.execute("SELECT value FROM app_meta WHERE key = 'data_version'")
+        row = c.fetchone()
+    except sqlite3.OperationalError:
+        return None  # app_meta not created yet: don't cache
+    return row[0] if row else 0
+
+
+# table -> app_meta key counting its writes (see init_db)
+TABLE_VERSION_KEYS = {
+    "recipe_vectors": "vectors_version",
+    "recipe_lemmas": "lemmas_version",
+    "image_cache": "thumbs_version",
+}
+
+
+def get_table_version(c, table):
+    """Write counter of one TABLE_VERSION_KEYS table; None if not set up (don't cache)."""
+    try:
+        c.execute("SELECT value FROM app_meta WHERE key = ?", (TABLE_VERSION_KEYS[table],))
+        row = c.fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def bump_data_version(conn=None):
+    """Bump data_version in the caller's transaction (or its own, if no conn given)."""
+    if conn is None:
+        with get_conn() as own:
+            return bump_data_version(own)
+    try:
+        conn.execute("""
+            INSERT INTO app_meta (key, value) VALUES ('data_version', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """)
+    except sqlite3.OperationalError as e:
+        print("⚠️ Could not bump data_version:", e)
+
+
+def cacheable_headers(response):
+    """The view's headers worth replaying on a hit (no hop-by-hop, length or cookies)."""
+    return [
+        (name, value) for name, value in response.headers.items()
+        if not is_hop_by_hop_header(name) and name.lower() not in ("content-length", "set-cookie")
+    ]
+
+
+def cached_view(view=None, *, thumbs=False):
+    """
+    Serve a GET view from page_cache. Entries are keyed on the data version,
+    tags.json signature, path and query string, so any recipe/tag write makes
+    old entries unreachable; they age out of the LRU on their own. Hits carry
+    the view's headers and ETag and answer If-None-Match with a 304; responses
+    that set a cookie are never cached.
+    @cached_view(thumbs=True) also keys on image_cache writes, for pages that
+    show thumbnails; other pages don't notice a thumbnail being finished.
+    """
+    if view is None:
+        return lambda view: cached_view(view, thumbs=thumbs)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET" or page_cache.maxsize <= 0:
+            return view(*args, **kwargs)
+        with get_conn() as conn:
+            c = conn.cursor()
+            version = get_data_version(c)
+            thumbs_version = get_table_version(c, "image_cache") if thumbs else 0
+        if version is None or thumbs_version is None:
+            return view(*args, **kwargs)
+
+        # tags.json is part of the key too, so hand edits show up without a restart
+        key = (
+            version, thumbs_version, tags_json_signature(),
+            request.script_root, request.path, tuple(sorted(request.args.items(multi=True))),
+        )
+        hit = page_cache.get(key)
+        if hit is not None:
+            body, status, headers = hit
+            response = app.response_class(body, status=status, headers=headers)
+            response.headers["X-Cache"] = "HIT"
+            return response.make_conditional(request)
+
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            if not response.get_etag()[0]:
+                response.add_etag()
+            if "Set-Cookie" not in response.headers and not session.modified:
+                page_cache.set(key, (response.get_data(), response.status_code, cacheable_headers(response)))
+        response.headers["X-Cache"] = "MISS"
+        return response.make_conditional(request)
+
+    return wrapper
+
+
+@app.route("/admin/cache", methods=["GET", "POST"])
+@admin_required
+def admin_cache():
+    """Page cache hit/miss counters; POST empties it."""
+    if request.method == "POST":
+        page_cache.clear()
+    with get_conn() as conn:
+        version = get_data_version(conn.cursor())
+    return jsonify({**page_cache.stats(), "data_version": version})
+
+
+# ---------------------------
+# Image thumbnails
+# ---------------------------
+# Recipe images are fetched (or uploaded) once, resized into WebP + JPEG
+# variants on disk and served from /thumbs with year-long cache headers.
+# Files are named after the SHA-256 of the source image, so identical
+# images share files and a URL never changes meaning.
+import hashlib
+import http.client
+import io
+import ipaddress
+import queue
+import socket
+import urllib.parse
+import urllib.request
+from flask import send_from_directory
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # thumbnails are optional; templates fall back to the original URL
+    Image = None
+
+THUMB_DIR = Path(os.environ.get("RECIPES_THUMB_DIR", Path(__file__).with_name("thumb_cache")))
+THUMB_MAX_BYTES = 10 * 1024 * 1024
+THUMB_FETCH_TIMEOUT = 15
+THUMB_RETRY_MIN = int(os.environ.get("RECIPES_THUMB_RETRY_MIN", "30"))  # failed fetches retried after this
+THUMB_NAME_RE = re.compile(r"^[0-9a-f]{64}(?:-\d+)?\.(?:webp|jpg|png|gif)$")
+
+# view -> (widths in px, <img sizes>); list rows show a 48px thumb,
+# the detail page a 220px image (widths cover 1x–3x screens)
+THUMB_SIZES = {
+    "list": ((96, 144), "48px"),
+    "detail": ((240, 480, 720), "220px"),
+}
+THUMB_WIDTHS = sorted({w for widths, _ in THUMB_SIZES.values() for w in widths})
+
+
+def thumbs_enabled():
+    return Image is not None
+
+
+# Image URLs come from recipe forms, so fetches must not reach the Pi's own
+# services or the LAN: the host has to resolve to public addresses only,
+# every redirect is checked the same way, and the connected peer is checked
+# again (the name could resolve differently a moment later). No proxies.
+def check_public_host(host):
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"cannot resolve {host!r}: {e}")
+    for info in infos:
+        check_public_address(info[4][0])
+
+
+def check_public_address(addr):
+    ip = ipaddress.ip_address(addr.split("%", 1)[0])
+    if not ip.is_global or ip.is_multicast:
+        raise ValueError(f"image host address {ip} is not public")
+
+
+def check_public_url(url):
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"unsupported image URL: {url!r}")
+    check_public_host(parts.hostname)
+
+
+def _public_create_connection(address, *args, **kwargs):
+    sock = socket.create_connection(address, *args, **kwargs)
+    try:
+        check_public_address(sock.getpeername()[0])
+    except ValueError:
+        sock.close()
+        raise
+    return sock
+
+
+class _PublicPeerMixin:
+    # checked on the bare TCP socket, before any request or TLS hello is sent
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_create_connection
+
+
+class PublicHTTPConnection(_PublicPeerMixin, http.client.HTTPConnection):
+    pass
+
+
+class PublicHTTPSConnection(_PublicPeerMixin, http.client.HTTPSConnection):
+    pass
+
+
+class PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(PublicHTTPConnection, req)
+
+
+class PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(PublicHTTPSConnection, req, **kwargs)
+
+
+class PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_public_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+image_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), PublicHTTPHandler, PublicHTTPSHandler, PublicRedirectHandler,
+)
+
+
+def upload_name(source):
+    """File name in THUMB_DIR for an uploaded image's URL (…/thumbs/<name>), else None."""
+    if not source.startswith("/") or "/thumbs/" not in source:
+        return None
+    name = source.rsplit("/thumbs/", 1)[1]
+    return name if THUMB_NAME_RE.match(name) else None
+
+
+def read_image_source(source, allow_files=False):
+    """
+    Bytes of an image_url. http(s) URLs on public hosts are downloaded;
+    …/thumbs/ URLs (uploads) are read from THUMB_DIR; plain paths / file://
+    only when allow_files (CLI use — never for URLs that came in over HTTP).
+    """
+    if source.startswith(("http://", "https://")):
+        check_public_url(source)
+        req = urllib.request.Request(source, headers={"User-Agent": "SalimasRecipes/1.0"})
+        with image_opener.open(req, timeout=THUMB_FETCH_TIMEOUT) as resp:
+            data = resp.read(THUMB_MAX_BYTES + 1)
+    elif upload_name(source):
+        data = (THUMB_DIR / upload_name(source)).read_bytes()
+    elif allow_files:
+        data = Path(source[len("file://"):] if source.startswith("file://") else source).read_bytes()
+    else:
+        raise ValueError(f"unsupported image source: {source!r}")
+    if len(data) > THUMB_MAX_BYTES:
+        raise ValueError("image larger than THUMB_MAX_BYTES")
+    return data
+
+
+def _write_atomic(path, save):
+    # unique temp name: other workers / the CLI may be writing the same variant
+    f = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False)
+    try:
+        with f:
+            save(f)
+        os.replace(f.name, path)
+    except BaseException:
+        Path(f.name).unlink(missing_ok=True)
+        raise
+
+
+def make_thumbnails(data):
+    """
+    Resize image bytes into every THUMB_WIDTHS variant (never upscaling).
+    Returns (digest, widths, formats); files that already exist are skipped.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    THUMB_DIR.mkdir(parents=True, exist_ok=True)
+    formats = ["webp", "jpg"] if features.check("webp") else ["jpg"]
+
+    with Image.open(io.BytesIO(data)) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA")
+            flat = Image.new("RGB", im.size, (255, 255, 255))
+            flat.paste(im, mask=im.getchannel("A"))
+            im = flat
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+
+        widths = [w for w in THUMB_WIDTHS if w <= im.width] or [im.width]
+        for w in widths:
+            variant = None
+            for fmt in formats:
+                path = THUMB_DIR / f"{digest}-{w}.{fmt}"
+                if path.exists():
+                    continue
+                if variant is None:
+                    variant = im.resize((w, max(1, round(im.height * w / im.width))), Image.LANCZOS)
+                if fmt == "webp":
+                    _write_atomic(path, lambda f: variant.save(f, "WEBP", quality=80, method=4))
+                else:
+                    _write_atomic(path, lambda f: variant.save(f, "JPEG", quality=82, optimize=True, progressive=True))
+    return digest, widths, formats
+
+
+def process_image_source(conn, source, allow_files=False):
+    """Fetch + thumbnail one image_url and record the outcome in image_cache."""
+    try:
+        digest, widths, formats = make_thumbnails(read_image_source(source, allow_files))
+    except Exception as e:
+        conn.execute("""
+            INSERT INTO image_cache (source, status, error, updated_at)
+            VALUES (?, 'error', ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source) DO UPDATE SET
+                status = 'error', error = excluded.error, updated_at = CURRENT_TIMESTAMP
+        """, (source, str(e)[:500]))
+        conn.commit()
+        return False
+    conn.execute("""
+        INSERT INTO image_cache (source, digest, widths, formats, status, error, updated_at)
+        VALUES (?, ?, ?, ?, 'ready', NULL, CURRENT_TIMESTAMP)
+        ON CONFLICT(source) DO UPDATE SET
+            digest = excluded.digest, widths = excluded.widths, formats = excluded.formats,
+            status = 'ready', error = NULL, updated_at = CURRENT_TIMESTAMP
+    """, (source, digest, ",".join(map(str, widths)), ",".join(formats)))
+    conn.commit()  # image_cache's trigger moves thumbs_version: thumbnail pages re-render
+    return True
+
+
+class ThumbnailWorker:
+    """
+    Single background thread that generates thumbnails, so requests never
+    wait on a download or a resize. Started on first use (and again after
+    a fork); sources already queued are not queued twice.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, source):
+        if not thumbs_enabled() or not source:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue, self._queued, self._thread = queue.Queue(), set(), None
+                self._pid = os.getpid()
+            if source in self._queued:
+                return
+            self._queued.add(source)
+            self._queue.put(source)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="thumbnailer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            source = self._queue.get()
+            try:
+                process_image_source(get_conn(), source)
+            except Exception as e:
+                print(f"⚠️ Thumbnail failed for {source}: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(source)
+
+    def join(self, timeout=None):
+        """Wait for the queue to drain (CLI / benchmarks)."""
+        deadline = time.monotonic() + (timeout or 1e9)
+        while self._queued and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+thumbnailer = ThumbnailWorker()
+
+
+def _srcset(row, kind):
+    digest, widths, formats = row
+    have = [int(w) for w in widths.split(",")]
+    wanted, sizes = THUMB_SIZES[kind]
+    picked = [w for w in have if w in wanted] or have[:1]
+    fmts = formats.split(",")
+    out = {"sizes": sizes, "src": url_for("thumb_file", name=f"{digest}-{picked[0]}.jpg")}
+    for fmt in fmts:
+        out["webp" if fmt == "webp" else "jpeg"] = ", ".join(
+            f"{url_for('thumb_file', name=f'{digest}-{w}.{fmt}')} {w}w" for w in picked
+        )
+    return out
+
+
+def lookup_thumbs(c, urls, kind):
+    """
+    {image_url: srcset dict} for the urls whose thumbnails are ready (one
+    query). Unknown urls, and ones that failed over THUMB_RETRY_MIN minutes
+    ago, are handed to the background worker; until it finishes, templates
+    keep using the original image_url.
+    """
+    urls = list({u for u in urls if u})
+    if not urls or not thumbs_enabled():
+        return {}
+    marks = ",".join("?" * len(urls))
+    try:
+        c.execute(f"""
+            SELECT source, status, digest, widths, formats,
+                   status = 'error' AND updated_at < datetime('now', ?) AS retry
+            FROM image_cache WHERE source IN ({marks})
+        """, [f"-{THUMB_RETRY_MIN} minutes", *urls])
+        rows = {r[0]: r for r in c.fetchall()}
+    except sqlite3.OperationalError:
+        return {}  # image_cache not created yet
+    found = {}
+    for url in urls:
+        row = rows.get(url)
+        if row is None or row[5]:
+            thumbnailer.submit(url)
+        elif row[1] == "ready":
+            found[url] = _srcset(row[2:5], kind)
+    return found
+
+
+@app.template_global()
+def thumb_srcset(image_url, kind="detail"):
+    """Jinja: srcset dict for image_url, or None (use the original URL)."""
+    if not image_url:
+        return None
+    with get_conn() as conn:
+        return lookup_thumbs(conn.cursor(), [image_url], kind).get(image_url)
+
+
+@app.route("/thumbs/<name>")
+def thumb_file(name):
+    # content-addressed: the bytes behind a name never change
+    if not THUMB_NAME_RE.match(name):
+        abort(404)
+    response = send_from_directory(THUMB_DIR, name, max_age=31536000)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+@app.route("/api/images", methods=["POST"])
+def api_upload_image():
+    """
+    Upload an image (multipart field "image"). Stored content-addressed in
+    THUMB_DIR; returns {"image_url": "<root>/thumbs/<sha256>.<ext>"} for
+    the recipe form. Thumbnails are generated in the background.
+    """
+    if not thumbs_enabled():
+        return jsonify({"error": "Image uploads need Pillow installed"}), 503
+    upload = request.files.get("image")
+    if upload is None:
+        return jsonify({"error": "No image uploaded"}), 400
+    data = upload.read(THUMB_MAX_BYTES + 1)
+    if len(data) > THUMB_MAX_BYTES:
+        return jsonify({"error": "Image too large"}), 413
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            ext = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}.get(im.format)
+    except Exception:
+        ext = None
+    if ext is None:
+        return jsonify({"error": "Unsupported image type"}), 400
+
+    THUMB_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+    path = THUMB_DIR / name
+    if not path.exists():
+        _write_atomic(path, lambda f: f.write(data))
+    image_url = url_for("thumb_file", name=name)
+    thumbnailer.submit(image_url)
+    return jsonify({"image_url": image_url}), 201
+
+
+# ---------------------------
+# Recipe listing (keyset pagination)
+# ---------------------------
+import base64
+
+RECIPE_PAGE_SIZE = int(os.environ.get("RECIPES_PAGE_SIZE", "40"))
+RECIPE_PAGE_MAX = 100
+
+# sort -> (WHERE clause after the cursor, ORDER BY); both served by an index
+RECIPE_SORTS = {
+    "id": ("id < ?", "id DESC"),
+    "name": (
+        "name COLLATE NOCASE >= ? AND (name COLLATE NOCASE > ? OR id > ?)",
+        "name COLLATE NOCASE, id",
+    ),
+}
 
 
+def encode_recipe_cursor(sort, row):
+    """Opaque cursor pointing just past `row` (id, name) in the given order."""
+    if sort == "id":
+        return str(row[0])
+    raw = json.dumps([row[1], row[0]], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_recipe_cursor(sort, cursor):
+    """Inverse of encode_recipe_cursor; None for the first page, ValueError if malformed."""
+    if not cursor:
+        return None
+    if sort == "id":
+        return (int(cursor),)
+    try:
+        name, recipe_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError(f"bad cursor: {cursor!r}")
+    return (name, name, int(recipe_id))
+
+
+def list_recipes(c, sort="id", cursor=None, limit=RECIPE_PAGE_SIZE):
+    """
+    One page of (id, name, image_url) rows — only what the list view shows,
+    so the cost of a page doesn't grow with the notebook. Returns
+    (rows, next_cursor); next_cursor is None on the last page.
+    """
+    where, order = RECIPE_SORTS[sort]
+    sql = f"SELECT id, name, image_url FROM recipes {'WHERE ' + where if cursor else ''} ORDER BY {order} LIMIT ?"
+    c.execute(sql, (*(cursor or ()), limit + 1))
+    rows = c.fetchall()
+    next_cursor = encode_recipe_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+# ---------------------------
+# Routes
+# ---------------------------
+
+@app.route("/recipes")
+@cached_view(thumbs=True)
+def recipe_list_home():
+    """A–Z listing; same page as /, keyset-paginated by name."""
+    return render_recipe_listing("name", listing_title="All recipes A–Z")
 
 
 @app.route("/recipe/<int:recipe_id>")
+@cached_view(thumbs=True)
 def recipe_detail(recipe_id):
     row = get_recipe(recipe_id)
     if not row:
@@ -480,18 +2394,13 @@ def recipe_detail(recipe_id):
         created_at, updated_at
     ) = row
 
-    import json
     try:
-        if ingredients and ingredients.strip().startswith("["):
-            ingredients_parsed = json.loads(ingredients)
-            if isinstance(ingredients_parsed, str):
-                ingredients_parsed = json.loads(ingredients_parsed)
-        else:
-            text = (ingredients or "").replace(",", "\n")
-            ingredients_parsed = [i.strip() for i in text.splitlines() if i.strip()]
-    except Exception:
-        text = (ingredients or "").replace(",", "\n").replace("[", "").replace("]", "").replace('"', "")
-        ingredients_parsed = [i.strip() for i in text.splitlines() if i.strip()]
+        with get_conn() as conn:
+            ingredients_parsed = get_ingredient_lines(conn.cursor(), [rid]).get(rid)
+    except sqlite3.OperationalError:
+        ingredients_parsed = None  # recipe_ingredients not created yet
+    if not ingredients_parsed:
+        ingredients_parsed = ingredient_lines(ingredients)
 
     return render_template(
         "recipe_detail.html",
@@ -626,66 +2535,124 @@ def admin_tags():
 
 
 @app.route("/")
+@cached_view(thumbs=True)
 def index():
+    # newest first, one page at a time (?cursor= for the next page)
+    return render_recipe_listing("id")
+
+
+def render_recipe_listing(sort, listing_title=None):
+    default_tag = "chicken"
     with get_conn() as conn:
         c = conn.cursor()
-        default_tag = "chicken"
-        # Show all recipes, newest first
-        c.execute("SELECT id, name, ingredients FROM recipes ORDER BY id DESC")
-        recipes = c.fetchall()
+        try:
+            cursor = decode_recipe_cursor(sort, request.args.get("cursor"))
+        except ValueError:
+            abort(400)
+        recipes, next_cursor = list_recipes(c, sort, cursor)
+        thumbs = lookup_thumbs(c, [r[2] for r in recipes], "list")
 
         # Load tag counts for the tag cloud
         tag_cloud = get_tag_cloud()
 
-    # ✅ Load Quick Access tags from tags.json
-    from pathlib import Path
-    import json
-
-    tags_path = Path("tags.json")
-    quick_access = []
-
-    if tags_path.exists():
-        try:
-            tags_data = json.loads(tags_path.read_text(encoding="utf-8"))
-            quick_access = tags_data.get("Quick Access", [])
-        except Exception as e:
-            print("⚠️ Error loading tags.json:", e)
+    # ✅ Quick Access tags from tags.json
+    quick_access = load_tags_json().get("Quick Access", [])
 
     return render_template(
         "index.html",
         recipes=recipes,
         tag_cloud=tag_cloud,
         default_tag=default_tag,
-        quick_access=quick_access
+        quick_access=quick_access,
+        listing_title=listing_title,
+        thumbs={r[0]: thumbs[r[2]] for r in recipes if r[2] in thumbs},
+        sort=sort,
+        next_cursor=next_cursor,
     )
 
 
+@app.route("/api/recipes")
+@cached_view(thumbs=True)
+def api_recipes():
+    """
+    One page of the recipe listing as JSON (infinite scroll).
+      ?sort=id    newest first (default)
+      ?sort=name  A–Z
+      ?cursor=    the "next" value of the previous page
+      ?limit=     page size, max RECIPE_PAGE_MAX
+    """
+    sort = request.args.get("sort", "id")
+    if sort not in RECIPE_SORTS:
+        return jsonify({"error": "sort must be 'id' or 'name'"}), 400
+    try:
+        cursor = decode_recipe_cursor(sort, request.args.get("cursor"))
+        limit = int(request.args.get("limit", RECIPE_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit"}), 400
+    limit = max(1, min(limit, RECIPE_PAGE_MAX))
+
+    with get_conn() as conn:
+        c = conn.cursor()
+        rows, next_cursor = list_recipes(c, sort, cursor, limit)
+        thumbs = lookup_thumbs(c, [r[2] for r in rows], "list")
+    return jsonify({
+        "recipes": [
+            {"id": r[0], "name": r[1], "url": url_for("recipe_detail", recipe_id=r[0]), "thumb": thumbs.get(r[2])}
+            for r in rows
+        ],
+        "next": next_cursor,
+    })
+
+
 @app.route("/search")
+@cached_view
 def search():
     q = request.args.get("q", "").strip()
-    tag = request.args.get("tag", "").strip()
+    tags = [t.strip() for t in request.args.getlist("tag") if t.strip()]
+    tag = " + ".join(tags)
+    match_all = request.args.get("match", "all") != "any"
+    mode = request.args.get("mode", "").strip()
     results = []
 
     with get_conn() as conn:
         c = conn.cursor()
+        semantic = None
+        if q and mode == "semantic":
+            k = request.args.get("k", 20, type=int)
+            semantic = search_recipes_semantic(c, q, k)
+
         # Decide what to filter by
-        if q:
-            c.execute("""
-                SELECT id, name, ingredients, tags
-                FROM recipes
-                WHERE name LIKE ? OR ingredients LIKE ? OR tags LIKE ?
-                ORDER BY name
-            """, (f"%{q}%", f"%{q}%", f"%{q}%"))
-        elif tag:
-            c.execute("""
-                SELECT id, name, ingredients, tags
-                FROM recipes
-                WHERE tags LIKE ?
-                ORDER BY name
-            """, (f"%{tag}%",))
+        if semantic is not None:
+            results = semantic
+        elif q and mode == "lexical":
+            results = search_recipes_lexical(conn, q)
+        elif q:
+            try:
+                results = search_recipes_fts(c, q)
+            except sqlite3.OperationalError:
+                # FTS index missing (init_db not run yet) → old LIKE scan
+                c.execute("""
+                    SELECT id, name, ingredients, tags, NULL
+                    FROM recipes
+                    WHERE name LIKE ? OR ingredients LIKE ? OR tags LIKE ?
+                    ORDER BY name
+                """, (f"%{q}%", f"%{q}%", f"%{q}%"))
+                results = c.fetchall()
+        elif tags:
+            try:
+                results = search_recipes_by_tags(c, tags, match_all=match_all)
+            except sqlite3.OperationalError:
+                # recipe_tags missing (init_db not run yet) → old LIKE scan
+                c.execute("""
+                    SELECT id, name, ingredients, tags, NULL
+                    FROM recipes
+                    WHERE tags LIKE ?
+                    ORDER BY name
+                """, (f"%{tags[0]}%",))
+                results = c.fetchall()
         else:
-            c.execute("SELECT id, name, ingredients, tags FROM recipes ORDER BY name")
-        results = c.fetchall()
+            c.execute("SELECT id, name, ingredients, tags, NULL FROM recipes ORDER BY name")
+            results = c.fetchall()
 
                 # For the tag cloud on search pages
         tag_cloud = get_tag_cloud()
@@ -707,49 +2674,29 @@ def planner():
 
 
 
-@app.route("/api/selected")
-def api_selected():
-    """Return recipe info + ingredients for given IDs (used by planner_v3)."""
-    import json
+def selected_meals(c, id_list, detail_url):
+    """
+    Recipe info + ingredient lines for the planner. `detail_url(rid)` builds
+    the internal recipe link (url_for in Flask, a plain path in asgi.py).
+    """
+    q = f"SELECT id, name, ingredients, linked_recipe FROM recipes WHERE id IN ({','.join(['?'] * len(id_list))})"
+    c.execute(q, id_list)
+    rows = c.fetchall()
 
-    ids = request.args.get("ids", "")
-    if not ids:
-        return {"meals": []}
-
-    id_list = [i for i in ids.split(",") if i.isdigit()]
-    if not id_list:
-        return {"meals": []}
-
-    with get_conn() as conn:
-        c = conn.cursor()
-        q = f"SELECT id, name, ingredients, linked_recipe FROM recipes WHERE id IN ({','.join(['?'] * len(id_list))})"
-        c.execute(q, id_list)
-        rows = c.fetchall()
+    try:
+        parsed = get_ingredient_lines(c, [r[0] for r in rows])
+    except sqlite3.OperationalError:
+        parsed = {}  # recipe_ingredients not created yet
 
     meals = []
     for rid, name, ing_text, linked_recipe in rows:
-        try:
-            if ing_text and ing_text.strip().startswith("["):
-                ingredients = json.loads(ing_text)
-                if isinstance(ingredients, str):
-                    ingredients = json.loads(ingredients)
-            else:
-                text = (ing_text or "").replace(",", "\n")
-                ingredients = [i.strip() for i in text.splitlines() if i.strip()]
-        except Exception:
-            text = (ing_text or "").replace(",", "\n").replace("[", "").replace("]", "").replace('"', "")
-            ingredients = [i.strip() for i in text.splitlines() if i.strip()]
-
-        if isinstance(ingredients, list):
-            ingredients = [str(i).strip() for i in ingredients]
-        else:
-            ingredients = [str(ingredients).strip()]
+        ingredients = parsed.get(rid) or ingredient_lines(ing_text)
 
         # ✅ Prefer external link if available
         if linked_recipe and linked_recipe.startswith("http"):
             recipe_url = linked_recipe
         else:
-            recipe_url = url_for("recipe_detail", recipe_id=rid)
+            recipe_url = detail_url(rid)
 
         meals.append({
             "id": rid,
@@ -757,99 +2704,441 @@ def api_selected():
             "url": recipe_url,
             "ingredients": ingredients
         })
+    return meals
 
-    return {"meals": meals}
 
-# === Shared Shopping List API ===
+def selected_ids(raw):
+    """"3,8,x" → ["3", "8"] (the ?ids= parameter of /api/selected)."""
+    return [i for i in (raw or "").split(",") if i.isdigit()]
 
-@app.route("/api/shopping_list", methods=["GET"])
-def api_get_shopping_list():
-    rows = query_db(
-        "SELECT category, name, checked, note FROM shopping_list ORDER BY category, name;"
-    )
-    return jsonify([dict(r) for r in rows])
 
-@app.route("/api/shopping_list", methods=["POST"])
-def api_save_shopping_list():
-    data = request.get_json(force=True)
-    if not isinstance(data, list):
-        return jsonify({"error": "Invalid data"}), 400
-
-    if not data:
-        return jsonify({"error": "Empty list received; nothing saved."}), 400
-
-    db = get_db()
+@app.route("/api/selected")
+def api_selected():
+    """Return recipe info + ingredients for given IDs (used by planner_v3)."""
+    id_list = selected_ids(request.args.get("ids", ""))
+    if not id_list:
+        return {"meals": []}
 
-    # ✅ Instead of deleting everything, replace items in-place
-    for item in data:
-        db.execute(
-    """
-    INSERT INTO shopping_list (category, name, checked, note)
-    VALUES (?, ?, ?, ?)
-    ON CONFLICT(category, name) DO UPDATE SET
-      checked = excluded.checked,
-      note = excluded.note;
-    """,
-    (
-        item.get("category", ""),
-        item.get("name", ""),
-        int(item.get("checked", False)),
-        item.get("note", ""),
-    ),
-)
+    with get_conn() as conn:
+        meals = selected_meals(conn.cursor(), id_list, lambda rid: url_for("recipe_detail", recipe_id=rid))
+    return {"meals": meals}
 
 
-    db.commit()
-    return jsonify({"ok": True})
+@app.route("/api/recipes/by_ingredient")
+def api_recipes_by_ingredient():
+    """Recipes using an ingredient, e.g. ?item=chicken thighs (prefix match on the parsed item)."""
+    item = request.args.get("item", "").strip()
+    if not item:
+        return jsonify({"error": "Missing item"}), 400
+    with get_conn() as conn:
+        recipes = find_recipes_by_ingredient(conn.cursor(), item)
+    return jsonify({"item": item, "recipes": recipes})
 
+# === Shared Meal Plan API ===
 
+def get_meal_plan(c):
+    c.execute("SELECT slot, recipe, link FROM meal_plan ORDER BY slot")
+    return [{"slot": r[0], "recipe": r[1], "link": r[2]} for r in c.fetchall()]
 
-# === Shared Meal Plan API ===
 
 @app.route("/api/meal_plan", methods=["GET"])
 def api_get_meal_plan():
-    rows = query_db("SELECT slot, recipe, link FROM meal_plan ORDER BY slot;")
-    return jsonify([dict(r) for r in rows])
+    with get_conn() as conn:
+        return jsonify(get_meal_plan(conn.cursor()))
+
+def save_meal_plan(conn, slots):
+    """
+    Make meal_plan hold exactly `slots` (list of {slot, recipe, link}) in ONE
+    IMMEDIATE transaction: upsert only the slots whose recipe/link changed and
+    delete the ones no longer posted, so readers never see a half-written or
+    empty plan. Returns the diff:
+      {"changed": [{slot, recipe, link}], "removed": [slot], "unchanged": n}
+    """
+    wanted = {}
+    for s in slots:  # a slot posted twice: the last one wins
+        wanted[str(s.get("slot", ""))] = (s.get("recipe", "") or "", s.get("link", "") or "")
+
+    if conn.in_transaction:
+        raise RuntimeError("save_meal_plan() needs a connection with no open transaction")
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute("SELECT slot, recipe, link FROM meal_plan")
+        current = {r[0]: (r[1] or "", r[2] or "") for r in c.fetchall()}
+        changed = [(slot, recipe, link) for slot, (recipe, link) in wanted.items()
+                   if current.get(slot) != (recipe, link)]
+        removed = sorted(slot for slot in current if slot not in wanted)
+        if changed:
+            c.executemany("""
+                INSERT INTO meal_plan (slot, recipe, link, updated)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(slot) DO UPDATE SET
+                    recipe = excluded.recipe,
+                    link = excluded.link,
+                    updated = CURRENT_TIMESTAMP
+            """, changed)
+        if removed:
+            c.executemany("DELETE FROM meal_plan WHERE slot = ?", [(s,) for s in removed])
+        diff = {
+            "changed": [{"slot": s, "recipe": r, "link": l} for s, r, l in changed],
+            "removed": removed,
+            "unchanged": len(wanted) - len(changed),
+        }
+        if changed or removed:
+            bump_meal_plan_version(conn)
+            publish_event(conn, "meal_plan", {
+                "slots": [{"slot": s, "recipe": r, "link": l} for s, (r, l) in sorted(wanted.items())],
+                "changed": diff["changed"],
+                "removed": removed,
+            })
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return diff
+
 
 @app.route("/api/meal_plan", methods=["POST"])
 def api_save_meal_plan():
+    """
+    Replace the shared meal plan with the posted list of
+    {slot, recipe, link}. Only changed slots are written; the response says
+    which: {"ok": true, "changed": [...], "removed": [...], "unchanged": n}.
+    """
     data = request.get_json(force=True)
-    if not isinstance(data, list):
+    if not isinstance(data, list) or not all(isinstance(s, dict) for s in data):
         return jsonify({"error": "Invalid data"}), 400
 
-    db = get_db()
-    db.execute("DELETE FROM meal_plan;")
-    for slot in data:
-        db.execute(
-            "INSERT INTO meal_plan (slot, recipe, link, updated) VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
-            (
-                slot.get("slot", ""),
-                slot.get("recipe", ""),
-                slot.get("link", ""),
-            ),
-        )
-    db.commit()
-    return jsonify({"ok": True})
+    with get_conn() as conn:
+        diff = save_meal_plan(conn, data)
+    return jsonify({"ok": True, **diff})
 
 # === DAKboard-compatible Meal Plan Feed ===
-@app.route("/feed/mealplan")
-def feed_mealplan():
-    rows = query_db("SELECT slot, recipe FROM meal_plan ORDER BY slot;")
-    if not rows:
-        return "No meal plan found.", 200, {"Content-Type": "text/plain; charset=utf-8"}
+# Wall displays poll these continuously. Each format is rendered once per
+# meal-plan version (bumped by save_meal_plan) and served with an ETag and
+# Last-Modified, so a poll costs one app_meta lookup and usually ends in 304.
+from datetime import date, timedelta, timezone
+from flask import Response
+
+FEED_MAX_AGE = int(os.environ.get("RECIPES_FEED_MAX_AGE", "60"))
+FEED_DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]  # date.weekday() order
+FEED_MEAL_TIMES = {"breakfast": (8, 0), "lunch": (12, 30), "dinner": (18, 30)}  # .ics start, 1 h long
+FEED_TYPES = {
+    "text": "text/plain; charset=utf-8",
+    "json": "application/json",
+    "ics": "text/calendar; charset=utf-8",
+}
+
+feed_cache = TTLCache(8, 3600)
+
+
+def bump_meal_plan_version(conn):
+    """Bump meal_plan_version and stamp meal_plan_updated (unix s) in the caller's transaction."""
+    try:
+        conn.execute("""
+            INSERT INTO app_meta (key, value) VALUES ('meal_plan_version', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """)
+        conn.execute("""
+            INSERT INTO app_meta (key, value) VALUES ('meal_plan_updated', CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """)
+    except sqlite3.OperationalError as e:
+        print("⚠️ Could not bump meal_plan_version:", e)
+
+
+def get_meal_plan_version(c):
+    """(version, updated unix seconds); (None, None) before app_meta exists."""
+    try:
+        c.execute("SELECT key, value FROM app_meta WHERE key IN ('meal_plan_version', 'meal_plan_updated')")
+        meta = dict(c.fetchall())
+    except sqlite3.OperationalError:
+        return None, None
+    return meta.get("meal_plan_version", 0), meta.get("meal_plan_updated")
+
+
+def split_slot(slot):
+    """"sun_dinner" → ("sun", "dinner"); day is None when the slot has no known day."""
+    day, _, meal = slot.partition("_")
+    day = day.lower()
+    return (day, meal.lower()) if meal and day in FEED_DAYS else (None, slot.lower())
 
+
+def feed_text(rows):
     lines = []
-    for r in rows:
+    for slot, recipe, _link in rows:
         # slot looks like "sun_dinner" → turn into "Sun Dinner"
-        parts = r["slot"].split("_", 1)
+        parts = slot.split("_", 1)
         if len(parts) == 2:
             day, meal = parts
-            lines.append(f"{day.title()} {meal.title()}: {r['recipe']}")
+            lines.append(f"{day.title()} {meal.title()}: {recipe}")
         else:
-            lines.append(f"{r['slot'].title()}: {r['recipe']}")
+            lines.append(f"{slot.title()}: {recipe}")
+    return "\n".join(lines) if lines else "No meal plan found."
+
+
+def feed_entries(rows, today):
+    """Slots in day/meal order, each dated at its next occurrence from today."""
+    entries = []
+    for slot, recipe, link in rows:
+        day, meal = split_slot(slot)
+        when = None
+        if day:
+            when = today + timedelta(days=(FEED_DAYS.index(day) - today.weekday()) % 7)
+        entries.append({"slot": slot, "day": day, "meal": meal, "date": when,
+                        "recipe": recipe or "", "link": link or ""})
+    meal_order = list(FEED_MEAL_TIMES)
+    entries.sort(key=lambda e: (
+        e["date"] or date.max,
+        meal_order.index(e["meal"]) if e["meal"] in meal_order else len(meal_order),
+        e["slot"],
+    ))
+    return entries
+
+
+def ics_escape(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def ics_fold(line):
+    """Fold a content line at 75 octets (RFC 5545 3.1)."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    parts, limit = [], 75
+    while len(data) > limit:
+        cut = limit
+        while cut and (data[cut] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data, limit = data[cut:], 74  # continuation lines start with a space
+    parts.append(data.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+def feed_ics(entries, stamp, host_url):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Salima's Recipe Collection//Meal Plan//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:Meal Plan",
+    ]
+    for e in entries:
+        if not e["date"]:
+            continue
+        hour, minute = FEED_MEAL_TIMES.get(e["meal"], (12, 0))
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{e['slot']}-{e['date']:%Y%m%d}@salimas-recipes",
+            f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}",
+            f"DTSTART:{e['date']:%Y%m%d}T{hour:02d}{minute:02d}00",
+            "DURATION:PT1H",
+            f"SUMMARY:{ics_escape(e['meal'].title() + ': ' + e['recipe'])}",
+        ]
+        if e["link"]:
+            link = e["link"] if "://" in e["link"] else host_url.rstrip("/") + "/" + e["link"].lstrip("/")
+            lines.append(f"URL:{ics_escape(link)}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(ics_fold(l) for l in lines) + "\r\n"
+
+
+def build_feed(c, updated, today, host_url):
+    """Render every format from one read of meal_plan: {fmt: (body bytes, etag)}."""
+    c.execute("SELECT slot, recipe, link FROM meal_plan ORDER BY slot")
+    rows = [(r[0] or "", r[1] or "", r[2] or "") for r in c.fetchall()]
+    stamp = datetime.fromtimestamp(updated or 0, timezone.utc)
+    entries = feed_entries(rows, today)
+    bodies = {
+        "text": feed_text(rows),
+        "json": json.dumps({
+            "updated": stamp.isoformat() if updated else None,
+            "slots": [{**e, "date": e["date"].isoformat() if e["date"] else None} for e in entries],
+        }, ensure_ascii=False),
+        "ics": feed_ics(entries, stamp, host_url),
+    }
+    out = {}
+    for fmt, body in bodies.items():
+        data = body.encode("utf-8")
+        out[fmt] = (data, hashlib.sha1(data).hexdigest()[:20])
+    return out
+
+
+def feed_snapshot(c, host_url):
+    """({fmt: (body, etag)}, updated unix s) for the current meal plan, from feed_cache when possible."""
+    today = date.today()
+    version, updated = get_meal_plan_version(c)
+    # the .ics dates and links depend on the day and host, so they're in the key
+    key = (version, updated, today, host_url)
+    feed = feed_cache.get(key) if version is not None else None
+    if feed is None:
+        feed = build_feed(c, updated, today, host_url)
+        if version is not None:
+            feed_cache.set(key, feed)
+    return feed, updated
+
+
+def serve_feed(fmt):
+    with get_conn() as conn:
+        feed, updated = feed_snapshot(conn.cursor(), request.host_url)
+
+    body, etag = feed[fmt]
+    response = Response(body, content_type=FEED_TYPES[fmt])
+    response.set_etag(etag)
+    if updated:
+        response.last_modified = datetime.fromtimestamp(updated, timezone.utc)
+    response.headers["Cache-Control"] = f"public, max-age={FEED_MAX_AGE}"
+    return response.make_conditional(request)
+
+
+@app.route("/feed/mealplan")
+def feed_mealplan():
+    return serve_feed("text")
+
+
+@app.route("/feed/mealplan.json")
+def feed_mealplan_json():
+    return serve_feed("json")
+
+
+@app.route("/feed/mealplan.ics")
+def feed_mealplan_ics():
+    return serve_feed("ics")
+
+# ---------------------------
+# Shopping-list categorizer
+# ---------------------------
+# Keyword rules (formerly detectCategory() in planner.js) matched in one
+# pass with an Aho-Corasick automaton, overridden by categories learned
+# from the user's own corrections (category_memory).
+DEFAULT_CATEGORY = "Other"
+
+CATEGORY_KEYWORDS = {
+    "Dairy & Eggs": ["milk", "cheese", "cream", "butter", "yog", "egg"],
+    "Produce": ["apple", "banana", "tomato", "onion", "pepper", "carrot", "potato", "garlic",
+                "lettuce", "spinach", "herb", "lemon", "lime", "mushroom", "broccoli"],
+    "Meat & Fish": ["chicken", "beef", "lamb", "ham", "bacon", "pork", "turkey", "fish",
+                    "salmon", "tuna", "sausage", "mince"],
+    "Frozen": ["frozen", "peas", "ice", "chips", "sweetcorn", "berries", "pizza"],
+    "Pantry": ["bread", "rice", "pasta", "oil", "salt", "flour", "spice", "sugar", "sauce",
+               "tin", "jar", "stock", "broth", "cereal"],
+    "Snacks": ["crisps", "bar", "chocolate", "sweet", "biscuit", "snack"],
+    "Toiletries": ["soap", "toothpaste", "tooth", "colgate", "aquafresh", "shampoo", "roll", "tissue"],
+}
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over lower-case keywords: finds every keyword
+    occurring anywhere in a text in one left-to-right pass, however many
+    keywords there are.
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]      # node -> {char: node}
+        self._fail = [0]
+        self._out = [()]       # node -> keywords ending here
+        for word in keywords:
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (word,)
+
+        # breadth-first: a node's fail link is the longest proper suffix in the trie
+        frontier = list(self._goto[0].values())
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for ch, child in self._goto[node].items():
+                    f = self._fail[node]
+                    while f and ch not in self._goto[f]:
+                        f = self._fail[f]
+                    target = self._goto[f].get(ch, 0)
+                    self._fail[child] = target if target != child else 0
+                    self._out[child] += self._out[self._fail[child]]
+                    next_frontier.append(child)
+            frontier = next_frontier
+
+    def find(self, text):
+        """Every keyword occurring in text (with repeats)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        found = []
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.extend(out[node])
+        return found
+
+
+# keyword -> (category, rank); when several keywords hit, the longest wins
+# ("chicken stock" is meat, "ice cream" dairy), ties go to the earlier category
+_KEYWORD_CATEGORY = {}
+for _rank, (_cat, _words) in enumerate(CATEGORY_KEYWORDS.items()):
+    for _word in _words:
+        _KEYWORD_CATEGORY.setdefault(_word, (_cat, _rank))
+_category_matcher = KeywordMatcher(_KEYWORD_CATEGORY)
+
+
+def keyword_category(name: str) -> str:
+    hits = _category_matcher.find(name.lower())
+    if not hits:
+        return DEFAULT_CATEGORY
+    best = min(hits, key=lambda w: (-len(w), _KEYWORD_CATEGORY[w][1]))
+    return _KEYWORD_CATEGORY[best][0]
+
+
+def categorize(c, names) -> dict:
+    """
+    {name: category} for many names in one call: learned categories
+    (category_memory, one query) first, keyword rules for the rest.
+    """
+    keys = {name: canonical_item(name) for name in names if name and name.strip()}
+    learned = {}
+    if keys:
+        unique = list(set(keys.values()))
+        try:
+            c.execute(
+                f"SELECT item_key, category FROM category_memory WHERE item_key IN ({','.join('?' * len(unique))})",
+                unique,
+            )
+            learned = dict(c.fetchall())
+        except sqlite3.OperationalError:
+            pass  # category_memory not created yet
+    return {name: learned.get(key) or keyword_category(name) for name, key in keys.items()}
+
+
+def remember_category(c, item_id, category):
+    """Learn item -> category from a manual move (PATCH / batch update)."""
+    if not category:
+        return
+    c.execute("SELECT name FROM shopping_list WHERE id = ?", (item_id,))
+    row = c.fetchone()
+    if not row or not row[0]:
+        return
+    try:
+        c.execute("""
+            INSERT INTO category_memory (item_key, category, hits, updated_at)
+            VALUES (?, ?, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT(item_key) DO UPDATE SET
+                hits = CASE WHEN category = excluded.category THEN hits + 1 ELSE 1 END,
+                category = excluded.category,
+                updated_at = CURRENT_TIMESTAMP
+        """, (canonical_item(row[0]), category))
+    except sqlite3.OperationalError as e:
+        print("⚠️ Could not store learned category:", e)
 
-    text_output = "\n".join(lines)
-    return text_output, 200, {"Content-Type": "text/plain; charset=utf-8"}
 
 # ---------------------------
 # Shopping List API
@@ -857,101 +3146,1105 @@ def feed_mealplan():
 
 from flask import jsonify
 
-@app.route("/api/shopping_list", methods=["GET"])
-def api_shopping_list_get():
-    with get_conn() as conn:
-        c = conn.cursor()
+SHOPPING_FIELDS = ["name", "category", "amount", "checked", "crossed", "active"]
+SHOPPING_FLAGS = {"checked", "crossed", "active"}
+
+# Millisecond timestamps so ?since= watermarks can tell quick edits apart
+# (sorts correctly against older second-resolution CURRENT_TIMESTAMP values).
+SQL_NOW_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+TOMBSTONE_DAYS = 30
+
+
+def shopping_item(r):
+    """(id, name, category, amount, checked, crossed, active) row → JSON dict."""
+    return {
+        "id": r[0],
+        "name": r[1],
+        "category": r[2] or "",
+        "amount": r[3] or "",
+        "checked": bool(r[4]),
+        "crossed": bool(r[5]),
+        "active": bool(r[6]),
+    }
+
+
+def get_shopping_items(c, ids=None):
+    """Active items (or, given ids, exactly those rows) as JSON dicts."""
+    if ids is None:
         c.execute("""
             SELECT id, name, category, amount, checked, crossed, active
             FROM shopping_list
             WHERE active = 1
             ORDER BY category, name
         """)
-        rows = c.fetchall()
-    items = [
-        {
-            "id": r[0],
-            "name": r[1],
-            "category": r[2] or "",
-            "amount": r[3] or "",
-            "checked": bool(r[4]),
-            "crossed": bool(r[5]),
-            "active": bool(r[6]),
-        }
-        for r in rows
-    ]
-    return jsonify(items)
-
+    else:
+        ids = list(ids)
+        if not ids:
+            return []
+        c.execute(f"""
+            SELECT id, name, category, amount, checked, crossed, active
+            FROM shopping_list
+            WHERE id IN ({','.join(['?'] * len(ids))})
+            ORDER BY category, name
+        """, ids)
+    return [shopping_item(r) for r in c.fetchall()]
 
-@app.route("/api/shopping_list", methods=["POST"])
-def api_shopping_list_post():
-    data = request.get_json(force=True)
-    name = data.get("name", "").strip()
-    if not name:
-        return jsonify({"error": "Missing name"}), 400
 
-    category = data.get("category")
+def create_shopping_item(c, data) -> int:
+    """
+    Add an item, or revive the existing (name, category) row so re-importing
+    a recipe never trips the table's UNIQUE(category, name). Returns its id.
+    """
+    name = str(data.get("name", "")).strip()
+    category = data.get("category") or categorize(c, [name]).get(name, DEFAULT_CATEGORY)
     amount = data.get("amount", "")
     checked = int(bool(data.get("checked", True)))
     crossed = int(bool(data.get("crossed", False)))
-    active = 1
 
-    with get_conn() as conn:
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO shopping_list (name, category, amount, checked, crossed, active)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (name, category, amount, checked, crossed, active))
-        conn.commit()
-        new_id = c.lastrowid
-
-    return jsonify({"id": new_id, "name": name, "category": category})
+    c.execute(
+        "SELECT id FROM shopping_list WHERE name = ? AND IFNULL(category, '') = ?",
+        (name, category or ""),
+    )
+    row = c.fetchone()
+    if row:
+        c.execute(f"""
+            UPDATE shopping_list
+            SET amount = ?, checked = ?, crossed = ?, active = 1, deleted = 0,
+                updated_at = {SQL_NOW_MS}
+            WHERE id = ?
+        """, (amount, checked, crossed, row[0]))
+        return row[0]
+    c.execute(f"""
+        INSERT INTO shopping_list (name, category, amount, checked, crossed, active, updated_at)
+        VALUES (?, ?, ?, ?, ?, 1, {SQL_NOW_MS})
+    """, (name, category, amount, checked, crossed))
+    return c.lastrowid
 
 
-@app.route("/api/shopping_list/<int:item_id>", methods=["PATCH"])
-def api_shopping_list_patch(item_id):
-    data = request.get_json(force=True)
-    allowed_fields = ["name", "category", "amount", "checked", "crossed", "active"]
+def update_shopping_item(c, item_id, data) -> bool:
+    """Apply the allowed fields in `data` to one item. False if nothing to set."""
     sets, values = [], []
-
-    for field in allowed_fields:
+    for field in SHOPPING_FIELDS:
         if field in data:
             sets.append(f"{field} = ?")
-            values.append(data[field])
+            values.append(int(bool(data[field])) if field in SHOPPING_FLAGS else data[field])
     if not sets:
-        return jsonify({"error": "No valid fields"}), 400
-
+        return False
     values.append(item_id)
+    c.execute(f"UPDATE shopping_list SET {', '.join(sets)}, updated_at = {SQL_NOW_MS} WHERE id = ?", values)
+    return True
+
+
+def delete_shopping_item(c, item_id):
+    """Tombstone the row so ?since= pollers learn about the delete."""
+    c.execute(
+        f"UPDATE shopping_list SET deleted = 1, active = 0, updated_at = {SQL_NOW_MS} WHERE id = ?",
+        (item_id,),
+    )
+
+
+def shopping_watermark(c):
+    """Latest updated_at in shopping_list (None if the table is empty)."""
+    c.execute("SELECT MAX(updated_at) FROM shopping_list")
+    return c.fetchone()[0]
+
+
+def get_shopping_changes(c, since):
+    """
+    Rows changed since the watermark: (active items, ids no longer on the list).
+    Uses >= so an edit in the same millisecond as the watermark isn't lost;
+    clients simply re-apply that row.
+    """
+    c.execute("""
+        SELECT id, name, category, amount, checked, crossed, active
+        FROM shopping_list
+        WHERE updated_at >= ?
+        ORDER BY category, name
+    """, (since,))
+    changed = [shopping_item(r) for r in c.fetchall()]
+    return [i for i in changed if i["active"]], [i["id"] for i in changed if not i["active"]]
+
+
+def shopping_list_payload(c, since, watermark):
+    """GET /api/shopping_list body: the full list, or the delta since a watermark."""
+    if not since:
+        return get_shopping_items(c)
+    # Tombstones older than TOMBSTONE_DAYS get purged → full resync
+    c.execute("SELECT datetime('now', ?)", (f"-{TOMBSTONE_DAYS} days",))
+    full = since < c.fetchone()[0]
+    if full:
+        items, deleted = get_shopping_items(c), []
+    else:
+        items, deleted = get_shopping_changes(c, since)
+    return {"items": items, "deleted": deleted, "watermark": watermark, "full": full}
+
+
+def purge_shopping_tombstones(c):
+    c.execute(
+        f"DELETE FROM shopping_list WHERE deleted = 1 AND updated_at < datetime('now', '-{TOMBSTONE_DAYS} days')"
+    )
+
+
+def shopping_field_error(op):
+    """Why a field in `op` has the wrong type (text fields str, flags bool/0/1), or None."""
+    for field in SHOPPING_FIELDS:
+        if field not in op:
+            continue
+        value = op[field]
+        if field in SHOPPING_FLAGS:
+            if not isinstance(value, (bool, int)):
+                return f"{field} must be true or false"
+        elif not isinstance(value, str) and not (value is None and field != "name"):
+            return f"{field} must be a string"
+    return None
+
+
+def validate_shopping_ops(ops):
+    """Return an error message for the first malformed op, or None."""
+    if not isinstance(ops, list):
+        return "Expected a list of operations"
+    for i, op in enumerate(ops):
+        if not isinstance(op, dict):
+            return f"Operation {i}: expected an object"
+        kind = op.get("op")
+        error = shopping_field_error(op)
+        if error:
+            return f"Operation {i}: {error}"
+        if kind == "create":
+            if not op.get("name", "").strip():
+                return f"Operation {i}: missing name"
+        elif kind in ("update", "delete"):
+            if not isinstance(op.get("id"), int):
+                return f"Operation {i}: missing integer id"
+            if kind == "update" and not any(f in op for f in SHOPPING_FIELDS):
+                return f"Operation {i}: no valid fields"
+        else:
+            return f"Operation {i}: unknown op {kind!r}"
+    return None
+
+
+def apply_shopping_ops(conn, ops):
+    """
+    Apply validated create/update/delete ops in ONE transaction (together
+    with the change event for live clients).
+    Returns (results, items, deleted_ids): results echo each op's optional
+    client "ref" so callers can map new rows to local ones; items are the
+    resulting rows of every touched item.
+    """
+    if conn.in_transaction:
+        raise RuntimeError("apply_shopping_ops() needs a connection with no open transaction")
+    c = conn.cursor()
+    results, touched, deleted = [], set(), set()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        # categorize every uncategorized create in one go
+        uncategorized = [str(op["name"]).strip() for op in ops if op["op"] == "create" and not op.get("category")]
+        categories = categorize(c, uncategorized)
+        for op in ops:
+            kind = op["op"]
+            if kind == "create":
+                if not op.get("category"):
+                    op = {**op, "category": categories.get(str(op["name"]).strip(), DEFAULT_CATEGORY)}
+                item_id = create_shopping_item(c, op)
+            elif kind == "update":
+                item_id = op["id"]
+                update_shopping_item(c, item_id, op)
+                if "category" in op:
+                    remember_category(c, item_id, op["category"])
+            else:
+                item_id = op["id"]
+                delete_shopping_item(c, item_id)
+            if kind == "delete":
+                deleted.add(item_id)
+                touched.discard(item_id)
+            else:
+                touched.add(item_id)
+                deleted.discard(item_id)
+            results.append({"op": kind, "id": item_id, "ref": op.get("ref")})
+        items = get_shopping_items(c, touched)
+        publish_event(conn, "shopping_list", {"items": items, "deleted": sorted(deleted)})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results, items, sorted(deleted)
+
+
+@app.route("/api/shopping_list", methods=["GET"])
+def api_shopping_list_get():
+    """
+    Full list (JSON array), or with ?since=<watermark> only what changed:
+      {"items": [...], "deleted": [ids], "watermark": "...", "full": false}
+    Either way the current watermark is sent as X-Shopping-Watermark and as
+    the ETag, so an unchanged list costs one indexed MAX() and a 304.
+    """
+    since = request.args.get("since", "").strip()
     with get_conn() as conn:
         c = conn.cursor()
-        c.execute(f"UPDATE shopping_list SET {', '.join(sets)}, updated_at=CURRENT_TIMESTAMP WHERE id = ?", values)
-        conn.commit()
+        watermark = shopping_watermark(c)
+        etag = f"sl-{watermark or 0}"
+        if etag in request.if_none_match:
+            resp = app.response_class(status=304)
+        else:
+            resp = jsonify(shopping_list_payload(c, since, watermark))
+
+    resp.set_etag(etag)
+    resp.headers["X-Shopping-Watermark"] = watermark or ""
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def new_item_error(data):
+    """Why a POST /api/shopping_list body can't be added, or None."""
+    if not isinstance(data, dict):
+        return "Invalid data"
+    error = shopping_field_error(data)
+    if error:
+        return error
+    if not data.get("name", "").strip():
+        return "Missing name"
+    return None
+
+
+def add_shopping_item(conn, data):
+    """Create (or revive) one validated item, publish it; returns the POST response body."""
+    c = conn.cursor()
+    new_id = create_shopping_item(c, data)
+    items = get_shopping_items(c, [new_id])
+    publish_event(conn, "shopping_list", {"items": items, "deleted": []})
+    conn.commit()
+    category = items[0]["category"] if items else data.get("category")
+    return {"id": new_id, "name": data["name"].strip(), "category": category}
 
+
+@app.route("/api/shopping_list", methods=["POST"])
+def api_shopping_list_post():
+    data = request.get_json(force=True)
+    error = new_item_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    with get_conn() as conn:
+        return jsonify(add_shopping_item(conn, data))
+
+
+@app.route("/api/shopping_list/batch", methods=["POST"])
+def api_shopping_list_batch():
+    """
+    Apply many changes in one request / one transaction:
+      {"ops": [{"op": "create", "name": "penne", "category": "Pantry", "ref": "tmp1"},
+               {"op": "update", "id": 12, "checked": false},
+               {"op": "delete", "id": 7}]}
+    Returns per-op results plus the resulting rows of every touched item.
+    """
+    data = request.get_json(force=True)
+    ops = data.get("ops") if isinstance(data, dict) else data
+    error = validate_shopping_ops(ops)
+    if error:
+        return jsonify({"error": error}), 400
+
+    results, items, deleted = apply_shopping_ops(get_conn(), ops)
+    return jsonify({"results": results, "items": items, "deleted": deleted})
+
+
+@app.route("/api/categorize", methods=["POST"])
+def api_categorize():
+    """
+    Shopping-list categories for many names in one call:
+      {"names": ["penne", "chicken thighs"]}
+    → {"categories": {"penne": "Pantry", "chicken thighs": "Meat & Fish"}}
+    """
+    data = request.get_json(force=True) or {}
+    names = data.get("names")
+    if not isinstance(names, list):
+        return jsonify({"error": "names must be a list"}), 400
+    with get_conn() as conn:
+        categories = categorize(conn.cursor(), [str(n) for n in names])
+    return jsonify({"categories": categories})
+
+
+def aggregate_request(data):
+    """(lines, recipe_ids, error) from an /aggregate body; error is None when valid."""
+    if not isinstance(data, dict):
+        return [], [], "Expected an object"
+    lines = data.get("lines") or []
+    recipe_ids = data.get("recipe_ids") or []
+    if not isinstance(lines, list) or not isinstance(recipe_ids, list):
+        return [], [], "lines and recipe_ids must be lists"
+    try:
+        recipe_ids = [int(i) for i in recipe_ids]
+    except (TypeError, ValueError):
+        return [], [], "recipe_ids must be integers"
+    return [str(l) for l in lines], recipe_ids, None
+
+
+def aggregate_items(c, lines, recipe_ids):
+    parsed = parse_ingredients_block(lines)
+    if recipe_ids:
+        parsed += _stored_ingredients(c, recipe_ids)
+    return aggregate_ingredients(parsed)
+
+
+@app.route("/api/shopping_list/aggregate", methods=["POST"])
+def api_shopping_list_aggregate():
+    """
+    Merge ingredients from several recipes into one consolidated list:
+      {"lines": ["200 g penne", "300 g penne", "1 tbsp oil"]}
+      {"recipe_ids": [3, 8, 8]}      (uses the stored parsed rows)
+    Both may be given. Returns {"items": [{"item", "amount", ...}]};
+    nothing is written — the planner adds the result via /batch.
+    """
+    lines, recipe_ids, error = aggregate_request(request.get_json(force=True) or {})
+    if error:
+        return jsonify({"error": error}), 400
+    with get_conn() as conn:
+        return jsonify({"items": aggregate_items(conn.cursor(), lines, recipe_ids)})
+
+
+def patch_shopping_item(conn, item_id, data) -> bool:
+    """Update one item, learn its category and publish the change. False if nothing to set."""
+    c = conn.cursor()
+    if not update_shopping_item(c, item_id, data):
+        return False
+    if "category" in data:
+        remember_category(c, item_id, data["category"])
+    items = get_shopping_items(c, [item_id])
+    publish_event(conn, "shopping_list", {
+        "items": [i for i in items if i["active"]],
+        "deleted": [i["id"] for i in items if not i["active"]],
+    })
+    conn.commit()
+    return True
+
+
+@app.route("/api/shopping_list/<int:item_id>", methods=["PATCH"])
+def api_shopping_list_patch(item_id):
+    data = request.get_json(force=True)
+    with get_conn() as conn:
+        if not patch_shopping_item(conn, item_id, data):
+            return jsonify({"error": "No valid fields"}), 400
     return jsonify({"status": "updated"})
 
 
+def remove_shopping_item(conn, item_id):
+    """Tombstone one item and publish the delete."""
+    delete_shopping_item(conn.cursor(), item_id)
+    publish_event(conn, "shopping_list", {"items": [], "deleted": [item_id]})
+    conn.commit()
+
+
+def clear_shopping_list(conn):
+    """Deactivate every active item (kept as history), purge old tombstones, publish."""
+    c = conn.cursor()
+    c.execute("SELECT id FROM shopping_list WHERE active = 1")
+    cleared = [r[0] for r in c.fetchall()]
+    c.execute(f"UPDATE shopping_list SET active = 0, updated_at = {SQL_NOW_MS} WHERE active = 1")
+    purge_shopping_tombstones(c)
+    publish_event(conn, "shopping_list", {"items": [], "deleted": cleared})
+    conn.commit()
+    return cleared
+
+
 @app.route("/api/shopping_list/<int:item_id>", methods=["DELETE"])
 def api_shopping_list_delete(item_id):
     with get_conn() as conn:
-        c = conn.cursor()
-        c.execute("DELETE FROM shopping_list WHERE id = ?", (item_id,))
-        conn.commit()
+        remove_shopping_item(conn, item_id)
     return jsonify({"status": "deleted"})
 
 
 @app.route("/api/shopping_list/clear", methods=["POST"])
 def api_shopping_list_clear():
+    with get_conn() as conn:
+        clear_shopping_list(conn)
+    return jsonify({"status": "cleared"})
+
+
+# ---------------------------
+# Planner snapshots
+# ---------------------------
+# A saved planner is stored as rows, not as the grid's HTML: the header in
+# planner_snapshot, the selected recipes and meal-grid cells in
+# snapshot_meal, the shopping list in snapshot_item. Saving an unchanged
+# planner only refreshes the existing snapshot (matched on content_hash).
+SNAPSHOT_KEEP_RECENT = 20     # newest snapshots always kept
+SNAPSHOT_KEEP_WEEKS = 26      # beyond those, the latest snapshot per week for this many weeks
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS planner_snapshot (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    label TEXT,
+    week_start TEXT,
+    content_hash TEXT NOT NULL,
+    meal_count INTEGER NOT NULL DEFAULT 0,
+    item_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_planner_snapshot_hash ON planner_snapshot(content_hash);
+CREATE INDEX IF NOT EXISTS idx_planner_snapshot_created ON planner_snapshot(created_at);
+
+-- kind = 'recipe' (selected recipe) or 'cell' (meal-grid day/slot text)
+CREATE TABLE IF NOT EXISTS snapshot_meal (
+    snapshot_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    day TEXT,
+    slot TEXT,
+    recipe_id INTEGER,
+    name TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS snapshot_item (
+    snapshot_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT,
+    amount TEXT,
+    checked INTEGER NOT NULL DEFAULT 1,
+    crossed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (snapshot_id, position)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS planner_snapshot_ad AFTER DELETE ON planner_snapshot BEGIN
+    DELETE FROM snapshot_meal WHERE snapshot_id = old.id;
+    DELETE FROM snapshot_item WHERE snapshot_id = old.id;
+END;
+"""
+
+
+def normalize_snapshot(data):
+    """
+    Planner JSON from planner.js → (meals, items, week_start, label):
+      {"recipes": [{"id", "name"}], "meal_plan": {"Monday": {"lunch": "..."}},
+       "shopping_list": [{"name", "category", "amount", "checked", "crossed"}],
+       "week_start": "sun", "label": "..."}
+    The old HTML meal_plan string is ignored.
+    """
+    meals = []
+    for r in data.get("recipes") or []:
+        if isinstance(r, dict):
+            rid, name = r.get("id"), r.get("name")
+        else:
+            rid, name = r, None
+        rid = int(rid) if str(rid).isdigit() else None
+        if rid or name:
+            meals.append(("recipe", None, None, rid, str(name or "")))
+    plan = data.get("meal_plan")
+    if isinstance(plan, dict):
+        for day, slots in plan.items():
+            if isinstance(slots, dict):
+                for slot, text in slots.items():
+                    if str(text or "").strip():
+                        meals.append(("cell", str(day), str(slot), None, str(text).strip()))
+
+    items = []
+    for i in data.get("shopping_list") or []:
+        if isinstance(i, dict) and str(i.get("name", "")).strip() and i.get("active", True):
+            items.append((
+                str(i["name"]).strip(), i.get("category") or "", i.get("amount") or "",
+                int(bool(i.get("checked", True))), int(bool(i.get("crossed", False))),
+            ))
+    return meals, items, str(data.get("week_start") or ""), str(data.get("label") or "").strip()
+
+
+def snapshot_hash(meals, items, week_start):
+    payload = json.dumps([week_start, meals, sorted(items)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def save_snapshot(conn, data):
+    """Store a planner snapshot; returns (id, created). Unchanged plans reuse their row."""
+    meals, items, week_start, label = normalize_snapshot(data)
+    digest = snapshot_hash(meals, items, week_start)
+    c = conn.cursor()
+    c.execute("SELECT id FROM planner_snapshot WHERE content_hash = ? ORDER BY id DESC LIMIT 1", (digest,))
+    row = c.fetchone()
+    if row:
+        c.execute(
+            f"UPDATE planner_snapshot SET created_at = {SQL_NOW_MS}, label = COALESCE(NULLIF(?, ''), label) WHERE id = ?",
+            (label, row[0]),
+        )
+        return row[0], False
+
+    c.execute(f"""
+        INSERT INTO planner_snapshot (created_at, label, week_start, content_hash, meal_count, item_count)
+        VALUES ({SQL_NOW_MS}, ?, ?, ?, ?, ?)
+    """, (label, week_start, digest, sum(m[0] == "cell" for m in meals), len(items)))
+    snapshot_id = c.lastrowid
+    c.executemany(
+        "INSERT INTO snapshot_meal (snapshot_id, position, kind, day, slot, recipe_id, name) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(snapshot_id, pos, *m) for pos, m in enumerate(meals)],
+    )
+    c.executemany(
+        "INSERT INTO snapshot_item (snapshot_id, position, name, category, amount, checked, crossed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(snapshot_id, pos, *i) for pos, i in enumerate(items)],
+    )
+    compact_snapshots(c)
+    return snapshot_id, True
+
+
+def compact_snapshots(c):
+    """
+    Retention: keep the newest SNAPSHOT_KEEP_RECENT snapshots, then only the
+    latest one per week for SNAPSHOT_KEEP_WEEKS weeks; delete the rest
+    (child rows go via the planner_snapshot_ad trigger).
+    """
+    c.execute(f"""
+        DELETE FROM planner_snapshot
+        WHERE id NOT IN (
+            SELECT id FROM planner_snapshot ORDER BY created_at DESC LIMIT {SNAPSHOT_KEEP_RECENT}
+        )
+        AND (
+            created_at < datetime('now', '-{SNAPSHOT_KEEP_WEEKS * 7} days')
+            OR id NOT IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY strftime('%Y-%W', created_at) ORDER BY created_at DESC
+                    ) AS rn
+                    FROM planner_snapshot
+                ) WHERE rn = 1
+            )
+        )
+    """)
+    return c.rowcount
+
+
+def list_snapshots(c, limit=50):
+    c.execute("""
+        SELECT id, created_at, label, week_start, meal_count, item_count
+        FROM planner_snapshot ORDER BY created_at DESC LIMIT ?
+    """, (limit,))
+    return [
+        {"id": r[0], "created_at": r[1], "label": r[2] or "", "week_start": r[3] or "",
+         "meal_count": r[4], "item_count": r[5]}
+        for r in c.fetchall()
+    ]
+
+
+def get_snapshot(c, snapshot_id):
+    """One snapshot with its recipes, grid and shopping list — a single query."""
+    c.execute("""
+        SELECT s.id, s.created_at, s.label, s.week_start,
+            (SELECT json_group_array(json_object(
+                    'kind', kind, 'day', day, 'slot', slot, 'recipe_id', recipe_id, 'name', name))
+             FROM (SELECT * FROM snapshot_meal WHERE snapshot_id = s.id ORDER BY position)),
+            (SELECT json_group_array(json_object(
+                    'name', name, 'category', category, 'amount', amount,
+                    'checked', json(CASE WHEN checked THEN 'true' ELSE 'false' END),
+                    'crossed', json(CASE WHEN crossed THEN 'true' ELSE 'false' END)))
+             FROM (SELECT * FROM snapshot_item WHERE snapshot_id = s.id ORDER BY position))
+        FROM planner_snapshot s
+        WHERE s.id = ?
+    """, (snapshot_id,))
+    row = c.fetchone()
+    if not row:
+        return None
+    meals = json.loads(row[4])
+    meal_plan = {}
+    for m in meals:
+        if m["kind"] == "cell":
+            meal_plan.setdefault(m["day"], {})[m["slot"]] = m["name"]
+    return {
+        "id": row[0],
+        "created_at": row[1],
+        "label": row[2] or "",
+        "week_start": row[3] or "",
+        "recipes": [{"id": m["recipe_id"], "name": m["name"]} for m in meals if m["kind"] == "recipe"],
+        "meal_plan": meal_plan,
+        "shopping_list": json.loads(row[5]),
+    }
+
+
+@app.route("/api/planner/save", methods=["POST"])
+def api_planner_save():
+    data = request.get_json(force=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    with get_conn() as conn:
+        snapshot_id, created = save_snapshot(conn, data)
+        conn.commit()
+    return jsonify({"id": snapshot_id, "created": created}), 201 if created else 200
+
+
+@app.route("/api/planner/snapshots")
+def api_planner_snapshots():
+    limit = min(request.args.get("limit", 50, type=int) or 50, 200)
+    with get_conn() as conn:
+        return jsonify({"snapshots": list_snapshots(conn.cursor(), limit)})
+
+
+@app.route("/api/planner/snapshots/<int:snapshot_id>")
+def api_planner_snapshot(snapshot_id):
+    with get_conn() as conn:
+        snapshot = get_snapshot(conn.cursor(), snapshot_id)
+    if snapshot is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(snapshot)
+
+
+@app.route("/api/planner/snapshots/<int:snapshot_id>/restore", methods=["POST"])
+def api_planner_snapshot_restore(snapshot_id):
+    """
+    Put a snapshot's shopping list back in one transaction: current items
+    are deactivated (kept in history, like Clear) and the snapshot's items
+    created or revived. Recipes and the meal grid are returned for the
+    browser to put back in localStorage — nothing is re-imported.
+    """
+    conn = get_conn()
+    c = conn.cursor()
+    snapshot = get_snapshot(c, snapshot_id)
+    if snapshot is None:
+        return jsonify({"error": "Not found"}), 404
+    c.execute("SELECT id FROM shopping_list WHERE active = 1")
+    ops = [{"op": "update", "id": r[0], "active": False} for r in c.fetchall()]
+    ops += [
+        {"op": "create", "name": i["name"], "category": i["category"], "amount": i["amount"],
+         "checked": i["checked"], "crossed": i["crossed"]}
+        for i in snapshot["shopping_list"]
+    ]
+    _, items, deleted = apply_shopping_ops(conn, ops)
+    return jsonify({"snapshot": snapshot, "items": [i for i in items if i["active"]]})
+
+
+@app.route("/api/planner/snapshots/<int:snapshot_id>", methods=["DELETE"])
+def api_planner_snapshot_delete(snapshot_id):
+    with get_conn() as conn:
+        conn.execute("DELETE FROM planner_snapshot WHERE id = ?", (snapshot_id,))
+        conn.commit()
+    return jsonify({"status": "deleted"})
+
+
+# ---------------------------
+# Live updates (Server-Sent Events)
+# ---------------------------
+# Two servers for the same stream. The Flask view below is the simple one:
+# it blocks a WSGI thread per open stream, so it is capped and meant for the
+# dev server and a handful of tabs. Dozens of idle clients without a thread
+# each is what asgi.py is for: its /api/events waits on AsyncEventBroker in
+# one event loop. Both read change_events through the helpers here.
+import asyncio
+from flask import Response
+
+SSE_HEARTBEAT_S = 20        # comment line to keep proxies / the tunnel from idling out
+SSE_MAX_STREAM_S = 300      # streams end after this; EventSource reconnects with Last-Event-ID
+EVENT_RETENTION = 1000      # change_events rows kept for reconnecting clients
+# Each open /api/events stream holds a WSGI thread for up to SSE_MAX_STREAM_S;
+# clients over the cap get a 503 and poll instead (0 turns SSE off here;
+# asgi.py serves the stream from its event loop, uncapped).
+SSE_MAX_STREAMS = int(os.environ.get("RECIPES_SSE_MAX_STREAMS", "32"))
+SSE_RETRY_AFTER_S = 60
+
+
+def publish_event(conn, channel, payload):
+    """
+    Record a change event in the caller's transaction, so it only becomes
+    visible to /api/events streams if the change itself commits.
+    """
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO change_events (channel, payload) VALUES (?, ?)",
+        (channel, json.dumps(payload)),
+    )
+    c.execute("DELETE FROM change_events WHERE id <= ?", (c.lastrowid - EVENT_RETENTION,))
+    if has_app_context():
+        g._events_published = True
+
+
+class EventBroker:
+    """
+    Wakes SSE streams when change_events grows. One poller thread per
+    process reads MAX(id) while anyone is listening, so writes from other
+    worker processes are seen too; idle streams just wait on a shared
+    Condition and never touch the database.
+    """
+
+    def __init__(self, poll_interval=0.5):
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._latest = 0
+        self._listeners = 0
+        self._thread = None
+
+    def _read_latest(self, conn):
+        return latest_event_id(conn)
+
+    def notify(self):
+        """Re-read the newest event id now (called after local writes commit)."""
+        if not self._listeners:
+            return
+        conn = _pool.acquire()
+        try:
+            latest = self._read_latest(conn)
+        finally:
+            _pool.release(conn)
+        with self._cond:
+            if latest > self._latest:
+                self._latest = latest
+                self._cond.notify_all()
+
+    def _run(self):
+        conn = _pool.acquire()
+        try:
+            while True:
+                with self._cond:
+                    if not self._listeners:
+                        self._thread = None
+                        return
+                latest = self._read_latest(conn)
+                with self._cond:
+                    if latest > self._latest:
+                        self._latest = latest
+                        self._cond.notify_all()
+                time.sleep(self.poll_interval)
+        finally:
+            _pool.release(conn)
+
+    def wait(self, last_id, timeout):
+        """Block until an event newer than last_id exists; False on timeout."""
+        with self._cond:
+            self._listeners += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-broker", daemon=True)
+                self._thread.start()
+            try:
+                return self._cond.wait_for(lambda: self._latest > last_id, timeout)
+            finally:
+                self._listeners -= 1
+
+
+event_broker = EventBroker()
+
+
+class AsyncEventBroker:
+    """
+    asyncio twin of EventBroker for asgi.py: while anyone listens, one task
+    polls MAX(change_events.id) through read_latest() (an async callable,
+    so the query runs off the event loop) and wakes every waiting stream;
+    local writes call notify() to skip the poll delay.
+    """
+
+    def __init__(self, read_latest, poll_interval=0.5):
+        self.read_latest = read_latest
+        self.poll_interval = poll_interval
+        self._cond = None
+        self._latest = 0
+        self._listeners = 0
+        self._task = None
+
+    async def _update(self, latest):
+        async with self._cond:
+            if latest > self._latest:
+                self._latest = latest
+                self._cond.notify_all()
+
+    async def notify(self):
+        if self._listeners:
+            await self._update(await self.read_latest())
+
+    async def _poll(self):
+        while self._listeners:
+            await self._update(await self.read_latest())
+            await asyncio.sleep(self.poll_interval)
+        self._task = None
+
+    async def wait(self, last_id, timeout):
+        """Wait until an event newer than last_id exists; False on timeout."""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        self._listeners += 1
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+        try:
+            async with self._cond:
+                await asyncio.wait_for(self._cond.wait_for(lambda: self._latest > last_id), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._listeners -= 1
+
+
+_sse_streams = {"open": 0}
+_sse_lock = threading.Lock()
+
+
+def claim_sse_stream() -> bool:
+    """Take one of the SSE_MAX_STREAMS slots; False when they're all in use."""
+    with _sse_lock:
+        if _sse_streams["open"] >= SSE_MAX_STREAMS:
+            return False
+        _sse_streams["open"] += 1
+        return True
+
+
+def release_sse_stream():
+    with _sse_lock:
+        _sse_streams["open"] -= 1
+
+
+@app.after_request
+def notify_event_listeners(response):
+    if g.pop("_events_published", False):
+        event_broker.notify()
+    return response
+
+
+def latest_event_id(conn):
+    return conn.execute("SELECT IFNULL(MAX(id), 0) FROM change_events").fetchone()[0]
+
+
+def events_after(conn, last_id, limit=100):
+    """[(id, channel, payload json), ...] newer than last_id, oldest first."""
+    return conn.execute(
+        "SELECT id, channel, payload FROM change_events WHERE id > ? ORDER BY id LIMIT ?",
+        (last_id, limit),
+    ).fetchall()
+
+
+def sse_format(event_id, channel, payload):
+    return f"id: {event_id}\nevent: {channel}\ndata: {payload}\n\n"
+
+
+@app.route("/api/events")
+def api_events():
+    """
+    Server-Sent Events stream of change events.
+      ?channels=shopping_list,meal_plan   (default: all)
+    Resumes after the Last-Event-ID header (or ?last_id=) on reconnect;
+    a fresh client only receives events from now on.
+    This WSGI version holds a thread per stream: past SSE_MAX_STREAMS open
+    streams (per process) it answers 503 and clients poll instead. Serve
+    asgi.py for many concurrent streams.
+    """
+    if not claim_sse_stream():
+        resp = jsonify({"error": "Too many live streams, poll /api/shopping_list?since= instead"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(SSE_RETRY_AFTER_S)
+        return resp
+    channels = {ch for ch in request.args.get("channels", "").split(",") if ch}
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+
+    conn = _pool.acquire()
+    try:
+        if last_id and last_id.isdigit():
+            last_id = int(last_id)
+        else:
+            last_id = latest_event_id(conn)
+    except Exception:
+        release_sse_stream()
+        raise
+    finally:
+        _pool.release(conn)
+
+    def stream(last_id):
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + SSE_MAX_STREAM_S
+        while time.monotonic() < deadline:
+            conn = _pool.acquire()
+            try:
+                rows = events_after(conn, last_id)
+            finally:
+                _pool.release(conn)
+            for event_id, channel, payload in rows:
+                last_id = event_id
+                if not channels or channel in channels:
+                    yield sse_format(event_id, channel, payload)
+            if rows:
+                continue
+            if not event_broker.wait(last_id, SSE_HEARTBEAT_S):
+                yield ": keep-alive\n\n"
+
+    resp = Response(stream(last_id), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    resp.call_on_close(release_sse_stream)  # runs even if the stream never started
+    return resp
+
+
+# ---------------------------
+# CLI commands  (flask --app app <command>)
+# ---------------------------
+import click
+
+
+@app.cli.command("backfill-vectors")
+@click.option("--all", "rebuild_all", is_flag=True, help="Recompute every vector, not just missing ones.")
+@click.option("--batch-size", default=64, show_default=True)
+def backfill_vectors_command(rebuild_all, batch_size):
+    """Compute recipe_vectors for existing recipes."""
+    if np is None:
+        raise click.ClickException("NumPy is not installed; semantic search is disabled.")
+    nlp = get_nlp()
+    if nlp is None:
+        raise click.ClickException("spaCy is disabled or its model could not be loaded.")
+    init_db()
     with get_conn() as conn:
         c = conn.cursor()
-        c.execute("UPDATE shopping_list SET active = 0, updated_at = CURRENT_TIMESTAMP")
+        if rebuild_all:
+            c.execute("SELECT id, name, ingredients, method FROM recipes")
+        else:
+            c.execute("""
+                SELECT id, name, ingredients, method FROM recipes
+                WHERE id NOT IN (SELECT recipe_id FROM recipe_vectors)
+            """)
+        rows = c.fetchall()
+        texts = (recipe_text(n, i, m) for _, n, i, m in rows)
+        stored = 0
+        for (rid, *_), doc in zip(rows, nlp.pipe(texts, batch_size=batch_size)):
+            blob = _vector_blob(doc)
+            if blob is not None:
+                c.execute(
+                    "INSERT OR REPLACE INTO recipe_vectors (recipe_id, vector) VALUES (?, ?)",
+                    (rid, blob),
+                )
+                stored += 1
+        bump_data_version(conn)
         conn.commit()
-    return jsonify({"status": "cleared"})
+    _vector_cache["matrix"] = None
+    click.echo(f"✅ Stored {stored} vectors ({len(rows)} recipes scanned).")
+
+
+@app.cli.command("backfill-lemmas")
+@click.option("--all", "rebuild_all", is_flag=True, help="Recompute every lemma set, not just missing ones.")
+@click.option("--batch-size", default=64, show_default=True)
+def backfill_lemmas_command(rebuild_all, batch_size):
+    """Compute recipe_lemmas for existing recipes."""
+    if get_nlp() is None:
+        raise click.ClickException("spaCy is disabled or its model could not be loaded.")
+    init_db()
+    with get_conn() as conn:
+        stored = backfill_recipe_lemmas(conn, rebuild_all=rebuild_all, batch_size=batch_size)
+        bump_data_version(conn)
+        conn.commit()
+    click.echo(f"✅ Stored {stored} lemma sets.")
+
+
+@app.cli.command("check-tag-counts")
+@click.option("--fix", is_flag=True, help="Resync recipe_tags and tag_counts if they disagree.")
+def check_tag_counts_command(fix):
+    """Recount tags from recipes.tags and diff against tag_counts."""
+    init_db()
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT tags FROM recipes")
+        expected = compute_tag_counts(c.fetchall())
+        stored = dict(get_tag_cloud())
+
+        diffs = sorted(
+            (tag, stored.get(tag, 0), expected.get(tag, 0))
+            for tag in set(expected) | set(stored)
+            if stored.get(tag, 0) != expected.get(tag, 0)
+        )
+        for tag, have, want in diffs:
+            click.echo(f"  {tag!r}: stored {have}, expected {want}")
+        if not diffs:
+            click.echo(f"✅ tag_counts consistent ({len(expected)} tags).")
+            return
+        if not fix:
+            raise click.ClickException(f"{len(diffs)} tag counts differ (re-run with --fix).")
+
+        c.execute("SELECT id, tags FROM recipes")
+        for rid, raw in c.fetchall():
+            sync_recipe_tags(conn, rid, raw)
+        rebuild_tag_counts(conn)
+        bump_data_version(conn)
+        conn.commit()
+    click.echo(f"✅ Rebuilt recipe_tags and tag_counts ({len(diffs)} differences fixed).")
+
+
+@app.cli.command("thumbnails")
+@click.option("--retry", is_flag=True, help="Also retry images that failed before.")
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def thumbnails_command(retry, files):
+    """Generate thumbnails for recipe images (or for local FILES)."""
+    if not thumbs_enabled():
+        raise click.ClickException("Pillow is not installed; thumbnails are disabled.")
+    init_db()
+    with get_conn() as conn:
+        if files:
+            for path in files:
+                ok = process_image_source(conn, str(Path(path).resolve()), allow_files=True)
+                click.echo(f"{'✅' if ok else '⚠️'} {path}")
+            return
+        statuses = ("error",) if retry else ()
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT DISTINCT r.image_url FROM recipes r
+            LEFT JOIN image_cache ic ON ic.source = r.image_url
+            WHERE r.image_url <> ''
+              AND (ic.source IS NULL OR ic.status IN ({",".join("?" * len(statuses)) or "NULL"}))
+        """, statuses)
+        urls = [r[0] for r in c.fetchall()]
+        done = sum(process_image_source(conn, url) for url in urls)
+    click.echo(f"✅ Thumbnailed {done} of {len(urls)} images.")
+
+
+
+# ---------------------------
+# Production serving (gunicorn)
+# ---------------------------
+# `python3 app.py serve` / `flask --app app serve` hand over to gunicorn with
+# gunicorn.conf.py: preloaded app, gthread workers, prepare_master() in the
+# master before the fork. Extra arguments go straight to gunicorn, e.g.
+#   python3 app.py serve --workers 3 --bind 0.0.0.0:5050
+import gc
+import importlib.util
+import sys
+
+GUNICORN_CONF = Path(__file__).resolve().with_name("gunicorn.conf.py")
+
+
+def prepare_master():
+    """
+    Run once in the gunicorn master before workers fork: create/migrate the
+    schema, load spaCy (when enabled) so workers share its memory
+    copy-on-write, then freeze the heap so refcount updates in the workers
+    don't copy those pages back.
+    """
+    init_db()
+    if NLP_ENABLED:
+        t0 = time.perf_counter()
+        if get_nlp() is not None:
+            print(f"✅ spaCy {NLP_MODEL} loaded in the master ({time.perf_counter() - t0:.1f} s)")
+    gc.collect()
+    gc.freeze()
+
+
+def gunicorn_argv(extra_args=()):
+    app_dir = GUNICORN_CONF.parent
+    return [
+        sys.executable, "-m", "gunicorn",
+        "--config", str(GUNICORN_CONF), "--chdir", str(app_dir),
+        *extra_args, "app:app",
+    ]
+
+
+def serve(extra_args=()):
+    """Replace this process with gunicorn serving app:app."""
+    if importlib.util.find_spec("gunicorn") is None:
+        raise click.ClickException("gunicorn is not installed (pip install gunicorn); use `python3 app.py` for the dev server.")
+    argv = gunicorn_argv(extra_args)
+    os.execv(argv[0], argv)
+
+
+@app.cli.command("serve", context_settings={"ignore_unknown_options": True, "allow_extra_args": True})
+@click.argument("gunicorn_args", nargs=-1, type=click.UNPROCESSED)
+def serve_command(gunicorn_args):
+    """Serve with gunicorn (settings in gunicorn.conf.py; extra args are passed on)."""
+    serve(gunicorn_args)
 
 
 # ---------------------------
 # Entrypoint
 # ---------------------------
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        try:
+            serve(sys.argv[2:])
+        except click.ClickException as e:
+            e.show()
+            sys.exit(e.exit_code)
     init_db()
     app.run(debug=True, port=5050, host="127.0.0.1")
 
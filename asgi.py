@@ -0,0 +1,466 @@
+"""
+ASGI entry point: the short JSON APIs and the /api/events stream served from
+one asyncio event loop, everything else handed to the Flask app.
+
+    pip install uvicorn
+    uvicorn asgi:application --port 5050            # any ASGI server works
+
+Served here (same helpers, same JSON as app.py):
+  GET   /api/selected                GET/POST /api/meal_plan
+  GET   /api/shopping_list           POST     /api/shopping_list
+  PATCH /api/shopping_list/<id>      DELETE   /api/shopping_list/<id>
+  POST  /api/shopping_list/batch     POST     /api/shopping_list/clear
+  POST  /api/shopping_list/aggregate GET      /feed/mealplan[.json|.ics]
+  GET   /api/events
+With RECIPES_METRICS=1 these get the same Server-Timing header and land in
+the same registry (/admin/metrics, /metrics) as requests Flask serves.
+
+A waiting request or an idle SSE stream is a coroutine, not a thread, so one
+process holds hundreds of them. SQLite calls run on a small dedicated
+executor (RECIPES_ASGI_DB_THREADS, default 4), each thread with its own
+pooled connection from app.get_conn(). Other routes go to the Flask app
+through a2wsgi or asgiref when installed, else through the buffered adapter
+below (RECIPES_ASGI_WSGI_THREADS threads); none of those routes stream.
+"""
+import asyncio
+import contextvars
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+import app as recipes
+
+DB_THREADS = int(os.environ.get("RECIPES_ASGI_DB_THREADS", "4"))
+WSGI_THREADS = int(os.environ.get("RECIPES_ASGI_WSGI_THREADS", "8"))
+MAX_BODY = 1024 * 1024  # JSON bodies only; uploads go through Flask
+
+db_executor = ThreadPoolExecutor(DB_THREADS, thread_name_prefix="asgi-db")
+
+# the current request's app.new_request_metrics() dict (RECIPES_METRICS=1)
+request_metrics = contextvars.ContextVar("request_metrics", default=None)
+
+
+async def run_db(fn, *args):
+    """
+    Run fn(conn, *args) on the DB executor with that thread's pooled connection.
+    SQL and phase timings go to the calling request's metrics.
+    """
+    m = request_metrics.get()
+
+    def call():
+        recipes._metrics_local.current = m
+        try:
+            with recipes.get_conn() as conn:
+                return fn(conn, *args)
+        finally:
+            recipes._metrics_local.current = None
+    return await asyncio.get_running_loop().run_in_executor(db_executor, call)
+
+
+# ---------------------------
+# Request / response helpers
+# ---------------------------
+class BodyTooLarge(Exception):
+    pass
+
+
+class Request:
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.method = scope["method"]
+        self.path = app_path(scope)
+        self.query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+    @property
+    def host_url(self):
+        scheme = self.scope.get("scheme", "http")
+        host = self.headers.get("host")
+        if not host:
+            server = self.scope.get("server") or ("127.0.0.1", 80)
+            host = f"{server[0]}:{server[1]}"
+        return f"{scheme}://{host}/"
+
+    async def body(self):
+        chunks, size = [], 0
+        while True:
+            message = await self.receive()
+            if message["type"] == "http.disconnect":
+                raise ConnectionError("client went away")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY:
+                raise BodyTooLarge(f"request body over {MAX_BODY} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def json(self):
+        try:
+            return json.loads(await self.body() or b"null")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+
+
+async def respond(send, status, body=b"", content_type="application/json", headers=()):
+    raw = [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+    raw += [(k.lower().encode(), str(v).encode("latin-1")) for k, v in headers]
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def respond_json(send, status, payload, headers=()):
+    await respond(send, status, json.dumps(payload).encode(), headers=headers)
+
+
+def app_path(scope):
+    """scope["path"] below the mount point (servers include root_path in it)."""
+    path, root = scope["path"], scope.get("root_path", "")
+    return path[len(root):] if root and path.startswith(root) else path
+
+
+def etag_matches(req, etag):
+    header = req.headers.get("if-none-match", "")
+    return header.strip() == "*" or f'"{etag}"' in [t.strip().removeprefix("W/") for t in header.split(",")]
+
+
+# ---------------------------
+# Live updates
+# ---------------------------
+broker = recipes.AsyncEventBroker(lambda: run_db(recipes.latest_event_id))
+
+# Flask routes that can publish_event(); writes elsewhere never wake streams
+PUBLISHING_PREFIXES = ("/api/shopping_list", "/api/meal_plan", "/api/planner/")
+
+
+async def api_events(req, send):
+    """Same stream as app.api_events: ?channels=, Last-Event-ID / ?last_id= resume."""
+    channels = {ch for ch in req.query.get("channels", "").split(",") if ch}
+    last_id = req.headers.get("last-event-id") or req.query.get("last_id")
+    last_id = int(last_id) if last_id and last_id.isdigit() else await run_db(recipes.latest_event_id)
+
+    disconnected = asyncio.Event()
+
+    async def watch():
+        while (await req.receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch())
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]})
+    try:
+        await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+        deadline = time.monotonic() + recipes.SSE_MAX_STREAM_S
+        while time.monotonic() < deadline and not disconnected.is_set():
+            rows = await run_db(recipes.events_after, last_id)
+            out = []
+            for event_id, channel, payload in rows:
+                last_id = event_id
+                if not channels or channel in channels:
+                    out.append(recipes.sse_format(event_id, channel, payload))
+            if out:
+                await send({"type": "http.response.body", "body": "".join(out).encode(), "more_body": True})
+            if rows:
+                continue
+            waiter = asyncio.create_task(broker.wait(last_id, recipes.SSE_HEARTBEAT_S))
+            gone = asyncio.create_task(disconnected.wait())
+            done, _ = await asyncio.wait({waiter, gone}, return_when=asyncio.FIRST_COMPLETED)
+            gone.cancel()
+            if waiter not in done:
+                waiter.cancel()
+                break
+            if not waiter.result():
+                await send({"type": "http.response.body", "body": b": keep-alive\n\n", "more_body": True})
+        if not disconnected.is_set():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+
+
+# ---------------------------
+# JSON endpoints
+# ---------------------------
+async def api_selected(req, send):
+    id_list = recipes.selected_ids(req.query.get("ids", ""))
+    if not id_list:
+        return await respond_json(send, 200, {"meals": []})
+
+    root = req.scope.get("root_path", "")
+
+    def read(conn):
+        return recipes.selected_meals(conn.cursor(), id_list, lambda rid: f"{root}/recipe/{rid}")
+    await respond_json(send, 200, {"meals": await run_db(read)})
+
+
+async def api_shopping_list_get(req, send):
+    since = req.query.get("since", "").strip()
+
+    def read(conn):
+        c = conn.cursor()
+        watermark = recipes.shopping_watermark(c)
+        etag = f"sl-{watermark or 0}"
+        if etag_matches(req, etag):
+            return watermark, etag, None
+        return watermark, etag, recipes.shopping_list_payload(c, since, watermark)
+
+    watermark, etag, payload = await run_db(read)
+    headers = [("ETag", f'"{etag}"'), ("X-Shopping-Watermark", watermark or ""), ("Cache-Control", "no-cache")]
+    if payload is None:
+        return await respond(send, 304, headers=headers)
+    await respond_json(send, 200, payload, headers)
+
+
+async def api_shopping_list_patch(req, send, item_id):
+    data = await req.json()
+    if not isinstance(data, dict):
+        return await respond_json(send, 400, {"error": "Invalid data"})
+    if not await run_db(recipes.patch_shopping_item, int(item_id), data):
+        return await respond_json(send, 400, {"error": "No valid fields"})
+    await broker.notify()
+    await respond_json(send, 200, {"status": "updated"})
+
+
+async def api_shopping_list_post(req, send):
+    data = await req.json()
+    error = recipes.new_item_error(data)
+    if error:
+        return await respond_json(send, 400, {"error": error})
+    payload = await run_db(recipes.add_shopping_item, data)
+    await broker.notify()
+    await respond_json(send, 200, payload)
+
+
+async def api_shopping_list_delete(req, send, item_id):
+    await run_db(recipes.remove_shopping_item, int(item_id))
+    await broker.notify()
+    await respond_json(send, 200, {"status": "deleted"})
+
+
+async def api_shopping_list_clear(req, send):
+    await run_db(recipes.clear_shopping_list)
+    await broker.notify()
+    await respond_json(send, 200, {"status": "cleared"})
+
+
+async def api_shopping_list_aggregate(req, send):
+    lines, recipe_ids, error = recipes.aggregate_request(await req.json() or {})
+    if error:
+        return await respond_json(send, 400, {"error": error})
+    items = await run_db(lambda conn: recipes.aggregate_items(conn.cursor(), lines, recipe_ids))
+    await respond_json(send, 200, {"items": items})
+
+
+async def api_shopping_list_batch(req, send):
+    data = await req.json()
+    ops = data.get("ops") if isinstance(data, dict) else data
+    error = recipes.validate_shopping_ops(ops)
+    if error:
+        return await respond_json(send, 400, {"error": error})
+    results, items, deleted = await run_db(recipes.apply_shopping_ops, ops)
+    await broker.notify()
+    await respond_json(send, 200, {"results": results, "items": items, "deleted": deleted})
+
+
+async def api_meal_plan(req, send):
+    if req.method == "GET":
+        return await respond_json(send, 200, await run_db(lambda conn: recipes.get_meal_plan(conn.cursor())))
+    data = await req.json()
+    if not isinstance(data, list) or not all(isinstance(s, dict) for s in data):
+        return await respond_json(send, 400, {"error": "Invalid data"})
+    diff = await run_db(recipes.save_meal_plan, data)
+    await broker.notify()
+    await respond_json(send, 200, {"ok": True, **diff})
+
+
+async def feed_mealplan(req, send, ext=None):
+    fmt = {None: "text", ".json": "json", ".ics": "ics"}[ext]
+    feed, updated = await run_db(lambda conn: recipes.feed_snapshot(conn.cursor(), req.host_url))
+    body, etag = feed[fmt]
+    headers = [("ETag", f'"{etag}"'), ("Cache-Control", f"public, max-age={recipes.FEED_MAX_AGE}")]
+    if updated:
+        headers.append(("Last-Modified", time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(updated))))
+    if etag_matches(req, etag):
+        return await respond(send, 304, headers=headers)
+    await respond(send, 200, body, recipes.FEED_TYPES[fmt], headers)
+
+
+# (method, path pattern, handler, the Flask rule it stands in for: metrics label)
+ROUTES = [
+    ("GET", re.compile(r"/api/selected"), api_selected, "/api/selected"),
+    ("GET", re.compile(r"/api/shopping_list"), api_shopping_list_get, "/api/shopping_list"),
+    ("POST", re.compile(r"/api/shopping_list"), api_shopping_list_post, "/api/shopping_list"),
+    ("PATCH", re.compile(r"/api/shopping_list/(\d+)"), api_shopping_list_patch, "/api/shopping_list/<int:item_id>"),
+    ("DELETE", re.compile(r"/api/shopping_list/(\d+)"), api_shopping_list_delete, "/api/shopping_list/<int:item_id>"),
+    ("POST", re.compile(r"/api/shopping_list/batch"), api_shopping_list_batch, "/api/shopping_list/batch"),
+    ("POST", re.compile(r"/api/shopping_list/clear"), api_shopping_list_clear, "/api/shopping_list/clear"),
+    ("POST", re.compile(r"/api/shopping_list/aggregate"), api_shopping_list_aggregate, "/api/shopping_list/aggregate"),
+    ("GET", re.compile(r"/api/meal_plan"), api_meal_plan, "/api/meal_plan"),
+    ("POST", re.compile(r"/api/meal_plan"), api_meal_plan, "/api/meal_plan"),
+    ("GET", re.compile(r"/feed/mealplan"), feed_mealplan, "/feed/mealplan"),
+    ("GET", re.compile(r"/feed/mealplan\.json"), partial(feed_mealplan, ext=".json"), "/feed/mealplan.json"),
+    ("GET", re.compile(r"/feed/mealplan\.ics"), partial(feed_mealplan, ext=".ics"), "/feed/mealplan.ics"),
+    ("GET", re.compile(r"/api/events"), api_events, "/api/events"),
+]
+
+
+def timed_send(send, rule, m):
+    """
+    send() wrapper for RECIPES_METRICS=1: when the response starts, add the
+    Server-Timing header and record the request, like app.py's after_request
+    hook (so a stream counts up to its first byte, as under Flask).
+    """
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            total = time.perf_counter() - m["start"]
+            timing = recipes.server_timing(m["phases"], m["sql"], total)
+            message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            recipes.metrics.observe(rule, total, m["phases"], m["sql"])
+        await send(message)
+    return wrapped
+
+
+# ---------------------------
+# Everything else: the Flask app
+# ---------------------------
+class BufferedWSGI:
+    """
+    Minimal WSGI-in-a-thread adapter used when neither a2wsgi nor asgiref is
+    installed: reads the whole request body, runs the Flask app on its own
+    executor and sends the buffered response.
+    """
+
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="asgi-wsgi")
+
+    def environ(self, scope, body):
+        server = scope.get("server") or ("127.0.0.1", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+            "PATH_INFO": app_path(scope).encode().decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": str(client[0]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for key, value in scope.get("headers", []):
+            name = key.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[name] = value
+            else:
+                name = f"HTTP_{name}"
+                environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+    def call(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"], started["headers"] = status, headers
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return started["status"], started["headers"], body
+
+    async def __call__(self, scope, receive, send):
+        try:
+            body = await Request(scope, receive).body()
+        except ConnectionError:
+            return
+        except BodyTooLarge as e:
+            return await respond_json(send, 413, {"error": str(e)})
+        loop = asyncio.get_running_loop()
+        status, headers, body = await loop.run_in_executor(self.executor, self.call, self.environ(scope, body))
+        await send({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def wsgi_fallback(wsgi_app):
+    try:
+        from a2wsgi import WSGIMiddleware
+        return WSGIMiddleware(wsgi_app, workers=WSGI_THREADS)
+    except ImportError:
+        pass
+    try:
+        from asgiref.wsgi import WsgiToAsgi
+        return WsgiToAsgi(wsgi_app)
+    except ImportError:
+        return BufferedWSGI(wsgi_app, WSGI_THREADS)
+
+
+flask_app = wsgi_fallback(recipes.app)
+
+
+# ---------------------------
+# ASGI application
+# ---------------------------
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.get_running_loop().run_in_executor(db_executor, recipes.init_db)
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            db_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return  # no websockets
+
+    method, path = scope["method"], app_path(scope)
+    for route_method, pattern, handler, rule in ROUTES:
+        m = pattern.fullmatch(path)
+        if m and route_method == method:
+            req = Request(scope, receive)
+            if recipes.METRICS_ENABLED:
+                metrics = recipes.new_request_metrics()
+                request_metrics.set(metrics)
+                send = timed_send(send, rule, metrics)
+            try:
+                return await handler(req, send, *m.groups())
+            except BodyTooLarge as e:
+                return await respond_json(send, 413, {"error": str(e)})
+            except ConnectionError:
+                return
+    await flask_app(scope, receive, send)
+    if method not in ("GET", "HEAD") and path.startswith(PUBLISHING_PREFIXES):
+        await broker.notify()  # the Flask write may have published an event
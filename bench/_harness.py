@@ -0,0 +1,113 @@
+"""
+Shared helpers for the bench/ scripts: run app.py on a throwaway copy of
+recipes_v2.db under the threaded Werkzeug server in a child process.
+
+    with app_server(tmpdir, "pooled") as (base, db_path):
+        urllib.request.urlopen(base + "/")
+
+Running this file directly is the child side: init the DB, bind a free
+port, print it, serve forever (BENCH_DEBUG=1 adds the debugger middleware,
+as app.run(debug=True) does). command_server() runs any other server
+command line, e.g. gunicorn.
+"""
+import contextlib
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def serve():
+    sys.path.insert(0, str(ROOT))
+    from werkzeug.serving import make_server
+    import app as recipes_app
+
+    recipes_app.init_db()
+    wsgi_app = recipes_app.app
+    if os.environ.get("BENCH_DEBUG") == "1":  # what app.run(debug=True) serves
+        from werkzeug.debug import DebuggedApplication
+        recipes_app.app.debug = True
+        wsgi_app = DebuggedApplication(recipes_app.app, evalex=True)
+    server = make_server("127.0.0.1", 0, wsgi_app, threaded=True)
+    print(server.port, flush=True)
+    server.serve_forever()
+
+
+def prepare_db(tmpdir, name, journal_mode="WAL"):
+    """Copy recipes_v2.db into tmpdir; returns (path, recipe_ids)."""
+    path = Path(tmpdir) / f"{name}.db"
+    shutil.copy(ROOT / "recipes_v2.db", path)
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    recipe_ids = [r[0] for r in conn.execute("SELECT id FROM recipes")]
+    conn.close()
+    return path, recipe_ids
+
+
+@contextlib.contextmanager
+def app_server(db_path, tmpdir, env=None):
+    """Serve app.py against db_path in a subprocess; yields the base URL."""
+    env = dict(os.environ, RECIPES_DB=str(db_path), RECIPES_NLP="0", **(env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, __file__],
+        cwd=tmpdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        port = int(proc.stdout.readline())
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(base, proc, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(base + "/feed/mealplan", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not come up")
+
+
+@contextlib.contextmanager
+def command_server(argv, db_path, tmpdir, env=None):
+    """Run a server command line with {port} filled in; yields the base URL once it answers."""
+    port = free_port()
+    env = dict(os.environ, RECIPES_DB=str(db_path), RECIPES_NLP="0", **(env or {}))
+    proc = subprocess.Popen(
+        [a.format(port=port) for a in argv],
+        cwd=tmpdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_for(base, proc)
+        yield base
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def percentile(values, pct):
+    values = sorted(values) or [0.0]
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+if __name__ == "__main__":
+    serve()
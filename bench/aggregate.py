@@ -0,0 +1,66 @@
+"""
+Times the ingredient aggregation behind /api/shopping_list/aggregate.
+
+    python3 bench/aggregate.py                # time a week of meals
+    python3 bench/aggregate.py --meals 28 --json
+
+Parses and aggregates the ingredients of --meals random recipes from
+recipes_v2.db. Correctness is covered by tests/test_aggregate.py.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("RECIPES_NLP", "0")
+
+import app as recipes_app  # noqa: E402
+
+def week_of_lines(meals, seed=0):
+    conn = sqlite3.connect(ROOT / "recipes_v2.db")
+    rows = [r[0] for r in conn.execute("SELECT ingredients FROM recipes")]
+    conn.close()
+    rng = random.Random(seed)
+    return [line for text in rng.choices(rows, k=meals) for line in recipes_app.ingredient_lines(text)]
+
+
+def time_aggregate(lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        recipes_app.aggregate_ingredients(recipes_app.parse_ingredients_block(lines))
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--meals", type=int, default=21, help="recipes in the simulated week")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    lines = week_of_lines(args.meals)
+    best = time_aggregate(lines, args.repeat)
+    merged = recipes_app.aggregate_ingredients(recipes_app.parse_ingredients_block(lines))
+    result = {
+        "meals": args.meals,
+        "lines": len(lines),
+        "merged_items": len(merged),
+        "best_ms": best * 1000,
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{args.meals} meals: {len(lines)} lines -> {len(merged)} items in {best * 1000:.2f} ms (best of {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Many light API clients plus many open SSE streams: sync servers vs asgi.py.
+
+Each server gets its own copy of recipes_v2.db. --streams planner tabs hold
+/api/events open while --clients threads loop over the short JSON endpoints
+for --duration seconds; then one PATCH checks that every stream still gets
+the change:
+
+    python3 bench/asgi_concurrency.py                    # 200 streams, 100 clients
+    python3 bench/asgi_concurrency.py -s 500 -c 200 --json
+
+Servers:
+  dev       threaded Werkzeug (a thread per connection)
+  gunicorn  gunicorn.conf.py, 2 workers x 8 threads, SSE off (streams refused,
+            clients poll) so it only shows the light-request side
+  asgi      uvicorn asgi:application, one process
+
+gunicorn / asgi are skipped (with a note) when gunicorn / uvicorn aren't
+installed. Clients and server share the machine, so compare servers within
+one run rather than across machines.
+"""
+import argparse
+import importlib.util
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from _harness import ROOT, app_server, command_server, prepare_db
+from loadtest import route_path, summarize
+from serving import gunicorn_server
+from sse_clients import listen
+
+LIGHT_ROUTES = ["/api/selected", "/api/shopping_list", "/api/meal_plan", "/feed/mealplan"]
+
+
+def asgi_server(db_path, tmpdir):
+    argv = [
+        sys.executable, "-m", "uvicorn", "asgi:application",
+        "--app-dir", str(ROOT), "--port", "{port}", "--log-level", "warning",
+    ]
+    return command_server(argv, db_path, tmpdir)
+
+
+def stream(base, ready, received, stop):
+    try:
+        listen(base, ready, received, stop)
+    except OSError:
+        pass  # server never answered / dropped the stream: counted as not delivered
+
+
+def light_client(base, recipe_ids, deadline, stats, seed):
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        path = route_path(rng.choice(LIGHT_ROUTES), rng, recipe_ids, [])
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base + path, timeout=30) as resp:
+                resp.read()
+            latencies.append(time.perf_counter() - t0)
+        except (urllib.error.URLError, OSError):
+            errors += 1
+    with stats["lock"]:
+        stats["latencies"].extend(latencies)
+        stats["errors"] += errors
+
+
+def run(start, tmpdir, name, streams, clients, duration):
+    db_path, recipe_ids = prepare_db(tmpdir, name)
+    with start(db_path, tmpdir) as base:
+        with urllib.request.urlopen(base + "/api/shopping_list") as resp:
+            items = json.loads(resp.read())
+        if not items:
+            req = urllib.request.Request(
+                base + "/api/shopping_list", data=json.dumps({"name": "bench item"}).encode(),
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            with urllib.request.urlopen(req) as resp:
+                items = [json.loads(resp.read())]
+
+        # open the SSE streams (some servers can't accept them all: give up after 10 s)
+        ready = threading.Semaphore(0)
+        stop = threading.Event()
+        received = [[] for _ in range(streams)]
+        for i in range(streams):
+            threading.Thread(target=stream, args=(base, ready, received[i], stop), daemon=True).start()
+        opened = 0
+        give_up = time.monotonic() + 10
+        while opened < streams and ready.acquire(timeout=max(0.0, give_up - time.monotonic())):
+            opened += 1
+
+        stats = {"latencies": [], "errors": 0, "lock": threading.Lock()}
+        deadline = time.perf_counter() + duration
+        threads = [
+            threading.Thread(target=light_client, args=(base, recipe_ids, deadline, stats, n))
+            for n in range(clients)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        # one change: how many of the streams see it within 5 s?
+        before = [len(r) for r in received]
+        req = urllib.request.Request(
+            f"{base}/api/shopping_list/{items[0]['id']}", data=json.dumps({"checked": True}).encode(),
+            headers={"Content-Type": "application/json"}, method="PATCH",
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                resp.read()
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(5)
+        delivered = sum(len(r) > b for r, b in zip(received, before))
+        stop.set()
+
+    return {
+        "streams_opened": opened,
+        "streams_delivered": delivered,
+        "clients": clients,
+        "errors": stats["errors"],
+        **summarize(stats["latencies"], elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-s", "--streams", type=int, default=200, help="open /api/events streams")
+    parser.add_argument("-c", "--clients", type=int, default=100, help="concurrent light-request clients")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds per server")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    servers = {"dev": lambda db, tmp: app_server(db, tmp)}
+    notes = []
+    if importlib.util.find_spec("gunicorn"):
+        servers["gunicorn"] = lambda db, tmp: gunicorn_server(db, tmp, None, None)
+    else:
+        notes.append("gunicorn not installed: skipped")
+    if importlib.util.find_spec("uvicorn"):
+        servers["asgi"] = asgi_server
+    else:
+        notes.append("uvicorn not installed: asgi skipped")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, start in servers.items():
+            results[name] = run(start, tmpdir, name, args.streams, args.clients, args.duration)
+
+    if args.json:
+        print(json.dumps({"streams": args.streams, "clients": args.clients, "notes": notes, "servers": results}, indent=2))
+        return
+    for note in notes:
+        print(note)
+    print(f"{'server':<9} {'streams':>9} {'delivered':>9} {'req/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>8} {'errors':>6}")
+    for name, r in results.items():
+        print(f"{name:<9} {r['streams_opened']:>9} {r['streams_delivered']:>9} {r['req_per_s']:>8.1f} "
+              f"{r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} {r['p99_ms']:>8.1f} {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
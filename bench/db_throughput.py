@@ -0,0 +1,125 @@
+"""
+Requests/sec of app.py with and without the pooled WAL connection layer.
+
+Runs the app on a throwaway copy of recipes_v2.db under the threaded
+Werkzeug server (one subprocess per mode) and hammers it with concurrent
+clients doing a read-heavy mix plus shopping-list PATCHes:
+
+    python3 bench/db_throughput.py                 # 8 clients, 10 s per mode
+    python3 bench/db_throughput.py -c 16 -d 20 --json
+
+Modes:
+  legacy   RECIPES_DB_POOL=0, rollback journal, sqlite3.connect() per call
+  pooled   default pool + WAL / synchronous=NORMAL / mmap / busy_timeout
+"""
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from _harness import app_server, percentile, prepare_db
+
+MODES = {
+    "legacy": {"RECIPES_DB_POOL": "0"},
+    "pooled": {},
+}
+
+READ_PATHS = [
+    "/",
+    "/search?q=chicken",
+    "/search?tag=beef",
+    "/api/shopping_list",
+    "/api/meal_plan",
+    "/feed/mealplan",
+]
+
+
+def client(base, recipe_ids, item_ids, deadline, write_ratio, stats):
+    rng = random.Random()
+    ok = errors = 0
+    latencies = []
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        if item_ids and roll < write_ratio:
+            req = urllib.request.Request(
+                f"{base}/api/shopping_list/{rng.choice(item_ids)}",
+                data=json.dumps({"checked": rng.randint(0, 1)}).encode(),
+                headers={"Content-Type": "application/json"},
+                method="PATCH",
+            )
+        elif roll < 0.5:
+            rid = rng.choice(recipe_ids)
+            path = rng.choice([f"/recipe/{rid}", f"/api/selected?ids={rid},{rng.choice(recipe_ids)}"])
+            req = urllib.request.Request(base + path)
+        else:
+            req = urllib.request.Request(base + rng.choice(READ_PATHS))
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                resp.read()
+            ok += 1
+            latencies.append(time.perf_counter() - t0)
+        except (urllib.error.URLError, OSError):
+            errors += 1
+    with stats["lock"]:
+        stats["ok"] += ok
+        stats["errors"] += errors
+        stats["latencies"].extend(latencies)
+
+
+def run_mode(mode, clients, duration, write_ratio, tmpdir):
+    db_path, recipe_ids = prepare_db(tmpdir, mode, "DELETE" if mode == "legacy" else "WAL")
+    with app_server(db_path, tmpdir, MODES[mode]) as base:
+        conn = sqlite3.connect(db_path)
+        item_ids = [r[0] for r in conn.execute("SELECT id FROM shopping_list")]
+        conn.close()
+
+        stats = {"ok": 0, "errors": 0, "latencies": [], "lock": threading.Lock()}
+        deadline = time.perf_counter() + duration
+        threads = [
+            threading.Thread(target=client, args=(base, recipe_ids, item_ids, deadline, write_ratio, stats))
+            for _ in range(clients)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+    lat = stats["latencies"]
+    return {
+        "requests": stats["ok"],
+        "errors": stats["errors"],
+        "req_per_s": stats["ok"] / elapsed,
+        "p50_ms": percentile(lat, 50) * 1000,
+        "p95_ms": percentile(lat, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-c", "--clients", type=int, default=8)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("-w", "--write-ratio", type=float, default=0.1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = {m: run_mode(m, args.clients, args.duration, args.write_ratio, tmpdir) for m in MODES}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['req_per_s']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
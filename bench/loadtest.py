@@ -0,0 +1,292 @@
+"""
+Latency / throughput of the main routes on synthetic recipe collections.
+
+Seeds a fresh database per size from the shape of recipes_v2.db, then drives
+the routes twice: sequentially through the Flask test client (app cost only,
+no sockets) and with concurrent clients against the threaded Werkzeug server:
+
+    python3 bench/loadtest.py                          # 1k and 10k recipes
+    python3 bench/loadtest.py --sizes 1000,10000,100000 --json > before.json
+    python3 bench/loadtest.py -c 16 -d 20 --no-cache
+
+Seeding samples ingredient counts, ingredients (weighted by how often they
+occur), tags and names from recipes_v2.db, and gives a share of the lines
+amounts/units the way the parser bench does. Every route reports
+p50/p95/p99 ms and req/s; --json prints everything for diffing runs.
+--no-cache sets RECIPES_PAGE_CACHE=0 so repeated GETs aren't page-cache hits.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from pathlib import Path
+
+from _harness import ROOT, app_server, percentile
+
+ROUTES = ["/", "/search", "/recipe", "/api/selected", "/api/shopping_list", "/feed/mealplan"]
+SEEDED_TABLES = ("recipes", "tags", "shopping_list", "meal_plan")
+AMOUNTS = ["1", "2", "3", "200", "250", "0.5", "1/2", "1 1/2", "½", "¼"]
+UNITS = ["g", "kg", "ml", "tsp", "tbsp", "cup", "cloves", "tin", ""]
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+MEALS = ["breakfast", "lunch", "dinner"]
+
+
+# --- seeding ---
+
+def corpus():
+    """What the synthetic recipes are drawn from, all read from recipes_v2.db."""
+    conn = sqlite3.connect(ROOT / "recipes_v2.db")
+    rows = conn.execute("SELECT name, ingredients, tags, method FROM recipes").fetchall()
+    ddl = dict(conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN {SEEDED_TABLES}"
+    ))
+    tag_rows = conn.execute("SELECT id, tag_group, name FROM tags").fetchall()
+    shopping = conn.execute("SELECT category, name, amount FROM shopping_list").fetchall()
+    conn.close()
+
+    def as_list(raw):
+        try:
+            value = json.loads(raw or "[]")
+        except ValueError:
+            value = [s for s in (raw or "").split(",")]
+        return [str(v).strip() for v in value if str(v).strip()] if isinstance(value, list) else []
+
+    ingredients = [as_list(r[1]) for r in rows]
+    tags = [as_list(r[2]) for r in rows]
+    return {
+        "names": [r[0] for r in rows if r[0]],
+        "methods": [r[3] for r in rows if r[3]],
+        "method_share": sum(1 for r in rows if r[3]) / max(len(rows), 1),
+        "line_counts": [len(i) for i in ingredients if i] or [6],
+        "items": Counter(line for lines in ingredients for line in lines),
+        "tag_counts": [len(t) for t in tags] or [1],
+        "tags": Counter(t for ts in tags for t in ts),
+        "ddl": ddl,
+        "tag_rows": tag_rows,
+        "shopping": shopping,
+    }
+
+
+def seed_db(path, size, src, seed=0):
+    """Write a database with `size` synthetic recipes; init_db() builds the rest."""
+    rng = random.Random(seed)
+    items, item_weights = zip(*src["items"].items())
+    tags, tag_weights = zip(*src["tags"].items())
+
+    def ingredient_line():
+        line = rng.choices(items, item_weights)[0]
+        if rng.random() < 0.4 and not line[:1].isdigit():
+            unit = rng.choice(UNITS)
+            line = f"{rng.choice(AMOUNTS)} {unit + ' ' if unit else ''}{line}"
+        return line
+
+    recipes = []
+    for rid in range(1, size + 1):
+        n_tags = rng.choice(src["tag_counts"])
+        recipes.append((
+            rid,
+            f"{rng.choice(src['names'])} #{rid}",
+            json.dumps([ingredient_line() for _ in range(rng.choice(src["line_counts"]))]),
+            rng.choice(src["methods"]) if src["methods"] and rng.random() < src["method_share"] else None,
+            json.dumps(sorted(set(rng.choices(tags, tag_weights, k=n_tags))) if n_tags else []),
+            "Misc",
+        ))
+
+    conn = sqlite3.connect(path)
+    for table in SEEDED_TABLES:
+        if table in src["ddl"]:
+            conn.execute(src["ddl"][table])
+    conn.executemany(
+        "INSERT INTO recipes (id, name, ingredients, method, tags, category) VALUES (?, ?, ?, ?, ?, ?)",
+        recipes,
+    )
+    conn.executemany("INSERT INTO tags (id, tag_group, name) VALUES (?, ?, ?)", src["tag_rows"])
+    conn.executemany(
+        "INSERT OR IGNORE INTO shopping_list (category, name, amount, active) VALUES (?, ?, ?, 1)",
+        src["shopping"],
+    )
+    plan = []
+    for day in DAYS:
+        for meal in MEALS:
+            rid, name = rng.choice(recipes)[:2]
+            plan.append((f"{day}_{meal}", name, f"/recipe/{rid}"))
+    conn.executemany("INSERT INTO meal_plan (slot, recipe, link) VALUES (?, ?, ?)", plan)
+    conn.commit()
+    conn.close()
+    return [r[0] for r in recipes]
+
+
+def route_path(route, rng, recipe_ids, terms):
+    if route == "/search":
+        return f"/search?q={rng.choice(terms)}"
+    if route == "/recipe":
+        return f"/recipe/{rng.choice(recipe_ids)}"
+    if route == "/api/selected":
+        return "/api/selected?ids=" + ",".join(str(i) for i in rng.sample(recipe_ids, min(3, len(recipe_ids))))
+    return route
+
+
+def summarize(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "req_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+# --- Flask test client (runs in a child so RECIPES_DB is read at import) ---
+
+def test_client_child(db_path, requests_per_route, terms):
+    sys.path.insert(0, str(ROOT))
+    import app as recipes_app
+
+    t0 = time.perf_counter()
+    recipes_app.init_db()
+    init_s = time.perf_counter() - t0
+    with recipes_app.get_conn() as conn:
+        recipe_ids = [r[0] for r in conn.execute("SELECT id FROM recipes")]
+
+    client = recipes_app.app.test_client()
+    rng = random.Random(1)
+    result = {"init_db_s": init_s, "routes": {}}
+    for route in ROUTES:
+        for _ in range(3):  # warm up: first-request imports, statement cache
+            client.get(route_path(route, rng, recipe_ids, terms))
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for _ in range(requests_per_route):
+            path = route_path(route, rng, recipe_ids, terms)
+            t = time.perf_counter()
+            status = client.get(path).status_code
+            latencies.append(time.perf_counter() - t)
+            errors += status >= 400
+        result["routes"][route] = {**summarize(latencies, time.perf_counter() - start), "errors": errors}
+    print(json.dumps(result))
+
+
+def run_test_client(db_path, tmpdir, requests_per_route, terms, env):
+    proc = subprocess.run(
+        [sys.executable, __file__, "--test-client", str(db_path),
+         "--requests", str(requests_per_route), "--terms", ",".join(terms)],
+        cwd=tmpdir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# --- real WSGI server with concurrent clients ---
+
+def client(base, recipe_ids, terms, deadline, stats):
+    rng = random.Random()
+    latencies = {route: [] for route in ROUTES}
+    errors = 0
+    while time.perf_counter() < deadline:
+        route = rng.choice(ROUTES)
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base + route_path(route, rng, recipe_ids, terms), timeout=30) as resp:
+                resp.read()
+            latencies[route].append(time.perf_counter() - t0)
+        except (urllib.error.URLError, OSError):
+            errors += 1
+    with stats["lock"]:
+        stats["errors"] += errors
+        for route, values in latencies.items():
+            stats["latencies"][route].extend(values)
+
+
+def run_server(db_path, tmpdir, recipe_ids, terms, clients, duration, env):
+    stats = {"errors": 0, "latencies": {route: [] for route in ROUTES}, "lock": threading.Lock()}
+    with app_server(db_path, tmpdir, env) as base:
+        urllib.request.urlopen(base + "/").read()  # first request outside the clock
+        deadline = time.perf_counter() + duration
+        threads = [
+            threading.Thread(target=client, args=(base, recipe_ids, terms, deadline, stats))
+            for _ in range(clients)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+    every = [v for values in stats["latencies"].values() for v in values]
+    return {
+        "clients": clients,
+        "errors": stats["errors"],
+        **summarize(every, elapsed),
+        "routes": {route: summarize(values, elapsed) for route, values in stats["latencies"].items()},
+    }
+
+
+def run_size(size, args, src, terms, tmpdir):
+    db_path = Path(tmpdir) / f"load_{size}.db"
+    t0 = time.perf_counter()
+    recipe_ids = seed_db(db_path, size, src)
+    seed_s = time.perf_counter() - t0
+
+    env = dict(os.environ, RECIPES_DB=str(db_path), RECIPES_NLP="0")
+    if args.no_cache:
+        env["RECIPES_PAGE_CACHE"] = "0"
+    # the test-client child runs init_db() first, so the server starts on a built DB
+    result = {"recipes": size, "seed_s": seed_s}
+    result["test_client"] = run_test_client(db_path, tmpdir, args.requests, terms, env)
+    extra = {"RECIPES_PAGE_CACHE": "0"} if args.no_cache else {}
+    result["server"] = run_server(db_path, tmpdir, recipe_ids, terms, args.clients, args.duration, extra)
+    return result
+
+
+def print_table(results):
+    for r in results:
+        print(f"\n{r['recipes']:,} recipes  (seed {r['seed_s']:.1f} s, init_db {r['test_client']['init_db_s']:.1f} s)")
+        print(f"{'route':<20} {'client p50':>10} {'p95':>7} {'p99':>7} {'server p50':>10} {'p95':>7} {'p99':>7} {'req/s':>7}")
+        for route in ROUTES:
+            tc, sv = r["test_client"]["routes"][route], r["server"]["routes"][route]
+            print(f"{route:<20} {tc['p50_ms']:>10.1f} {tc['p95_ms']:>7.1f} {tc['p99_ms']:>7.1f} "
+                  f"{sv['p50_ms']:>10.1f} {sv['p95_ms']:>7.1f} {sv['p99_ms']:>7.1f} {sv['req_per_s']:>7.1f}")
+        sv = r["server"]
+        print(f"{'all (server)':<20} {'':>10} {'':>7} {'':>7} {sv['p50_ms']:>10.1f} {sv['p95_ms']:>7.1f} "
+              f"{sv['p99_ms']:>7.1f} {sv['req_per_s']:>7.1f}   {sv['clients']} clients, {sv['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated recipe counts")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="test-client requests per route")
+    parser.add_argument("-c", "--clients", type=int, default=8, help="concurrent server clients")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="server seconds per size")
+    parser.add_argument("--no-cache", action="store_true", help="disable the page cache")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--test-client", help=argparse.SUPPRESS)  # child side
+    parser.add_argument("--terms", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.test_client:
+        test_client_child(args.test_client, args.requests, args.terms.split(","))
+        return
+
+    src = corpus()
+    # search terms: the most common single-word ingredients and tags
+    terms = [t for t, _ in (src["items"] + src["tags"]).most_common() if t.isalpha()][:20] or ["chicken"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = [run_size(int(s), args, src, terms, tmpdir) for s in args.sizes.split(",") if s.strip()]
+
+    if args.json:
+        print(json.dumps({"clients": args.clients, "no_cache": args.no_cache, "results": results}, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
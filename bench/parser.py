@@ -0,0 +1,162 @@
+"""
+Lines/sec of the ingredient-line parser against a corpus built from recipes_v2.db.
+
+    python3 bench/parser.py                 # table
+    python3 bench/parser.py --json --size 100000
+
+The corpus contains every ingredient line in the DB. It is padded to --size
+with DB items given random amounts and units ("1 1/2 cups rice",
+"2½ tbsp oil"), because most stored lines are bare item names. Runs:
+
+  legacy      the old per-call re.match + nine str.replace passes (copied below)
+  cold        parse_many() with its line cache cleared (every line parsed)
+  legacy-db   legacy over the DB's own lines repeated to --size, which is what
+              re-importing / aggregating real recipes looks like
+  warm        parse_many() over that same repeated set (line cache hits)
+
+Speedups compare cold with legacy and warm with legacy-db.
+
+Before timing, every line is checked to give the same result as the legacy
+parser. The one known difference is "1½": the legacy parser reads it as "11/2".
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("RECIPES_NLP", "0")
+
+import app as recipes_app  # noqa: E402
+
+# --- the parser as it was before the compiled version, for comparison ---
+LEGACY_FRACTION_MAP = dict(recipes_app.FRACTION_MAP)
+LEGACY_UNITS = set(recipes_app.UNITS)
+
+
+def legacy_parse_ingredient_line(line):
+    original = line.strip()
+    if not original:
+        return None
+    s = original
+    for sym, ascii_frac in LEGACY_FRACTION_MAP.items():
+        s = s.replace(sym, ascii_frac)
+    m = re.match(
+        r"""^\s*
+        (?P<amount>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)?
+        \s*
+        (?:(?P<unit>fl\s*oz|[a-zA-Z]+)\b)?
+        \s*
+        (?P<rest>.+?)
+        \s*$""",
+        s, re.VERBOSE
+    )
+    amount = unit = item = note = ""
+    if m:
+        amount = (m.group("amount") or "").strip()
+        unit = re.sub(r"\s+", " ", (m.group("unit") or "").strip().lower())
+        rest = (m.group("rest") or "").strip()
+        if unit and unit not in LEGACY_UNITS:
+            rest = (m.group("unit") + " " + rest).strip()
+            unit = ""
+        parts = [p.strip() for p in rest.split(",", 1)]
+        item = parts[0]
+        if len(parts) == 2:
+            note = parts[1]
+    else:
+        item = original
+    return {"amount": amount, "unit": unit, "item": item, "note": note, "raw": original}
+
+
+AMOUNTS = ["1", "2", "3", "200", "250", "0.5", "1/2", "1 1/2", "½", "¼", "2½", "¾"]
+UNITS = ["g", "kg", "ml", "tsp", "tbsp", "cup", "cups", "cloves", "tin", "Tbsp", "fl oz", ""]
+NOTES = ["", "", "", ", chopped", ", finely diced", ", to serve"]
+
+
+def db_lines():
+    conn = sqlite3.connect(ROOT / "recipes_v2.db")
+    texts = [r[0] for r in conn.execute("SELECT ingredients FROM recipes")]
+    conn.close()
+    return [line for text in texts for line in recipes_app.ingredient_lines(text)]
+
+
+def build_corpus(size, seed=0):
+    lines = db_lines()
+    items = [recipes_app.parse_ingredient_line(l)["item"] for l in lines] or ["onion"]
+    rng = random.Random(seed)
+    while len(lines) < size:
+        unit = rng.choice(UNITS)
+        lines.append(f"{rng.choice(AMOUNTS)} {unit + ' ' if unit else ''}{rng.choice(items)}{rng.choice(NOTES)}")
+    return lines[:size]
+
+
+def check(lines):
+    mismatches = []
+    for line in lines:
+        if re.search(r"\d[½¼¾⅓⅔⅛⅜⅝⅞]", line):
+            continue  # fixed on purpose: "1½" is 1 1/2, not 11/2
+        if legacy_parse_ingredient_line(line) != recipes_app.parse_ingredient_line(line):
+            mismatches.append(line)
+    return mismatches
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=20000, help="corpus lines")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    lines = build_corpus(args.size)
+    mismatches = check(lines)
+    real = db_lines()
+    repeated = (real * (args.size // max(len(real), 1) + 1))[:args.size]
+
+    def cold():
+        recipes_app._parse_line.cache_clear()
+        recipes_app.parse_many(lines)
+
+    timings = {
+        "legacy": best_of(lambda: [legacy_parse_ingredient_line(l) for l in lines], args.repeat),
+        "cold": best_of(cold, args.repeat),
+        "legacy-db": best_of(lambda: [legacy_parse_ingredient_line(l) for l in repeated], args.repeat),
+        "warm": best_of(lambda: recipes_app.parse_many(repeated), args.repeat),
+    }
+    baseline = {"legacy": "legacy", "cold": "legacy", "legacy-db": "legacy-db", "warm": "legacy-db"}
+    result = {
+        "lines": len(lines),
+        "unique_lines": len(set(l.strip() for l in lines)),
+        "mismatches": len(mismatches),
+        "lines_per_s": {name: len(lines) / t for name, t in timings.items()},
+        "speedup_vs_legacy": {name: timings[baseline[name]] / t for name, t in timings.items()},
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for line in mismatches[:10]:
+            print(f"MISMATCH {line!r}: {legacy_parse_ingredient_line(line)} != {recipes_app.parse_ingredient_line(line)}")
+        print(f"{result['lines']} lines ({result['unique_lines']} unique), {len(mismatches)} mismatches")
+        print(f"{'parser':<10} {'lines/s':>12} {'speedup':>8}")
+        for name in timings:
+            print(f"{name:<10} {result['lines_per_s'][name]:>12,.0f} {result['speedup_vs_legacy'][name]:>7.1f}x")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Throughput of the dev server vs `app.py serve` (gunicorn, gunicorn.conf.py).
+
+Same route mix and clients as bench/loadtest.py, one server at a time, each
+on its own throwaway database:
+
+    python3 bench/serving.py                        # 16 clients, 10 s per server
+    python3 bench/serving.py -c 32 --recipes 10000 --json
+    python3 bench/serving.py --workers 4 --threads 4
+
+Servers:
+  dev-debug  threaded Werkzeug + debugger, i.e. what `python3 app.py` runs
+  dev        threaded Werkzeug without the debugger
+  gunicorn   gunicorn.conf.py (preloaded app, gthread workers); --workers /
+             --threads override RECIPES_WORKERS / RECIPES_THREADS
+
+gunicorn is skipped (with a note) when it isn't installed. The clients run
+on the same machine, so on a box with fewer than ~4 cores they compete with
+the workers for CPU and the comparison says little; run it on the Pi.
+"""
+import argparse
+import importlib.util
+import json
+import sys
+import tempfile
+import threading
+import time
+
+from _harness import ROOT, app_server, command_server, prepare_db
+from loadtest import ROUTES, client, corpus, seed_db, summarize
+
+
+def gunicorn_server(db_path, tmpdir, workers, threads):
+    argv = [
+        sys.executable, "-m", "gunicorn",
+        "--config", str(ROOT / "gunicorn.conf.py"), "--chdir", str(ROOT),
+        "--bind", "127.0.0.1:{port}",
+    ]
+    if workers:
+        argv += ["--workers", str(workers)]
+    if threads:
+        argv += ["--threads", str(threads)]
+    return command_server(argv + ["app:app"], db_path, tmpdir)
+
+
+def drive(base, recipe_ids, terms, clients, duration):
+    stats = {"errors": 0, "latencies": {route: [] for route in ROUTES}, "lock": threading.Lock()}
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(base, recipe_ids, terms, deadline, stats))
+        for _ in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    every = [v for values in stats["latencies"].values() for v in values]
+    return {"errors": stats["errors"], **summarize(every, elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-c", "--clients", type=int, default=16)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds per server")
+    parser.add_argument("--recipes", type=int, default=0, help="synthetic recipes (0 = copy of recipes_v2.db)")
+    parser.add_argument("--workers", type=int, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, help="gunicorn threads per worker")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    src = corpus()
+    terms = [t for t, _ in (src["items"] + src["tags"]).most_common() if t.isalpha()][:20] or ["chicken"]
+    servers = {
+        "dev-debug": lambda db, tmp: app_server(db, tmp, {"BENCH_DEBUG": "1"}),
+        "dev": lambda db, tmp: app_server(db, tmp),
+    }
+    notes = []
+    if importlib.util.find_spec("gunicorn"):
+        servers["gunicorn"] = lambda db, tmp: gunicorn_server(db, tmp, args.workers, args.threads)
+    else:
+        notes.append("gunicorn not installed: skipped")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, start in servers.items():
+            if args.recipes:
+                db_path = f"{tmpdir}/{name}.db"
+                recipe_ids = seed_db(db_path, args.recipes, src)
+            else:
+                db_path, recipe_ids = prepare_db(tmpdir, name)
+            with start(db_path, tmpdir) as base:
+                drive(base, recipe_ids, terms, 2, 1.0)  # warm up: imports, pool, page cache
+                results[name] = drive(base, recipe_ids, terms, args.clients, args.duration)
+
+    if args.json:
+        print(json.dumps({"clients": args.clients, "recipes": args.recipes, "notes": notes, "servers": results}, indent=2))
+        return
+    for note in notes:
+        print(note)
+    base_rps = results.get("dev-debug", {}).get("req_per_s")
+    print(f"{'server':<10} {'req/s':>8} {'vs dev':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'errors':>6}")
+    for name, r in results.items():
+        ratio = f"{r['req_per_s'] / base_rps:.1f}x" if base_rps else "-"
+        print(f"{name:<10} {r['req_per_s']:>8.1f} {ratio:>7} {r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} "
+              f"{r['p99_ms']:>7.1f} {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
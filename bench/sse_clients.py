@@ -0,0 +1,126 @@
+"""
+Delivery latency of /api/events with many open planner tabs.
+
+Opens N concurrent SSE streams against a throwaway copy of recipes_v2.db
+(threaded Werkzeug server), then PATCHes shopping-list items at a fixed rate
+and times how long each change takes to reach every stream:
+
+    python3 bench/sse_clients.py                   # 50 clients, 40 writes
+    python3 bench/sse_clients.py -c 200 -n 100 --json
+
+Under the threaded server each open stream holds one thread that sleeps on
+the broker's Condition between events, so idle clients cost memory, not CPU.
+"""
+import argparse
+import http.client
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+from _harness import app_server, percentile, prepare_db
+
+
+def listen(base, ready, received, stop):
+    """One SSE client: record the arrival time of every shopping_list event."""
+    url = urlsplit(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+    conn.request("GET", "/api/events?channels=shopping_list", headers={"Accept": "text/event-stream"})
+    resp = conn.getresponse()
+    ready.release()
+    event = None
+    while not stop.is_set():
+        line = resp.readline()
+        if not line:
+            break
+        line = line.decode().rstrip("\n")
+        if line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: ") and event == "shopping_list":
+            received.append(time.perf_counter())
+    conn.close()
+
+
+def run(clients, writes, interval, tmpdir):
+    db_path, _ = prepare_db(tmpdir, "sse")
+    with app_server(db_path, tmpdir) as base:
+        with urllib.request.urlopen(base + "/api/shopping_list") as resp:
+            item_ids = [i["id"] for i in json.loads(resp.read())]
+        if not item_ids:
+            req = urllib.request.Request(
+                base + "/api/shopping_list",
+                data=json.dumps({"name": "bench item"}).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(req) as resp:
+                item_ids = [json.loads(resp.read())["id"]]
+
+        ready = threading.Semaphore(0)
+        stop = threading.Event()
+        streams = [[] for _ in range(clients)]
+        threads = [
+            threading.Thread(target=listen, args=(base, ready, streams[i], stop), daemon=True)
+            for i in range(clients)
+        ]
+        for t in threads:
+            t.start()
+        for _ in threads:
+            ready.acquire()
+        time.sleep(0.5)
+
+        sent = []
+        for n in range(writes):
+            req = urllib.request.Request(
+                f"{base}/api/shopping_list/{item_ids[n % len(item_ids)]}",
+                data=json.dumps({"checked": n % 2}).encode(),
+                headers={"Content-Type": "application/json"},
+                method="PATCH",
+            )
+            sent.append(time.perf_counter())
+            with urllib.request.urlopen(req) as resp:
+                resp.read()
+            time.sleep(interval)
+        time.sleep(2)
+        stop.set()
+
+    latencies = []
+    missed = 0
+    for received in streams:
+        missed += max(0, writes - len(received))
+        latencies.extend(r - s for s, r in zip(sent, received))
+    return {
+        "clients": clients,
+        "writes": writes,
+        "delivered": len(latencies),
+        "missed": missed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "max_ms": max(latencies or [0.0]) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-c", "--clients", type=int, default=50)
+    parser.add_argument("-n", "--writes", type=int, default=40)
+    parser.add_argument("-i", "--interval", type=float, default=0.1, help="seconds between writes")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        result = run(args.clients, args.writes, args.interval, tmpdir)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{'clients':>7} {'writes':>6} {'delivered':>9} {'missed':>6} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}")
+    r = result
+    print(f"{r['clients']:>7} {r['writes']:>6} {r['delivered']:>9} {r['missed']:>6} "
+          f"{r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} {r['max_ms']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
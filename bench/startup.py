@@ -0,0 +1,83 @@
+"""
+Startup time / resident memory benchmark for app.py's spaCy loading.
+
+Each scenario runs in a fresh Python process so import costs aren't shared:
+
+    python3 bench/startup.py            # table
+    python3 bench/startup.py --json     # machine-readable
+
+Scenarios:
+  nlp-off        RECIPES_NLP=0, app import only
+  lazy-import    default config, app import only (model not touched)
+  lazy-first-use default config, import + first get_nlp() call
+  full-pipeline  same, but with parser/ner left enabled (the old behaviour)
+  small-model    en_core_web_sm, import + first get_nlp() call
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter() - t0
+t_nlp = None
+if sys.argv[1] == "1":
+    t1 = time.perf_counter()
+    nlp = app.get_nlp()
+    t_nlp = time.perf_counter() - t1
+    loaded = nlp is not None
+else:
+    loaded = False
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"import_s": t_import, "nlp_load_s": t_nlp, "nlp_loaded": loaded, "max_rss_mb": rss_kb / 1024}))
+"""
+
+SCENARIOS = [
+    ("nlp-off", {"RECIPES_NLP": "0"}, False),
+    ("lazy-import", {}, False),
+    ("lazy-first-use", {}, True),
+    ("full-pipeline", {"RECIPES_NLP_DISABLE": ""}, True),
+    ("small-model", {"RECIPES_NLP_MODEL": "en_core_web_sm"}, True),
+]
+
+
+def run_scenario(env_overrides, touch_nlp):
+    env = dict(os.environ, **env_overrides)
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, "1" if touch_nlp else "0"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario (best is kept)")
+    args = parser.parse_args()
+
+    results = {}
+    for name, env, touch in SCENARIOS:
+        runs = [run_scenario(env, touch) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["import_s"] + (r["nlp_load_s"] or 0))
+        results[name] = best
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'scenario':<16} {'import s':>9} {'nlp load s':>11} {'loaded':>7} {'max RSS MB':>11}")
+    for name, r in results.items():
+        nlp_s = f"{r['nlp_load_s']:.3f}" if r["nlp_load_s"] is not None else "-"
+        print(f"{name:<16} {r['import_s']:>9.3f} {nlp_s:>11} {str(r['nlp_loaded']):>7} {r['max_rss_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,8 @@ ACTIVE_ROOT=(
   recipes_v2.db
   tags.json
   cleanup_auto_archive.sh
+  gunicorn.conf.py
+  asgi.py
 )
 
 # === Move unused templates ===
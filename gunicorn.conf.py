@@ -0,0 +1,42 @@
+# ==========================================
+# gunicorn settings for Salima's Recipes
+#   python3 app.py serve                 (same as below, from any directory)
+#   gunicorn -c gunicorn.conf.py app:app
+# ==========================================
+# The app is imported once in the master (preload_app) and prepared there:
+# init_db() runs once and spaCy is loaded before the fork, so every worker
+# shares one copy of the model instead of loading its own.
+#
+# Sized for a 4-core Raspberry Pi: 2 worker processes x 8 threads. SQLite
+# takes one writer at a time, so more processes mostly add memory.
+#
+# Live updates are off here: an open /api/events stream would pin one of
+# the 16 threads per planner tab, so the endpoint answers 503 and the
+# planner polls the shopping list every 15 s instead. For live updates run
+# asgi.py (uvicorn), which holds streams on its event loop; or set
+# RECIPES_SSE_MAX_STREAMS to a few streams per worker if you accept the
+# threads they take.
+import os
+
+os.environ.setdefault("RECIPES_SSE_MAX_STREAMS", "0")  # read when app.py is preloaded
+
+bind = os.environ.get("RECIPES_BIND", "127.0.0.1:5050")
+workers = int(os.environ.get("RECIPES_WORKERS", "2"))
+threads = int(os.environ.get("RECIPES_THREADS", "8"))
+worker_class = "gthread"
+preload_app = True
+
+timeout = 60             # worker heartbeat
+graceful_timeout = 10
+keepalive = 5
+max_requests = 2000      # recycle workers now and then; a fresh fork is cheap with preload
+max_requests_jitter = 200
+
+accesslog = os.environ.get("RECIPES_ACCESS_LOG")  # e.g. "-" for stdout; off by default
+errorlog = "-"
+
+
+def on_starting(server):
+    # app.py is already imported (preload_app); this only runs its master-side setup
+    import app
+    app.prepare_master()
@@ -11,6 +11,8 @@ const ingredientInput = document.getElementById("ingredientInput");
 const clearBtn = document.getElementById("clearListBtn");        // ✅ updated
 const generateBtn = document.getElementById("exportBtn");        // ✅ updated
 const saveBtn = document.getElementById("savePlannerBtn");       // ✅ new
+const snapshotSelect = document.getElementById("snapshotSelect");
+const restoreBtn = document.getElementById("restorePlannerBtn");
 const clearMealPlanBtn = document.getElementById("clearMealPlanBtn"); // ✅ new
 
 /* --- Category list --- */
@@ -20,6 +22,8 @@ const categories = [
 ];
 
 let items = [];
+let watermark = "";            // newest updated_at we've seen (X-Shopping-Watermark)
+const SYNC_INTERVAL_MS = 15000;
 
 /* ===============================
    1. Fetch & Render
@@ -27,9 +31,25 @@ let items = [];
 async function loadShoppingList() {
   const res = await fetch("/api/shopping_list");
   items = await res.json();
+  watermark = res.headers.get("X-Shopping-Watermark") || "";
   renderShoppingList();
 }
 
+// Pull only what other devices changed since our watermark (304 if nothing)
+async function syncShoppingList() {
+  if (!watermark) return loadShoppingList();
+  const res = await fetch(`/api/shopping_list?since=${encodeURIComponent(watermark)}`);
+  if (!res.ok) return;
+  const delta = await res.json();
+  if (delta.full) {
+    items = delta.items;
+    renderShoppingList();
+  } else if (delta.items.length || delta.deleted.length) {
+    mergeItems(delta);
+  }
+  watermark = delta.watermark || watermark;
+}
+
 function renderShoppingList() {
   listContainer.innerHTML = "";
 
@@ -75,56 +95,136 @@ function renderShoppingList() {
 }
 
 /* ===============================
-   2. Handlers & Updates
+   2. Batched updates
+   Changes are queued, coalesced per item and sent as one
+   /api/shopping_list/batch request shortly after the last edit.
+   =============================== */
+const FLUSH_DELAY_MS = 400;
+let pendingOps = new Map();   // key → op ("upd:12", "del:7", "new:<ref>")
+let flushTimer = null;
+let refSeq = 0;
+
+function queueOp(op) {
+  if (op.op === "update") {
+    const key = `upd:${op.id}`;
+    pendingOps.set(key, { ...(pendingOps.get(key) || {}), ...op });
+  } else if (op.op === "delete") {
+    pendingOps.delete(`upd:${op.id}`);
+    pendingOps.set(`del:${op.id}`, op);
+  } else {
+    op.ref = op.ref || `new${++refSeq}`;
+    pendingOps.set(`new:${op.ref}`, op);
+  }
+  clearTimeout(flushTimer);
+  flushTimer = setTimeout(flushOps, FLUSH_DELAY_MS);
+}
+
+async function flushOps() {
+  clearTimeout(flushTimer);
+  if (!pendingOps.size) return;
+  const ops = [...pendingOps.values()];
+  pendingOps = new Map();
+
+  const res = await fetch("/api/shopping_list/batch", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ ops })
+  });
+  if (!res.ok) {
+    console.error("Batch update failed:", await res.text());
+    await loadShoppingList();
+    return;
+  }
+  mergeItems(await res.json());
+}
+
+// Apply a batch response ({items, deleted}) to the local list
+function mergeItems({ items: changed = [], deleted = [] }) {
+  const gone = new Set(deleted);
+  const byId = new Map(changed.map(i => [i.id, i]));
+  items = items.filter(i => !gone.has(i.id) && !byId.has(i.id));
+  changed.filter(i => i.active).forEach(i => items.push(i));
+  renderShoppingList();
+}
+
+// Live updates from other devices; polling only runs while this is down
+let liveConnected = false;
+const LIVE_RETRY_MS = 60000;
+function connectEvents() {
+  if (!window.EventSource) return;
+  const source = new EventSource("/api/events?channels=shopping_list");
+  source.addEventListener("open", () => {
+    // catch up on anything missed while we were disconnected
+    if (liveConnected === false && watermark) syncShoppingList();
+    liveConnected = true;
+  });
+  source.addEventListener("error", () => {
+    liveConnected = false;
+    // refused (503: server at its stream cap or SSE off): EventSource gives
+    // up for good, so keep polling and try again later
+    if (source.readyState === EventSource.CLOSED) setTimeout(connectEvents, LIVE_RETRY_MS);
+  });
+  source.addEventListener("shopping_list", e => mergeItems(JSON.parse(e.data)));
+}
+
+function findItem(id) {
+  return items.find(i => String(i.id) === String(id));
+}
+
+window.addEventListener("pagehide", () => {
+  if (!pendingOps.size) return;
+  navigator.sendBeacon(
+    "/api/shopping_list/batch",
+    new Blob([JSON.stringify({ ops: [...pendingOps.values()] })], { type: "application/json" })
+  );
+  pendingOps = new Map();
+});
+
+/* ===============================
+   2b. Handlers
    =============================== */
 function attachHandlers() {
   // checkbox toggle
   document.querySelectorAll(".shop-item").forEach(box => {
-    box.onchange = async () => {
-      const id = box.dataset.id;
-      const checked = box.checked ? 1 : 0;
-      await fetch(`/api/shopping_list/${id}`, {
-        method: "PATCH",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ checked })
-      });
+    box.onchange = () => {
+      const id = Number(box.dataset.id);
+      const item = findItem(id);
+      if (item) item.checked = box.checked;
+      queueOp({ op: "update", id, checked: box.checked });
     };
   });
 
   // strike-through toggle
   document.querySelectorAll(".item-name").forEach(span => {
-    span.onclick = async () => {
-      const id = span.closest("label").querySelector(".shop-item").dataset.id;
+    span.onclick = () => {
+      const id = Number(span.closest("label").querySelector(".shop-item").dataset.id);
       const crossed = !span.style.textDecoration.includes("line-through");
       span.style.textDecoration = crossed ? "line-through" : "none";
       span.style.opacity = crossed ? "0.6" : "1";
-      await fetch(`/api/shopping_list/${id}`, {
-        method: "PATCH",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ crossed })
-      });
+      const item = findItem(id);
+      if (item) item.crossed = crossed;
+      queueOp({ op: "update", id, crossed });
     };
 
     // delete on double click
-    span.ondblclick = async () => {
-      const id = span.closest("label").querySelector(".shop-item").dataset.id;
+    span.ondblclick = () => {
+      const id = Number(span.closest("label").querySelector(".shop-item").dataset.id);
       if (confirm(`Delete "${span.textContent.trim()}"?`)) {
-        await fetch(`/api/shopping_list/${id}`, { method: "DELETE" });
-        await loadShoppingList();
+        items = items.filter(i => i.id !== id);
+        queueOp({ op: "delete", id });
+        renderShoppingList();
       }
     };
   });
 
   // amount change
   document.querySelectorAll(".amount-input").forEach(inp => {
-    inp.oninput = async () => {
-      const id = inp.dataset.id;
+    inp.oninput = () => {
+      const id = Number(inp.dataset.id);
       const amount = inp.value.trim();
-      await fetch(`/api/shopping_list/${id}`, {
-        method: "PATCH",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ amount })
-      });
+      const item = findItem(id);
+      if (item) item.amount = amount;
+      queueOp({ op: "update", id, amount });
     };
   });
 
@@ -135,8 +235,7 @@ function attachHandlers() {
         e.preventDefault();
         const name = ingredientInput.value.trim();
         if (!name) return;
-        const cat = detectCategory(name);
-        await addNewItem(name, cat);
+        await addNewItem(name);  // the server picks the category
         ingredientInput.value = "";
       }
     });
@@ -163,33 +262,53 @@ function enableDragDrop() {
 
   allCats.forEach(catBox => {
     catBox.addEventListener("dragover", e => e.preventDefault());
-    catBox.addEventListener("drop", async e => {
+    catBox.addEventListener("drop", e => {
       e.preventDefault();
       if (!dragged) return;
       const newCat = catBox.dataset.cat;
-      const id = dragged.dataset.id;
-      await fetch(`/api/shopping_list/${id}`, {
-        method: "PATCH",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ category: newCat })
-      });
-      await loadShoppingList();
+      const id = Number(dragged.dataset.id);
+      const item = findItem(id);
+      if (item) item.category = newCat;
+      queueOp({ op: "update", id, category: newCat });
+      renderShoppingList();
     });
   });
 }
 
 /* ===============================
-   4. Add new item
+   4. Add new item(s)
    =============================== */
 async function addNewItem(name, category) {
-  const res = await fetch("/api/shopping_list", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ name, category })
-  });
-  const data = await res.json();
-  items.push({ id: data.id, name, category, checked: true, crossed: false, amount: "" });
-  renderShoppingList();
+  await addNewItems([{ name, category }]);
+}
+
+// Create many items in one batch request (e.g. a whole recipe's ingredients)
+async function addNewItems(newItems) {
+  if (!newItems.length) return;
+  newItems.forEach(({ name, category, amount }) =>
+    queueOp({ op: "create", name, category, amount: amount || "" })
+  );
+  await flushOps();
+}
+
+const importBtn = document.getElementById("importFromRecipesBtn");
+if (importBtn) {
+  importBtn.onclick = async () => {
+    const boxes = document.querySelectorAll("#recipesContainer input[type='checkbox'][data-ing]:checked");
+    const lines = [...boxes].map(b => b.dataset.ing.trim()).filter(Boolean);
+    if (!lines.length) return;
+    // merge "200 g penne" + "300 g penne" into one "500 g penne" item
+    const res = await fetch("/api/shopping_list/aggregate", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ lines })
+    });
+    const merged = res.ok
+      ? (await res.json()).items
+      : [...new Set(lines)].map(item => ({ item, amount: "" }));
+    // no category: the server fills it in (learned moves first, then keywords)
+    await addNewItems(merged.map(({ item, amount }) => ({ name: item, amount })));
+  };
 }
 
 /* ===============================
@@ -198,6 +317,7 @@ async function addNewItem(name, category) {
 if (clearBtn) {
   clearBtn.onclick = async () => {
     if (confirm("Clear current shopping list (keep items in history)?")) {
+      await flushOps();
       await fetch("/api/shopping_list/clear", { method: "POST" });
       await loadShoppingList();
     }
@@ -217,20 +337,57 @@ if (clearMealPlanBtn) {
 /* ===============================
    6. Save Planner (combined snapshot)
    =============================== */
+const MEAL_PLAN_KEY = "salimaMealPlan";  // planner_grid.js's PLAN_KEY
+
 if (saveBtn) {
   saveBtn.onclick = async () => {
+    await flushOps();
+    const dayToggle = document.getElementById("dayToggle");
     const plannerData = {
-      timestamp: new Date().toISOString(),
       shopping_list: items,
       recipes: JSON.parse(localStorage.getItem("selectedRecipes") || "[]"),
-      meal_plan: document.getElementById("mealGridContainer").innerHTML
+      meal_plan: JSON.parse(localStorage.getItem(MEAL_PLAN_KEY) || "{}"),
+      week_start: dayToggle ? dayToggle.value : ""
     };
-    await fetch("/api/planner/save", {
+    const res = await fetch("/api/planner/save", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(plannerData)
     });
-    alert("💾 Planner saved successfully.");
+    if (!res.ok) return alert("⚠️ Could not save the planner.");
+    const { created } = await res.json();
+    alert(created ? "💾 Planner saved successfully." : "💾 Planner unchanged since the last save.");
+    loadSnapshots();
+  };
+}
+
+// Saved plans dropdown + restore (list, recipes and grid come back as saved)
+async function loadSnapshots() {
+  if (!snapshotSelect) return;
+  const res = await fetch("/api/planner/snapshots");
+  if (!res.ok) return;
+  const { snapshots } = await res.json();
+  snapshotSelect.innerHTML = '<option value="">Saved plans…</option>';
+  snapshots.forEach(s => {
+    const opt = document.createElement("option");
+    opt.value = s.id;
+    const when = new Date(s.created_at.replace(" ", "T") + "Z").toLocaleString();
+    opt.textContent = `${s.label || when} — ${s.item_count} items, ${s.meal_count} meals`;
+    snapshotSelect.appendChild(opt);
+  });
+}
+
+if (restoreBtn && snapshotSelect) {
+  restoreBtn.onclick = async () => {
+    const id = snapshotSelect.value;
+    if (!id || !confirm("Replace the current list, recipes and meal plan with this saved plan?")) return;
+    await flushOps();
+    const res = await fetch(`/api/planner/snapshots/${id}/restore`, { method: "POST" });
+    if (!res.ok) return alert("⚠️ Could not restore that plan.");
+    const { snapshot } = await res.json();
+    localStorage.setItem("selectedRecipes", JSON.stringify(snapshot.recipes));
+    localStorage.setItem(MEAL_PLAN_KEY, JSON.stringify(snapshot.meal_plan));
+    location.reload();
   };
 }
 
@@ -269,28 +426,17 @@ if (generateBtn) {
 }
 
 /* ===============================
-   8. Category detection
-   =============================== */
-const KEYMAP = {
-  "Dairy & Eggs": ["milk","cheese","cream","butter","yog","egg"],
-  "Produce": ["apple","banana","tomato","onion","pepper","carrot","potato","garlic","lettuce","spinach","herb","lemon","lime","mushroom","broccoli"],
-  "Meat & Fish": ["chicken","beef","lamb","ham","bacon","pork","turkey","fish","salmon","tuna","sausage","mince"],
-  "Frozen": ["frozen","peas","ice","chips","sweetcorn","berries","pizza"],
-  "Pantry": ["bread","rice","pasta","oil","salt","flour","spice","sugar","sauce","tin","jar","stock","broth","cereal"],
-  "Snacks": ["crisps","bar","chocolate","sweet","biscuit","snack"],
-  "Toiletries": ["soap","toothpaste","tooth","colgate","aquafresh","shampoo","roll","tissue"],
-  "Other": []
-};
-
-function detectCategory(name) {
-  const lower = name.toLowerCase();
-  for (const [cat, words] of Object.entries(KEYMAP)) {
-    if (words.some(w => lower.includes(w))) return cat;
-  }
-  return "Other";
-}
-
-/* ===============================
-   9. Init
+   8. Init
    =============================== */
-document.addEventListener("DOMContentLoaded", loadShoppingList);
+document.addEventListener("DOMContentLoaded", () => {
+  loadShoppingList();
+  connectEvents();
+  loadSnapshots();
+});
+setInterval(() => {
+  if (liveConnected) return;
+  if (document.visibilityState === "visible" && !pendingOps.size) syncShoppingList();
+}, SYNC_INTERVAL_MS);
+document.addEventListener("visibilitychange", () => {
+  if (document.visibilityState === "visible") syncShoppingList();
+});
@@ -0,0 +1,38 @@
+"""
+Shared fixtures. app.py reads its settings from the environment at import,
+so the test database, thumbnail directory and NLP switch are set up here
+before anything imports it.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TMP = Path(tempfile.mkdtemp(prefix="recipes-tests-"))
+
+os.environ["RECIPES_DB"] = str(TMP / "recipes.db")
+os.environ["RECIPES_THUMB_DIR"] = str(TMP / "thumbs")
+os.environ["RECIPES_NLP"] = "0"
+sys.path.insert(0, str(ROOT))
+
+import pytest
+
+import app as recipes
+
+recipes.init_db()
+
+
+@pytest.fixture
+def client():
+    return recipes.app.test_client()
+
+
+@pytest.fixture
+def add_item(client):
+    """Create a shopping-list item, return its id."""
+    def add(name, **fields):
+        resp = client.post("/api/shopping_list", json={"name": name, **fields})
+        assert resp.status_code == 200
+        return resp.get_json()["id"]
+    return add
@@ -0,0 +1,92 @@
+"""Ingredient aggregation behind /api/shopping_list/aggregate (table-driven)."""
+import pytest
+
+import app as recipes
+
+# (input lines, expected {canonical item: amount})
+CASES = [
+    (["200 g penne", "300 g penne"], {"penne": "500 g"}),
+    (["600 g flour", "0.5 kg flour"], {"flour": "1.1 kg"}),
+    (["750 g beef mince", "500 g beef mince"], {"beef mince": "1.25 kg"}),
+    (["1 tsp cumin", "2 tsp cumin"], {"cumin": "3 tsp"}),
+    (["1 tbsp oil", "1 tbsp oil", "2 tbsp oil"], {"oil": "4 tbsp"}),
+    (["2 tsp paprika", "1 tbsp paprika"], {"paprika": "1 2/3 tbsp"}),
+    (["½ cup milk", "¼ cup milk"], {"milk": "3/4 cup"}),
+    (["1 1/2 cups rice", "1/2 cup rice"], {"rice": "2 cup"}),
+    (["500 ml stock", "1 l stock"], {"stock": "1.5 l"}),
+    (["2 eggs", "1 egg"], {"egg": "3"}),
+    (["2 tomatoes", "Tomato"], {"tomato": "2"}),
+    (["Onion", "onion", "onions"], {"onion": ""}),
+    (["2 cloves garlic, crushed", "1 clove garlic"], {"garlic": "3 clove"}),
+    (["1 tin chopped tomatoes", "2 cans chopped tomatoes"], {"chopped tomato": "3 tin"}),
+    (["100 g butter", "2 tbsp butter"], {"butter": "100 g", "butter (volume)": "2 tbsp"}),
+    (["salt", "1 tsp salt"], {"salt": "1 tsp"}),
+    (["asparagus", "asparagus"], {"asparagus": ""}),
+    (["hummus"], {"hummus": ""}),
+]
+
+
+def merged_amounts(items):
+    got = {}
+    for m in items:
+        key = recipes.canonical_item(m["item"])
+        if key in got:  # same item in a second dimension (mass + volume)
+            key += " (volume)"
+        got[key] = m["amount"]
+    return got
+
+
+@pytest.mark.parametrize("lines, expected", CASES, ids=[" + ".join(lines) for lines, _ in CASES])
+def test_aggregate_ingredients(lines, expected):
+    merged = recipes.aggregate_ingredients(recipes.parse_ingredients_block(lines))
+    assert merged_amounts(merged) == expected
+
+
+@pytest.mark.parametrize("item, key", [
+    ("Tomatoes ", "tomato"),
+    ("Chopped Tomatoes", "chopped tomato"),
+    ("berries", "berry"),
+    ("eggs", "egg"),
+    ("onions.", "onion"),
+    ("  Red   Onion ", "red onion"),
+    ("peas", "pea"),
+    ("asparagus", "asparagus"),
+    ("hummus", "hummus"),
+    ("couscous", "couscous"),
+    ("cress", "cress"),
+])
+def test_canonical_item(item, key):
+    assert recipes.canonical_item(item) == key
+
+
+@pytest.mark.parametrize("lines, expected", CASES[:6], ids=[" + ".join(lines) for lines, _ in CASES[:6]])
+def test_endpoint_lines(client, lines, expected):
+    resp = client.post("/api/shopping_list/aggregate", json={"lines": lines})
+    assert resp.status_code == 200
+    assert merged_amounts(resp.get_json()["items"]) == expected
+
+
+def test_endpoint_recipe_ids_use_stored_rows(client):
+    rid = recipes.add_recipe_to_db("Aggregate test pasta", "200 g penne\n1 tbsp oil", "Boil.", "", "")
+    resp = client.post("/api/shopping_list/aggregate", json={"recipe_ids": [rid, rid], "lines": ["100 g penne"]})
+    assert resp.status_code == 200
+    assert merged_amounts(resp.get_json()["items"]) == {"penne": "500 g", "oil": "2 tbsp"}
+
+
+@pytest.mark.parametrize("body", [
+    {"lines": "200 g penne"},
+    {"recipe_ids": 3},
+    {"recipe_ids": ["three"]},
+])
+def test_endpoint_rejects_bad_input(client, body):
+    resp = client.post("/api/shopping_list/aggregate", json=body)
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+def test_endpoint_writes_nothing(client):
+    with recipes.app.app_context():
+        before = recipes.latest_event_id(recipes.get_conn())
+    client.post("/api/shopping_list/aggregate", json={"lines": ["1 egg"]})
+    with recipes.app.app_context():
+        assert recipes.latest_event_id(recipes.get_conn()) == before
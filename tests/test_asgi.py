@@ -0,0 +1,137 @@
+"""
+asgi.py's own handlers, called in-process: they must answer like the Flask
+routes they stand in for, never fall through to Flask, publish the same
+events, and (RECIPES_METRICS=1) record metrics like Flask does.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as recipes
+import asgi
+from conftest import ROOT
+
+
+async def asgi_call(method, path, body=None, root_path=""):
+    """(status, headers dict, parsed JSON body) of one request through asgi.application."""
+    raw = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "method": method, "path": root_path + path, "root_path": root_path,
+        "query_string": b"", "headers": [(b"content-type", b"application/json")],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.application(scope, receive, send)
+    start = sent[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    data = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], headers, json.loads(data) if data else None
+
+
+def call(*args, **kwargs):
+    return asyncio.run(asgi_call(*args, **kwargs))
+
+
+@pytest.fixture(autouse=True)
+def native_only(monkeypatch):
+    """Fail if a request meant for asgi.py's handlers reaches Flask; fresh broker per loop."""
+    async def no_flask(scope, receive, send):
+        raise AssertionError(f"{scope['method']} {scope['path']} fell through to Flask")
+    monkeypatch.setattr(asgi, "flask_app", no_flask)
+    monkeypatch.setattr(asgi, "broker", recipes.AsyncEventBroker(lambda: asgi.run_db(recipes.latest_event_id)))
+
+
+def latest_event():
+    with recipes.app.app_context():
+        return recipes.latest_event_id(recipes.get_conn())
+
+
+def shopping_ids():
+    return {i["id"] for i in call("GET", "/api/shopping_list")[2]}
+
+
+def test_post_creates_and_publishes():
+    before = latest_event()
+    status, _, body = call("POST", "/api/shopping_list", {"name": " asgi penne ", "category": "Pantry"})
+    assert status == 200
+    assert body["name"] == "asgi penne" and body["category"] == "Pantry"
+    assert body["id"] in shopping_ids()
+    assert latest_event() > before
+
+
+@pytest.mark.parametrize("payload, error", [
+    ({"name": ""}, "Missing name"),
+    ({"name": {"x": 1}}, "name must be a string"),
+    ({"name": "x", "checked": "yes"}, "checked must be true or false"),
+    (["not", "an", "object"], "Invalid data"),
+])
+def test_post_rejects_like_flask(client, payload, error):
+    status, _, body = call("POST", "/api/shopping_list", payload)
+    flask = client.post("/api/shopping_list", json=payload)
+    assert (status, body) == (flask.status_code, flask.get_json()) == (400, {"error": error})
+
+
+def test_delete():
+    item_id = call("POST", "/api/shopping_list", {"name": "asgi delete me"})[2]["id"]
+    before = latest_event()
+    status, _, body = call("DELETE", f"/api/shopping_list/{item_id}")
+    assert (status, body) == (200, {"status": "deleted"})
+    assert item_id not in shopping_ids()
+    assert latest_event() > before
+
+
+def test_clear():
+    call("POST", "/api/shopping_list", {"name": "asgi clear me"})
+    status, _, body = call("POST", "/api/shopping_list/clear")
+    assert (status, body) == (200, {"status": "cleared"})
+    assert shopping_ids() == set()
+
+
+@pytest.mark.parametrize("payload", [
+    {"lines": ["200 g penne", "300 g penne", "1 tbsp oil"]},
+    {"lines": "200 g penne"},
+    {"recipe_ids": ["x"]},
+    [],
+])
+def test_aggregate_matches_flask(client, payload):
+    status, _, body = call("POST", "/api/shopping_list/aggregate", payload)
+    flask = client.post("/api/shopping_list/aggregate", json=payload)
+    assert (status, body) == (flask.status_code, flask.get_json())
+
+
+METRICS_SCRIPT = """
+import asyncio, json, sys
+sys.path.insert(0, sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+import app, asgi
+from test_asgi import asgi_call
+app.init_db()
+statuses = [asyncio.run(asgi_call("POST", "/api/shopping_list", {"name": "metered"}))[1]]
+statuses.append(asyncio.run(asgi_call("GET", "/api/shopping_list"))[1])
+routes = app.metrics.summary()["routes"]
+print(json.dumps({"timing": [h.get("server-timing") for h in statuses],
+                  "counts": {r: v["count"] for r, v in routes.items()},
+                  "sql": routes["/api/shopping_list"]["sql_per_request"]}))
+"""
+
+
+def test_metrics_cover_asgi_routes():
+    env = {**os.environ, "RECIPES_METRICS": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-c", METRICS_SCRIPT, str(ROOT), str(ROOT / "tests")], env=env,
+        capture_output=True, text=True, timeout=60, check=True,
+    )
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert all(t and "total;dur=" in t and "db;dur=" in t for t in out["timing"])
+    assert out["counts"]["/api/shopping_list"] == 2
+    assert out["sql"] > 0
@@ -0,0 +1,142 @@
+"""
+/api/events end to end: several clients hold a stream open on a real
+server, one PATCH goes in, and every stream has to receive the change.
+Runs against app.py's threaded WSGI view and, when uvicorn is installed,
+against asgi.py.
+"""
+import http.client
+import json
+import threading
+import time
+
+import pytest
+from werkzeug.serving import make_server
+
+import app as recipes
+
+STREAMS = 8
+
+
+@pytest.fixture(scope="module", params=["wsgi", "asgi"])
+def server(request):
+    """(host, port) of a live server on a free port."""
+    if request.param == "wsgi":
+        srv = make_server("127.0.0.1", 0, recipes.app, threaded=True)
+        thread = threading.Thread(target=srv.serve_forever, daemon=True)
+        thread.start()
+        yield "127.0.0.1", srv.server_port
+        srv.shutdown()
+        return
+
+    uvicorn = pytest.importorskip("uvicorn")
+    import asgi
+
+    config = uvicorn.Config(asgi.application, host="127.0.0.1", port=0, log_level="warning")
+    srv = uvicorn.Server(config)
+    thread = threading.Thread(target=srv.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not (srv.started and srv.servers) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert srv.started, "uvicorn did not start"
+    yield "127.0.0.1", srv.servers[0].sockets[0].getsockname()[1]
+    srv.should_exit = True
+    thread.join(5)
+
+
+def request(server, method, path, body=None):
+    conn = http.client.HTTPConnection(*server, timeout=10)
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp.status, json.loads(data) if data else None
+
+
+def open_stream(server, channels="shopping_list"):
+    """An /api/events response, read up to its opening retry: line."""
+    conn = http.client.HTTPConnection(*server, timeout=10)
+    conn.request("GET", f"/api/events?channels={channels}")
+    resp = conn.getresponse()
+    assert resp.status == 200
+    assert resp.getheader("Content-Type").startswith("text/event-stream")
+    assert resp.readline() == b"retry: 3000\n"
+    assert resp.readline() == b"\n"
+    return conn, resp
+
+
+def next_event(resp):
+    """(event name, data) of the next event on the stream (skips keep-alives)."""
+    event, data = None, None
+    while True:
+        line = resp.readline().decode().rstrip("\n")
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data = json.loads(line[len("data: "):])
+        elif not line and event:
+            return event, data
+
+
+def test_every_stream_gets_the_patch(server):
+    status, created = request(server, "POST", "/api/shopping_list", {"name": "sse test item"})
+    assert status == 200
+    item_id = created["id"]
+
+    streams = [open_stream(server) for _ in range(STREAMS)]
+    try:
+        status, _ = request(server, "PATCH", f"/api/shopping_list/{item_id}", {"amount": "3 tins"})
+        assert status == 200
+
+        results = [None] * STREAMS
+
+        def read(i, resp):
+            results[i] = next_event(resp)
+
+        readers = [threading.Thread(target=read, args=(i, resp)) for i, (_, resp) in enumerate(streams)]
+        for t in readers:
+            t.start()
+        for t in readers:
+            t.join(15)
+
+        for event in results:
+            assert event is not None
+            name, data = event
+            assert name == "shopping_list"
+            assert [(i["id"], i["amount"]) for i in data["items"]] == [(item_id, "3 tins")]
+    finally:
+        for conn, _ in streams:
+            conn.close()
+
+
+def test_channels_filter(server):
+    recipe = f"Soup {time.monotonic()}"  # a change every run, or nothing is published
+    conn, resp = open_stream(server, channels="meal_plan")
+    try:
+        request(server, "POST", "/api/shopping_list", {"name": "not for meal_plan"})
+        status, _ = request(server, "POST", "/api/meal_plan", [{"slot": "Mon-dinner", "recipe": recipe, "link": ""}])
+        assert status == 200
+        name, data = next_event(resp)
+        assert name == "meal_plan"
+        assert recipe in json.dumps(data)
+    finally:
+        conn.close()
+
+
+def test_wsgi_stream_cap(client, monkeypatch):
+    # streams left by the live-server tests only close at their next heartbeat
+    already_open = recipes._sse_streams["open"]
+    monkeypatch.setattr(recipes, "SSE_MAX_STREAMS", already_open + 1)
+    first = client.get("/api/events", buffered=False)
+    try:
+        assert first.status_code == 200
+        refused = client.get("/api/events")
+        assert refused.status_code == 503
+        assert refused.headers["Retry-After"] == str(recipes.SSE_RETRY_AFTER_S)
+    finally:
+        first.close()
+    again = client.get("/api/events", buffered=False)
+    assert again.status_code == 200
+    again.close()
+    assert recipes._sse_streams["open"] <= already_open
@@ -0,0 +1,86 @@
+"""Request metrics: the admin guard on /admin/metrics and /metrics, and the numbers."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as recipes
+from conftest import ROOT
+
+FORWARDED = [{"X-Forwarded-For": "203.0.113.9"}, {"CF-Connecting-IP": "203.0.113.9"}, {"Forwarded": "for=203.0.113.9"}]
+
+
+@pytest.mark.parametrize("path", ["/admin/metrics", "/metrics", "/admin/cache"])
+@pytest.mark.parametrize("headers", FORWARDED)
+def test_forwarded_requests_are_refused(client, path, headers):
+    assert client.get(path, headers=headers).status_code == 403
+
+
+@pytest.mark.parametrize("path", ["/admin/metrics", "/metrics"])
+def test_remote_requests_are_refused(client, path):
+    assert client.get(path, environ_base={"REMOTE_ADDR": "192.168.1.20"}).status_code == 403
+
+
+def test_local_requests_are_allowed(client):
+    resp = client.get("/admin/metrics")
+    assert resp.status_code == 200
+    assert resp.get_json()["enabled"] is recipes.METRICS_ENABLED
+
+
+@pytest.mark.parametrize("send, status", [
+    ({}, 403),
+    ({"headers": {"Authorization": "Bearer wrong"}}, 403),
+    ({"headers": {"Authorization": "Bearer s3cret"}}, 200),
+    ({"headers": {"X-Admin-Token": "s3cret"}}, 200),
+    ({"query_string": {"token": "s3cret"}}, 200),
+])
+def test_token(client, monkeypatch, send, status):
+    monkeypatch.setattr(recipes, "ADMIN_TOKEN", "s3cret")
+    # with a token set, where the request came from no longer matters
+    environ = {"REMOTE_ADDR": "203.0.113.9"}
+    assert client.get("/admin/metrics", environ_base=environ, **send).status_code == status
+
+
+def test_clearing_the_page_cache_needs_a_post(client):
+    client.get("/search?q=soup")
+    assert recipes.page_cache.stats()["size"] > 0
+    client.get("/admin/cache?clear=1")
+    assert recipes.page_cache.stats()["size"] > 0
+    assert client.post("/admin/cache").status_code == 200
+    assert recipes.page_cache.stats()["size"] == 0
+
+
+# RECIPES_METRICS is read at import, so the enabled case runs in its own interpreter
+ENABLED_SCRIPT = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+import app
+client = app.app.test_client()
+for _ in range(3):
+    resp = client.get("/search?q=soup")
+out = {
+    "server_timing": resp.headers.get("Server-Timing"),
+    "summary": client.get("/admin/metrics").get_json(),
+    "prometheus": client.get("/metrics").get_data(as_text=True),
+    "remote": client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.9"}).status_code,
+}
+print(json.dumps(out))
+"""
+
+
+def test_enabled_metrics():
+    env = {**os.environ, "RECIPES_METRICS": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-c", ENABLED_SCRIPT, str(ROOT)], env=env,
+        capture_output=True, text=True, timeout=60, check=True,
+    )
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert "total;dur=" in out["server_timing"]
+    summary = out["summary"]
+    assert summary["enabled"] is True
+    assert summary["routes"]["/search"]["count"] == 3
+    assert 'route="/search"' in out["prometheus"]
+    assert out["remote"] == 403
@@ -0,0 +1,118 @@
+"""Thumbnails from local image files: variants on disk, srcsets, /thumbs headers."""
+import hashlib
+import io
+
+import pytest
+
+import app as recipes
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def image_bytes(width, height, fmt="PNG", color="tomato"):
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, fmt)
+    return out.getvalue()
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path / "photo.png"
+    path.write_bytes(image_bytes(800, 500))
+    return path
+
+
+def test_make_thumbnails_writes_every_width_and_format():
+    data = image_bytes(800, 500, color="navy")
+    digest, widths, formats = recipes.make_thumbnails(data)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert widths == [w for w in recipes.THUMB_WIDTHS if w <= 800]
+    assert "jpg" in formats
+    for w in widths:
+        for fmt in formats:
+            with Image.open(recipes.THUMB_DIR / f"{digest}-{w}.{fmt}") as im:
+                assert im.size == (w, round(500 * w / 800))
+    assert not list(recipes.THUMB_DIR.glob(".*.tmp"))  # no temp files left behind
+
+
+def test_small_images_are_not_upscaled():
+    digest, widths, _ = recipes.make_thumbnails(image_bytes(60, 40, color="olive"))
+    assert widths == [60]
+    assert (recipes.THUMB_DIR / f"{digest}-60.jpg").exists()
+
+
+def test_process_image_source_records_ready_row(image_file):
+    source = str(image_file)
+    with recipes.app.app_context():
+        conn = recipes.get_conn()
+        assert recipes.process_image_source(conn, source, allow_files=True)
+        status, digest = conn.execute(
+            "SELECT status, digest FROM image_cache WHERE source = ?", (source,)
+        ).fetchone()
+    assert status == "ready"
+    assert digest == hashlib.sha256(image_file.read_bytes()).hexdigest()
+
+
+def test_local_files_need_allow_files(image_file):
+    with recipes.app.app_context():
+        conn = recipes.get_conn()
+        assert not recipes.process_image_source(conn, str(image_file))
+        status, error = conn.execute(
+            "SELECT status, error FROM image_cache WHERE source = ?", (str(image_file),)
+        ).fetchone()
+    assert status == "error"
+    assert "unsupported image source" in error
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/a.jpg", "http://localhost/a.jpg", "http://10.1.2.3/a.jpg",
+    "http://169.254.169.254/latest/meta-data", "http://[::1]/a.jpg",
+])
+def test_private_hosts_are_refused(url):
+    with pytest.raises(ValueError, match="not public"):
+        recipes.read_image_source(url)
+
+
+def test_thumb_file_cache_headers(client, image_file):
+    digest, widths, formats = recipes.make_thumbnails(image_file.read_bytes())
+    for fmt in formats:
+        resp = client.get(f"/thumbs/{digest}-{widths[0]}.{fmt}")
+        assert resp.status_code == 200
+        assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert resp.mimetype == {"jpg": "image/jpeg", "webp": "image/webp"}[fmt]
+    assert client.get("/thumbs/not-a-digest.jpg").status_code == 404
+
+
+def test_srcset_follows_the_mount_prefix(image_file):
+    source = str(image_file)
+    with recipes.app.app_context():
+        recipes.process_image_source(recipes.get_conn(), source, allow_files=True)
+    with recipes.app.test_request_context("/", base_url="http://localhost/r"):
+        srcset = recipes.lookup_thumbs(recipes.get_conn().cursor(), [source], "detail")[source]
+    assert srcset["src"].startswith("/r/thumbs/")
+    assert all(part.strip().startswith("/r/thumbs/") for part in srcset["jpeg"].split(","))
+
+
+def test_upload_under_a_prefix(client, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(recipes.thumbnailer, "submit", submitted.append)
+    data = image_bytes(300, 200, color="teal")
+    resp = client.post(
+        "/api/images", base_url="http://localhost/r",
+        data={"image": (io.BytesIO(data), "teal.png")}, content_type="multipart/form-data",
+    )
+    assert resp.status_code == 201
+    image_url = resp.get_json()["image_url"]
+    assert image_url == f"/r/thumbs/{hashlib.sha256(data).hexdigest()}.png"
+    assert submitted == [image_url]
+    assert recipes.read_image_source(image_url) == data
+
+
+def test_finished_thumbnail_only_invalidates_thumbnail_pages(client, image_file):
+    for path in ("/", "/search?q=soup"):
+        client.get(path)
+    with recipes.app.app_context():
+        recipes.process_image_source(recipes.get_conn(), str(image_file), allow_files=True)
+    assert client.get("/").headers["X-Cache"] == "MISS"
+    assert client.get("/search?q=soup").headers["X-Cache"] == "HIT"